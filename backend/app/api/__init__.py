@@ -3,4 +3,5 @@ from . import auth
 from . import users
 from . import mutual_funds
 from . import investments
-from . import portfolio
\ No newline at end of file
+from . import portfolio
+from . import health
\ No newline at end of file
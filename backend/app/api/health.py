@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+import time
+
+from app.core.exceptions import DatabaseError
+from app.core.startup import startup_state
+from app.db.database import DatabaseManager, engine, pool_status
+from app.db.routing import replica_router
+
+router = APIRouter(
+    tags=["Health"],
+)
+
+@router.get("/health")
+async def liveness():
+    """Liveness probe: the process is up and serving."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: 200 once startup warm-up has finished, 503 before."""
+    return JSONResponse(startup_state.report(), status_code=200 if startup_state.ready else 503)
+
+@router.get("/health/db")
+async def database_health():
+    """Database probe: round-trip latency and connection pool state (503 if unreachable)."""
+    def check():
+        started = time.perf_counter()
+        try:
+            DatabaseManager.check_connection()
+            error = None
+        except DatabaseError as e:
+            error = e.detail
+        return round((time.perf_counter() - started) * 1000, 2), error
+
+    latency_ms, error = await run_in_threadpool(check)
+    report = {
+        "status": "ok" if error is None else "unavailable",
+        "latency_ms": latency_ms,
+        "error": error,
+        "pool": pool_status(engine),
+        "replicas": replica_router.status()
+    }
+    return JSONResponse(report, status_code=200 if error is None else 503)
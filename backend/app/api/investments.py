@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import codecs
+import json
 
 from app.db.session import get_db
-from app.schemas.investment import InvestmentCreate, InvestmentResponse, InvestmentUpdate
-from app.services.investment import create_investment, get_investments_by_user, get_investment_by_id, update_investment, delete_investment
+from app.schemas.investment import (
+    InvestmentCreate, InvestmentResponse, InvestmentUpdate, InvestmentImportReport, InvestmentBatch, InvestmentBatchResult
+)
+from app.services.investment import (
+    create_investment, get_investments_by_user, get_investment_by_id, update_investment, delete_investment,
+    apply_investment_batch
+)
+from app.services.investment_import import import_investments, iter_csv_lots, iter_cas_json_lots, ImportRowError
 from app.api.auth import get_current_active_user
 from app.core.exceptions import NotFoundError, ForbiddenError
 from app.db.models import User
@@ -29,6 +38,56 @@ async def add_investment(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/batch", response_model=InvestmentBatchResult)
+async def batch_investments(
+    batch: InvestmentBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create, update and delete many of the current user's investments in one transaction.
+    Deletes run first, then updates, then creates; if any investment or fund is not found
+    (or not the user's), nothing is applied.
+    """
+    try:
+        return apply_investment_batch(db, current_user.id, batch)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.detail))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/import", response_model=InvestmentImportReport)
+async def import_investment_file(
+    file: UploadFile = File(..., description="CSV of lots, or a consolidated account statement (CSV or JSON export)"),
+    format: str = Query("csv", pattern="^(csv|cas_json)$", description="File format (csv or cas_json)"),
+    strict: bool = Query(False, description="Import nothing if any row has an error"),
+    dry_run: bool = Query(False, description="Validate and report without importing"),
+    skip_duplicates: bool = Query(True, description="Skip lots identical to ones already held"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Import many investments at once. CSV files need isn (or isin), investment_date (or date),
+    amount_invested (or amount) and nav_at_investment (or nav) columns; units and type are optional.
+    Rows that fail are listed in the report; the rest are imported in one transaction.
+    """
+    def run():
+        if format == "cas_json":
+            rows = iter_cas_json_lots(json.load(file.file))
+        else:
+            # Decoded and parsed as it is read, not loaded whole
+            rows = iter_csv_lots(codecs.getreader("utf-8-sig")(file.file))
+        return import_investments(
+            db, current_user.id, rows, strict=strict, dry_run=dry_run, skip_duplicates=skip_duplicates
+        )
+
+    try:
+        return await run_in_threadpool(run)
+    except (ImportRowError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable import file: {e}")
+
+
 @router.get("/", response_model=List[InvestmentResponse])
 async def read_investments(
     skip: int = 0,
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from app.db.session import get_db
-from app.schemas.mutual_fund import MutualFundResponse, MutualFundDetail, MutualFundPerformance, SectorAllocation, StockHolding, CapAllocation
-from app.services.mutual_fund import get_mutual_funds, get_mutual_fund_by_id, get_mutual_fund_performances, get_mutual_fund_allocations, get_mutual_fund_holdings, get_mutual_fund_cap_allocations
+from app.db.routing import get_read_db
+from app.schemas.mutual_fund import MutualFundResponse, MutualFundDetail, MutualFundPerformance, SectorAllocation, StockHolding, CapAllocation, MutualFundSearch, MutualFundReturns, ReturnRangeRequest, ReturnRangeResult, MutualFundRisk, SimilarFund, NearClonePair, FundCorrelation
+from app.services.mutual_fund import get_mutual_funds, get_mutual_fund_detail, get_mutual_fund_nav_series, get_mutual_fund_allocations, get_mutual_fund_holdings, get_mutual_fund_cap_allocations
+from app.services.fund_search import search_mutual_funds
+from app.services.returns import get_fund_returns, SORTABLE_FIELDS
+from app.services.return_index import get_range_returns
+from app.services.risk import get_fund_risk
+from app.services.correlation import get_fund_correlations
+from app.services.fund_similarity import get_similar_funds, get_near_clone_funds
 from app.api.auth import get_current_active_user
+from app.core.responses import ORJSONResponse
 
 router = APIRouter(
     prefix="/mutual-funds",
@@ -17,21 +26,85 @@ router = APIRouter(
 async def read_mutual_funds(
     skip: int = 0, 
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get a list of mutual funds."""
     mutual_funds = get_mutual_funds(db, skip=skip, limit=limit)
     return mutual_funds
 
+@router.get("/search", response_model=List[MutualFundResponse])
+async def search_mutual_fund_list(
+    search: MutualFundSearch = Depends(),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Search mutual funds by name (prefix, substring or approximate match) with optional filters."""
+    return search_mutual_funds(
+        db,
+        term=search.term,
+        fund_type=search.fund_type,
+        fund_category=search.fund_category,
+        fund_house=search.fund_house,
+        limit=limit
+    )
+
+@router.get("/returns", response_model=List[MutualFundReturns])
+async def read_mutual_fund_returns(
+    fund_type: Optional[str] = None,
+    fund_category: Optional[str] = None,
+    fund_house: Optional[str] = None,
+    sort_by: str = Query("one_year", description=f"Field to sort by ({', '.join(SORTABLE_FIELDS)})"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order (asc or desc)"),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get precomputed trailing returns for mutual funds."""
+    if sort_by not in SORTABLE_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {sort_by}")
+    return ORJSONResponse(get_fund_returns(
+        db,
+        fund_type=fund_type,
+        fund_category=fund_category,
+        fund_house=fund_house,
+        sort_by=sort_by,
+        descending=order == "desc",
+        skip=skip,
+        limit=limit
+    ))
+
+@router.post("/returns/range", response_model=List[ReturnRangeResult])
+async def read_mutual_fund_range_returns(
+    request: ReturnRangeRequest,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get returns for many (fund, start date, end date) triples in one call."""
+    queries = [(query.fund_id, query.start_date, query.end_date) for query in request.queries]
+    return ORJSONResponse(get_range_returns(db, queries))
+
+@router.get("/near-clones", response_model=List[NearClonePair])
+async def read_near_clone_funds(
+    min_similarity: float = Query(0.8, ge=0, le=1, description="Minimum estimated holdings similarity (0-1)"),
+    across_houses: bool = Query(True, description="Only pair funds of different fund houses"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of pairs"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Find pairs of funds with near-identical holdings."""
+    return get_near_clone_funds(db, min_similarity=min_similarity, across_houses=across_houses, limit=limit)
+
 @router.get("/{fund_id}", response_model=MutualFundDetail)
 async def read_mutual_fund(
     fund_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get detailed information about a specific mutual fund."""
-    mutual_fund = get_mutual_fund_by_id(db, fund_id=fund_id)
+    mutual_fund = get_mutual_fund_detail(db, fund_id=fund_id)
     if mutual_fund is None:
         raise HTTPException(status_code=404, detail="Mutual fund not found")
     return mutual_fund
@@ -39,23 +112,24 @@ async def read_mutual_fund(
 @router.get("/{fund_id}/performance", response_model=List[MutualFundPerformance])
 async def read_mutual_fund_performance(
     fund_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get performance data for a specific mutual fund."""
-    performances = get_mutual_fund_performances(db, fund_id=fund_id)
+    performances = get_mutual_fund_nav_series(db, fund_id=fund_id)
     if not performances:
         raise HTTPException(status_code=404, detail="Performance data not found")
-    return performances
+    return ORJSONResponse(performances)
 
 @router.get("/{fund_id}/allocations", response_model=List[SectorAllocation])
 async def read_mutual_fund_allocations(
     fund_id: str,
-    db: Session = Depends(get_db),
+    as_of: Optional[date] = Query(None, alias="date", description="Version in effect on this date, default current"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get sector allocations for a specific mutual fund."""
-    allocations = get_mutual_fund_allocations(db, fund_id=fund_id)
+    """Get sector allocations for a specific mutual fund, current or on a past date."""
+    allocations = get_mutual_fund_allocations(db, fund_id=fund_id, as_of=as_of)
     if not allocations:
         raise HTTPException(status_code=404, detail="Allocation data not found")
     return allocations
@@ -63,11 +137,12 @@ async def read_mutual_fund_allocations(
 @router.get("/{fund_id}/holdings", response_model=List[StockHolding])
 async def read_mutual_fund_holdings(
     fund_id: str,
-    db: Session = Depends(get_db),
+    as_of: Optional[date] = Query(None, alias="date", description="Version in effect on this date, default current"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get stock holdings for a specific mutual fund."""
-    holdings = get_mutual_fund_holdings(db, fund_id=fund_id)
+    """Get stock holdings for a specific mutual fund, current or on a past date."""
+    holdings = get_mutual_fund_holdings(db, fund_id=fund_id, as_of=as_of)
     if not holdings:
         raise HTTPException(status_code=404, detail="Holding data not found")
     return holdings
@@ -75,11 +150,70 @@ async def read_mutual_fund_holdings(
 @router.get("/{fund_id}/cap-allocations", response_model=List[CapAllocation])
 async def read_mutual_fund_cap_allocations(
     fund_id: str,
-    db: Session = Depends(get_db),
+    as_of: Optional[date] = Query(None, alias="date", description="Version in effect on this date, default current"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get market cap allocations for a specific mutual fund."""
-    cap_allocations = get_mutual_fund_cap_allocations(db, fund_id=fund_id)
+    """Get market cap allocations for a specific mutual fund, current or on a past date."""
+    cap_allocations = get_mutual_fund_cap_allocations(db, fund_id=fund_id, as_of=as_of)
     if not cap_allocations:
         raise HTTPException(status_code=404, detail="Cap allocation data not found")
-    return cap_allocations
\ No newline at end of file
+    return cap_allocations
+
+@router.get("/{fund_id}/returns", response_model=ReturnRangeResult)
+async def read_mutual_fund_range_return(
+    fund_id: str,
+    start_date: date = Query(..., description="Start of the period (resolved to the last NAV on or before it)"),
+    end_date: date = Query(..., description="End of the period (resolved to the last NAV on or before it)"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the absolute and annualized return of a mutual fund between two dates."""
+    result = get_range_returns(db, [(fund_id, start_date, end_date)])[0]
+    if result["absolute_return"] is None:
+        raise HTTPException(status_code=404, detail="Performance data not found for this period")
+    return result
+
+@router.get("/{fund_id}/risk", response_model=MutualFundRisk)
+async def read_mutual_fund_risk(
+    fund_id: str,
+    window: str = Query("1Y", pattern="^(1Y|3Y|5Y|MAX)$", description="Look-back window (1Y, 3Y, 5Y, MAX)"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get volatility, Sharpe/Sortino ratios, beta, drawdown and rolling returns for a mutual fund."""
+    risk = get_fund_risk(db, fund_id=fund_id, window=window)
+    if risk is None:
+        raise HTTPException(status_code=404, detail="Performance data not found")
+    return risk
+
+@router.get("/{fund_id}/correlations", response_model=List[FundCorrelation])
+async def read_mutual_fund_correlations(
+    fund_id: str,
+    window: str = Query("1Y", pattern="^(1Y|3Y)$", description="Look-back window (1Y, 3Y)"),
+    limit: int = Query(20, ge=1, le=500, description="Maximum number of funds"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Most (desc) or least (asc) correlated first"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the correlation of a mutual fund's daily returns with the other funds in the universe."""
+    correlations = await run_in_threadpool(
+        get_fund_correlations, db, fund_id=fund_id, window=window, limit=limit, descending=order == "desc"
+    )
+    if correlations is None:
+        raise HTTPException(status_code=404, detail="Performance data not found")
+    return ORJSONResponse(correlations)
+
+@router.get("/{fund_id}/similar", response_model=List[SimilarFund])
+async def read_similar_funds(
+    fund_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results"),
+    min_similarity: float = Query(0.0, ge=0, le=1, description="Minimum estimated holdings similarity (0-1)"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the funds whose current holdings are most similar to a mutual fund's."""
+    similar = get_similar_funds(db, fund_id=fund_id, limit=limit, min_similarity=min_similarity)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Holding data not found")
+    return similar
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Set
+from datetime import date
+import asyncio
 
-from app.db.session import get_db
-from app.schemas.portfolio import PortfolioSummary, PortfolioPerformance, PortfolioComposition, FundOverlap
-from app.services.portfolio import get_portfolio_summary, get_portfolio_performance, get_portfolio_composition, get_fund_overlap
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.routing import get_read_db, read_session_factory
+from app.schemas.portfolio import PortfolioSummary, PortfolioPerformance, PortfolioComposition, CompositionPoint, FundOverlap, PortfolioHolding, PortfolioDashboard
+from app.schemas.mutual_fund import RiskMetrics, CorrelationMatrix
+from app.services.portfolio import get_portfolio_summary, get_portfolio_performance_window, get_portfolio_composition, get_portfolio_composition_history, get_fund_overlap, get_portfolio_holdings, get_portfolio_dashboard, DASHBOARD_SECTIONS, COMPOSITION_FREQUENCIES
+from app.services.risk import get_portfolio_risk
+from app.services.correlation import get_portfolio_correlation
+from app.services.live_updates import portfolio_broker, get_held_fund_ids, format_event
 from app.api.auth import get_current_active_user
+from app.core.responses import ORJSONResponse
 
 router = APIRouter(
     prefix="/portfolio",
@@ -15,39 +26,190 @@ router = APIRouter(
 
 @router.get("/summary", response_model=PortfolioSummary)
 async def read_portfolio_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get summary of the user's portfolio."""
     summary = get_portfolio_summary(db, user_id=current_user.id)
     return summary
 
+def _load_summary(user_id: str) -> dict:
+    db = SessionLocal()
+    try:
+        return get_portfolio_summary(db, user_id=user_id)
+    finally:
+        db.close()
+
+
+async def _summary_events(user_id: str, fund_ids: Set[str]) -> AsyncIterator[str]:
+    """
+    Full summary first, then only the fields that changed whenever the broker wakes
+    the stream; a comment line keeps idle connections alive.
+    """
+    queue = portfolio_broker.subscribe(user_id, fund_ids)
+    last: Optional[dict] = None
+    try:
+        refresh = True
+        while True:
+            if refresh:
+                summary = await run_in_threadpool(_load_summary, user_id)
+                if last is None:
+                    # Every field, None values included, so clients see the full shape
+                    delta = summary
+                else:
+                    delta = {key: value for key, value in summary.items() if key not in last or last[key] != value}
+                if delta:
+                    yield format_event("summary", delta)
+                last = summary
+            try:
+                refresh = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                refresh = False
+                yield ": heartbeat\n\n"
+    finally:
+        portfolio_broker.unsubscribe(user_id, queue)
+
+@router.get("/stream")
+async def stream_portfolio_summary(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stream live portfolio summary updates as server-sent events.
+    Updates are pushed when NAVs land for a held fund or the user's investments change.
+    """
+    user_id = current_user.id
+    fund_ids = get_held_fund_ids(db, user_id)
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.close()
+    return StreamingResponse(
+        _summary_events(user_id, fund_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/dashboard", response_model=PortfolioDashboard)
+async def read_portfolio_dashboard(
+    request: Request,
+    sections: str = Query(",".join(DASHBOARD_SECTIONS), description=f"Comma-separated sections ({', '.join(DASHBOARD_SECTIONS)})"),
+    timeframe: str = Query("1M", description="Timeframe for the performance section (1M, 3M, 6M, 1Y, 3Y, MAX)"),
+    current_user = Depends(get_current_active_user)
+):
+    """Get several portfolio views in one call, computed from a single data load."""
+    selected = {section.strip() for section in sections.split(",") if section.strip()}
+    unknown = selected - set(DASHBOARD_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(sorted(unknown))}")
+    dashboard = await get_portfolio_dashboard(read_session_factory(request), current_user.id, selected, timeframe)
+    return ORJSONResponse(dashboard)
+
+@router.get("/holdings", response_model=List[PortfolioHolding])
+async def read_portfolio_holdings(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the user's holdings per fund, with returns and XIRR."""
+    holdings = get_portfolio_holdings(db, user_id=current_user.id)
+    return holdings
+
 @router.get("/performance", response_model=List[PortfolioPerformance])
 async def read_portfolio_performance(
     timeframe: str = Query("1M", description="Timeframe for performance data (1M, 3M, 6M, 1Y, 3Y, MAX)"),
-    db: Session = Depends(get_db),
+    start_date: Optional[date] = Query(None, description="Start of a custom range (overrides timeframe)"),
+    end_date: Optional[date] = Query(None, description="End of a custom range, default today"),
+    since: Optional[str] = Query(None, description="Only points new or changed since this date or X-Performance-Version"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get performance data for the user's portfolio."""
-    performance = get_portfolio_performance(db, user_id=current_user.id, timeframe=timeframe)
-    return performance
+    """
+    Get performance data for the user's portfolio.
+    The X-Performance-Version header can be passed back as since to poll for changes.
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        performance = get_portfolio_performance_window(
+            db,
+            user_id=current_user.id,
+            timeframe=timeframe,
+            start_date=start_date,
+            end_date=end_date,
+            since=since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Performance-Version": performance["version"]}
+    if performance["reset"]:
+        headers["X-Performance-Reset"] = "true"
+    return ORJSONResponse(performance["points"], headers=headers)
 
 @router.get("/composition", response_model=PortfolioComposition)
 async def read_portfolio_composition(
-    db: Session = Depends(get_db),
+    as_of: Optional[date] = Query(None, alias="date", description="Composition as held on this date, default today"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Get composition details of the user's portfolio."""
-    composition = get_portfolio_composition(db, user_id=current_user.id)
+    """Get composition details of the user's portfolio, today or on a past date."""
+    composition = get_portfolio_composition(db, user_id=current_user.id, as_of=as_of)
     return composition
 
+@router.get("/composition/history", response_model=List[CompositionPoint])
+async def read_portfolio_composition_history(
+    timeframe: str = Query("3Y", description="Timeframe of the series (1M, 3M, 6M, 1Y, 3Y, MAX)"),
+    frequency: str = Query("M", description=f"Point spacing ({', '.join(COMPOSITION_FREQUENCIES)}: month ends or weeks)"),
+    start_date: Optional[date] = Query(None, description="Start of a custom range (overrides timeframe)"),
+    end_date: Optional[date] = Query(None, description="End of the range, default today"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the sector and market cap mix of the user's portfolio over time."""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        history = get_portfolio_composition_history(
+            db,
+            user_id=current_user.id,
+            timeframe=timeframe,
+            frequency=frequency,
+            start_date=start_date,
+            end_date=end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(history)
+
 @router.get("/overlap", response_model=List[FundOverlap])
 async def read_fund_overlap(
     fund_id1: str = Query(..., description="ID of the first mutual fund"),
     fund_id2: Optional[str] = Query(None, description="ID of the second mutual fund (optional)"),
-    db: Session = Depends(get_db),
+    as_of: Optional[date] = Query(None, alias="date", description="Compare the holdings in effect on this date, default current"),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get overlap analysis between mutual funds in the portfolio."""
-    overlap = get_fund_overlap(db, fund_id1=fund_id1, fund_id2=fund_id2)
-    return overlap
\ No newline at end of file
+    overlap = get_fund_overlap(db, fund_id1=fund_id1, fund_id2=fund_id2, as_of=as_of)
+    return overlap
+
+@router.get("/risk", response_model=RiskMetrics)
+async def read_portfolio_risk(
+    window: str = Query("1Y", pattern="^(1Y|3Y|5Y|MAX)$", description="Look-back window (1Y, 3Y, 5Y, MAX)"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get risk metrics for the user's portfolio value series."""
+    risk = get_portfolio_risk(db, user_id=current_user.id, window=window)
+    if risk is None:
+        raise HTTPException(status_code=404, detail="No priced investments in portfolio")
+    return risk
+
+@router.get("/correlation", response_model=CorrelationMatrix)
+async def read_portfolio_correlation(
+    window: str = Query("1Y", pattern="^(1Y|3Y)$", description="Look-back window (1Y, 3Y)"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the correlation and covariance matrices of daily returns between the funds in the portfolio."""
+    correlation = await run_in_threadpool(get_portfolio_correlation, db, user_id=current_user.id, window=window)
+    if correlation is None:
+        raise HTTPException(status_code=404, detail="No priced investments in portfolio")
+    return ORJSONResponse(correlation)
@@ -0,0 +1,250 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import gzip
+import hashlib
+import threading
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Content types worth compressing; streams of events must stay unbuffered
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+_EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def available_encodings() -> List[str]:
+    """Encodings this server can produce, in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, available: List[str]) -> Optional[str]:
+    """Pick the best available encoding from an Accept-Encoding header, honouring q-values"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Compressor:
+    """Incremental compressor with a common interface across encodings"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int, zstd_level: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._obj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so it can be sent right away"""
+        if self.encoding == "gzip":
+            return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.flush(zlib.Z_FINISH)
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class CompressedBodyCache:
+    """
+    LRU of compressed bodies keyed by encoding and a digest of the uncompressed body,
+    bounded by total compressed size. Identical payloads are only compressed once.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, encoding: str, body: bytes, compress: Callable[[bytes], bytes]) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        compressed = compress(body)
+        if len(compressed) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = compressed
+                    self._size += len(compressed)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return compressed
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI response compression with zstd, brotli and gzip, negotiated per request.
+
+    Whole bodies at or above minimum_size are compressed in one go, through a cache
+    of compressed bytes unless the response is marked no-store. Streamed (chunked)
+    bodies are compressed incrementally and flushed per chunk. Event streams,
+    already-encoded and small responses pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        cache_bytes: int = 32 * 1024 * 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        zstd_level: int = 3,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes > 0 else None
+        self.levels = (gzip_level, brotli_quality, zstd_level)
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress_body(self, encoding: str, body: bytes, cacheable: bool) -> bytes:
+        if cacheable and self.cache is not None:
+            return self.cache.get_or_compress(encoding, body, lambda data: self._compress(encoding, data))
+        return self._compress(encoding, body)
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        gzip_level, brotli_quality, zstd_level = self.levels
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+        if encoding == "br":
+            return brotli.compress(body, quality=brotli_quality)
+        return zstandard.ZstdCompressor(level=zstd_level).compress(body)
+
+
+class _CompressionResponder:
+    """Per-request send wrapper that decides, from the first body message, how to encode"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._compressor: Optional[_Compressor] = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self._passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(_COMPRESSIBLE_TYPES)
+                or content_type.startswith(_EXCLUDED_TYPES)
+            )
+            self._cacheable = "no-store" not in headers.get("cache-control", "")
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._begin(start, message)
+            return
+
+        if self._compressor is None:
+            await self._send(message)
+            return
+
+        body = self._compressor.compress(message.get("body", b""))
+        more_body = message.get("more_body", False)
+        if not more_body:
+            body += self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _begin(self, start: Message, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=start["headers"])
+
+        if self._passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+            await self._send(start)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        if not more_body:
+            compressed = self.middleware.compress_body(self.encoding, body, self._cacheable)
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Streaming: length is unknown up front, compress chunk by chunk
+        del headers["Content-Length"]
+        self._compressor = _Compressor(self.encoding, *self.middleware.levels)
+        await self._send(start)
+        await self._send({
+            "type": "http.response.body",
+            "body": self._compressor.compress(body),
+            "more_body": True
+        })
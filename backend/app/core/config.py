@@ -3,7 +3,7 @@ load_dotenv()  # Load environment variables from .env file
 
 import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from secrets import token_urlsafe
 
 class Settings(BaseSettings):
@@ -22,8 +22,43 @@ class Settings(BaseSettings):
     # Connection Pool
     DATABASE_POOL_SIZE: int = 5
     DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: int = 10  # Seconds to wait for a free connection before failing
+    DATABASE_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 30000  # PostgreSQL statement_timeout (0 disables)
+    DATABASE_SLOW_CHECKOUT_MS: float = 50  # Checkout waits counted as slow in pool metrics
+
+    # Read replicas for read-only endpoints (empty: everything goes to the primary)
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5  # Replicas further behind are skipped
+    REPLICA_LAG_CHECK_SECONDS: float = 5  # How often each replica's lag is measured
+    READ_YOUR_WRITES_SECONDS: int = 10  # Reads stay on the primary this long after a client's write
     SQL_ECHO: bool = False
 
+    # Startup
+    CREATE_TABLES_ON_STARTUP: bool = False  # Run python -m app.db.migrate in each worker (single-process development)
+    WARM_CACHES_ON_STARTUP: bool = True  # Preload NAV history and fund reference data before reporting ready
+
+    # Fund search index (rebuilt on fund changes, and at most this old across workers)
+    FUND_SEARCH_INDEX_TTL_SECONDS: int = 300
+
+    # Fund similarity index (funds re-signed after composition changes, and checked at most this often across workers)
+    SIMILARITY_INDEX_TTL_SECONDS: int = 300
+
+    # In-memory caches derived from NAV history (rebuilt after NAV ingest, and at most this old)
+    NAV_CACHE_TTL_SECONDS: int = 300
+
+    # Risk metrics
+    RISK_FREE_RATE: float = 6.5  # Annual percentage used for Sharpe and Sortino ratios
+    RISK_BENCHMARK_FUND_ID: Optional[str] = None  # Equal-weighted fund universe when unset
+
+    # Live portfolio stream (SSE): comment sent on idle connections to keep proxies from closing them
+    SSE_HEARTBEAT_SECONDS: int = 15
+
+    # Response compression (zstd, brotli or gzip, negotiated per request)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_CACHE_BYTES: int = 32 * 1024 * 1024  # Compressed bodies kept for repeat payloads (0 disables)
+
     # CORS (Critical for Docker)
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",         # Local dev
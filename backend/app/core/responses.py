@@ -0,0 +1,24 @@
+from fastapi.responses import JSONResponse
+from typing import Any, List
+import numpy as np
+import orjson
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which also serializes NumPy arrays and scalars.
+
+    Hot list endpoints return it directly with content that is already in response-model
+    shape, skipping per-item validation. Keep response_model on those routes so the
+    OpenAPI schema stays the same.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def column_records(**columns) -> List[dict]:
+    """Zip parallel columns (lists or NumPy arrays) into a list of row dicts"""
+    names = list(columns)
+    values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
@@ -0,0 +1,101 @@
+from sqlalchemy import text
+from typing import Dict, Optional
+import time
+import logging
+
+from app.core.config import settings
+from app.db.migrate import migrate, schema_problems
+from app.db.session import engine, SessionLocal
+from app.services.nav_data import get_nav_arrays
+from app.services.correlation import get_window_returns
+from app.services.fund_search import get_fund_search_index
+from app.services.fund_similarity import get_fund_similarity_index
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """Progress of the startup sequence, read by the readiness probe"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = 0.0
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def step(self, name: str, fn, *args) -> None:
+        started = time.perf_counter()
+        fn(*args)
+        self.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Startup step {name} took {self.timings[name]}ms")
+
+    def report(self) -> dict:
+        return {"ready": self.ready, "timings_ms": self.timings, "error": self.error}
+
+
+startup_state = StartupState()
+
+
+def verify_schema() -> None:
+    """
+    Fail startup when the database lacks tables, columns or indexes of the models; the
+    schema is brought up to date by python -m app.db.migrate, run once before the workers
+    """
+    problems = schema_problems(engine)
+    if problems:
+        raise RuntimeError(f"Database schema is out of date, run python -m app.db.migrate (missing {', '.join(problems)})")
+
+
+def preconnect_pool() -> None:
+    """Open the pool's steady-state connections up front so first requests don't pay for connecting"""
+    size = settings.DATABASE_POOL_SIZE
+    pool_size = getattr(engine.pool, "size", None)
+    if callable(pool_size):
+        size = min(size, pool_size())
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_caches() -> None:
+    """
+    Load the shared NAV history (latest NAVs included), the 1Y daily returns behind the
+    correlation endpoints, the fund search index and the holdings similarity index
+    """
+    db = SessionLocal()
+    try:
+        get_nav_arrays(db)
+        get_window_returns(db, "1Y")
+        get_fund_search_index(db)
+        get_fund_similarity_index(db)
+    finally:
+        db.close()
+
+
+def run_startup_checks() -> None:
+    """Blocking part of startup, run before the server accepts requests"""
+    startup_state.started_at = time.perf_counter()
+    if settings.CREATE_TABLES_ON_STARTUP:
+        startup_state.step("migrate", migrate)
+    startup_state.step("schema", verify_schema)
+    startup_state.step("pool", preconnect_pool)
+
+
+def run_warm_up() -> None:
+    """Background part of startup; the service reports ready once it finishes"""
+    try:
+        if settings.WARM_CACHES_ON_STARTUP:
+            startup_state.step("caches", warm_caches)
+    except Exception as e:
+        # A cold cache only costs latency; still become ready
+        startup_state.error = str(e)
+        logger.exception("Cache warm-up failed")
+    startup_state.timings["startup_total"] = round((time.perf_counter() - startup_state.started_at) * 1000, 1)
+    startup_state.ready = True
+    logger.info(f"Ready {startup_state.timings['startup_total']}ms after startup began")
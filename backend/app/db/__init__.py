@@ -1,3 +1,3 @@
 # Import essential components to make them accessible through the module
-from .models import Base, User, MutualFund, Investment, FundPerformance, FundAllocation, FundHolding, FundCapAllocation
+from .models import Base, User, MutualFund, Investment, FundPerformance, FundSnapshot, FundAllocation, FundHolding, FundCapAllocation, Security, SecurityAlias, Position, FundReturn, PortfolioXirr, PortfolioValuation, ValuationRun
 from .session import get_db
\ No newline at end of file
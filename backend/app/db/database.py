@@ -1,33 +1,176 @@
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from typing import Generator, Optional
+import threading
+import time
 import logging
 
 from app.core.config import settings
 from app.core.exceptions import DatabaseError
+from app.db.models import Base
 
 logger = logging.getLogger(__name__)
 
-# Create a metadata instance
-metadata = MetaData()
+
+class PoolMetrics:
+    """Counters for one engine's connection pool: checkout waits, saturation and connection churn"""
+
+    def __init__(self, slow_checkout_ms: float):
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.slow_checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.peak_checked_out = 0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            if wait_ms >= self.slow_checkout_ms:
+                self.slow_checkouts += 1
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def record_checkout(self, checked_out: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "slow_checkouts": self.slow_checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "peak_checked_out": self.peak_checked_out
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait((time.perf_counter() - started) * 1000, timed_out)
+
+
+def _instrument(engine: Engine, metrics: PoolMetrics) -> None:
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout(engine.pool.checkedout())
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.increment("checkins")
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.increment("connects")
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        metrics.increment("closes")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+
+def create_database_engine(database_url: Optional[str] = None, **overrides) -> Engine:
+    """
+    Create an engine with the configured pool settings and pool metrics.
+
+    Pool size, overflow, timeout, recycle and pre-ping come from settings; PostgreSQL
+    connections also get the configured statement_timeout. Keyword overrides are passed
+    to create_engine. The engine's metrics are available as engine.pool_metrics.
+    """
+    database_url = database_url or settings.DATABASE_URL
+    metrics = PoolMetrics(settings.DATABASE_SLOW_CHECKOUT_MS)
+    options = {
+        "echo": settings.SQL_ECHO,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+    }
+
+    if database_url.startswith("sqlite") and ":memory:" in database_url:
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update({
+            # Subclass per engine so the metrics survive pool.recreate()
+            "poolclass": type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"metrics": metrics}),
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+            "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+        })
+        if database_url.startswith("sqlite"):
+            options["connect_args"] = {"check_same_thread": False}
+        elif database_url.startswith("postgresql") and settings.DATABASE_STATEMENT_TIMEOUT_MS > 0:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT_MS}"}
+
+    options.update(overrides)
+    engine = create_engine(database_url, **options)
+    engine.pool_metrics = metrics
+    _instrument(engine, metrics)
+    return engine
+
+
+def pool_status(engine: Engine) -> dict:
+    """Current pool occupancy, saturation and cumulative metrics"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + pool._max_overflow
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity > 0 else None
+        })
+    metrics = getattr(engine, "pool_metrics", None)
+    if metrics is not None:
+        status["metrics"] = metrics.snapshot()
+    return status
+
 
 # Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.SQL_ECHO,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-)
+engine = create_database_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create declarative base
-Base = declarative_base(metadata=metadata)
-
 
 def get_engine() -> Engine:
     """Returns the database engine instance"""
@@ -76,23 +219,20 @@ class DatabaseManager:
         try:
             # Try to connect and execute a simple query
             with engine.connect() as connection:
-                connection.execute("SELECT 1")
+                connection.execute(text("SELECT 1"))
             logger.info("Database connection successful")
             return True
         except Exception as e:
             logger.exception("Database connection failed")
             raise DatabaseError(detail=f"Failed to connect to database: {str(e)}")
-            
+
     @staticmethod
     def execute_raw_sql(sql: str, params: Optional[dict] = None) -> list:
         """Execute raw SQL query"""
         try:
             with engine.connect() as connection:
-                if params:
-                    result = connection.execute(sql, params)
-                else:
-                    result = connection.execute(sql)
-                return [dict(row) for row in result]
+                result = connection.execute(text(sql), params or {})
+                return [dict(row._mapping) for row in result]
         except Exception as e:
             logger.exception(f"Error executing SQL: {sql}")
-            raise DatabaseError(detail=f"SQL execution failed: {str(e)}")
\ No newline at end of file
+            raise DatabaseError(detail=f"SQL execution failed: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+Bring the database schema and derived tables up to date. Run once per deploy, before
+the API workers start; the workers only verify the schema (see app.core.startup).
+
+    python -m app.db.migrate
+
+Creates missing tables, adds the nullable columns and indexes added to existing tables,
+then backfills the tables derived from older data (positions, trailing returns, holding
+securities and fund snapshots). Every step is a no-op when already done. On PostgreSQL
+the run holds an advisory lock, so concurrent invocations wait for each other instead
+of racing.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import List
+import argparse
+import time
+import logging
+
+from app.db.database import engine
+from app.db.models import Base, FundPerformance, FundReturn, Investment, Position
+from app.services.positions import rebuild_positions
+from app.services.returns import refresh_fund_returns
+from app.services.securities import resolve_holdings
+from app.services.fund_snapshots import backfill_fund_snapshots
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key serializing migrations across processes
+_MIGRATION_LOCK_KEY = 4_201_795_117
+
+# Duplicates that would block unique indexes added to existing tables, removed before creating them
+_DUPLICATES = {
+    "uq_portfolio_xirr_user_fund_date": (
+        "DELETE FROM portfolio_xirr WHERE fund_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM portfolio_xirr WHERE fund_id IS NOT NULL GROUP BY user_id, fund_id, as_of_date)"
+    ),
+    "uq_portfolio_xirr_user_date": (
+        "DELETE FROM portfolio_xirr WHERE fund_id IS NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM portfolio_xirr WHERE fund_id IS NULL GROUP BY user_id, as_of_date)"
+    ),
+}
+
+
+def ensure_schema(bind: Engine = engine) -> None:
+    """Create missing tables, and add the nullable columns and indexes that were added to existing tables"""
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            added = [column for column in table.columns if column.name not in existing and column.nullable]
+            for column in added:
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+            # create_all skips existing tables, so indexes added to their models are created here
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    if index.name in _DUPLICATES:
+                        connection.execute(text(_DUPLICATES[index.name]))
+                    index.create(connection)
+                    logger.info(f"Created index {index.name} on {table.name}")
+
+
+def schema_problems(bind: Engine = engine) -> List[str]:
+    """Tables, columns and indexes of the models that the database lacks"""
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            problems.append(f"table {table.name}")
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        problems.extend(f"column {table.name}.{column.name}" for column in table.columns if column.name not in existing)
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        problems.extend(f"index {index.name}" for index in table.indexes if index.name not in existing_indexes)
+    return problems
+
+
+def backfill_positions(bind: Engine = engine) -> None:
+    """Build the positions table from the investment lots when it is new (empty next to existing lots)"""
+    with Session(bind) as db:
+        if db.query(Position.user_id).first() is None and db.query(Investment.id).first() is not None:
+            written = rebuild_positions(db)
+            db.commit()
+            logger.info(f"Backfilled {written} positions")
+
+
+def backfill_returns(bind: Engine = engine) -> None:
+    """Compute the trailing returns table when it is new (empty next to existing NAVs)"""
+    with Session(bind) as db:
+        if db.query(FundReturn.fund_id).first() is None and db.query(FundPerformance.id).first() is not None:
+            refresh_fund_returns(db)
+
+
+def backfill_securities(bind: Engine = engine) -> None:
+    """Resolve holdings loaded before the securities table existed to securities"""
+    with Session(bind) as db:
+        if resolve_holdings(db):
+            db.commit()
+
+
+def backfill_snapshots(bind: Engine = engine) -> None:
+    """Attach fund compositions loaded before they were versioned to snapshots"""
+    with Session(bind) as db:
+        if backfill_fund_snapshots(db):
+            db.commit()
+
+
+def migrate(bind: Engine = engine) -> None:
+    """Run the schema changes and backfills, holding the migration lock on PostgreSQL"""
+    with bind.connect() as lock:
+        if bind.dialect.name == "postgresql":
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+        try:
+            for step in (ensure_schema, backfill_positions, backfill_returns, backfill_securities, backfill_snapshots):
+                started = time.perf_counter()
+                step(bind)
+                logger.info(f"Migration step {step.__name__} took {(time.perf_counter() - started) * 1000:.1f}ms")
+        finally:
+            if bind.dialect.name == "postgresql":
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+                lock.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and backfill the database schema before starting the API")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    migrate()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey, DateTime, Text, Boolean, JSON, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -34,6 +34,7 @@ class MutualFund(Base):
     # Relationships
     investments = relationship("Investment", back_populates="fund")
     performances = relationship("FundPerformance", back_populates="fund")
+    # Composition rows of every version; read the current one through fund_snapshots.in_effect
     allocations = relationship("FundAllocation", back_populates="fund")
     holdings = relationship("FundHolding", back_populates="fund")
     cap_allocations = relationship("FundCapAllocation", back_populates="fund")
@@ -43,7 +44,7 @@ class Investment(Base):
     __tablename__ = "investments"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"))
+    user_id = Column(String, ForeignKey("users.id"), index=True)
     fund_id = Column(String, ForeignKey("mutual_funds.id"))
     investment_date = Column(Date, nullable=False)
     amount_invested = Column(Float, nullable=False)
@@ -56,8 +57,26 @@ class Investment(Base):
     fund = relationship("MutualFund", back_populates="investments")
 
 
+class Position(Base):
+    """
+    A user's holding of one fund, aggregated over its investment lots. Kept in step with
+    investments by the investment services; app/jobs/reconcile_positions.py checks and rebuilds it.
+    """
+    __tablename__ = "positions"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    fund_id = Column(String, ForeignKey("mutual_funds.id"), primary_key=True)
+    units = Column(Float, nullable=False)
+    invested = Column(Float, nullable=False)
+    first_investment_date = Column(Date, nullable=False)
+    lot_count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class FundPerformance(Base):
     __tablename__ = "fund_performances"
+    # Per-fund date range scans and as-of lookups
+    __table_args__ = (Index("ix_fund_performances_fund_id_date", "fund_id", "date"),)
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     fund_id = Column(String, ForeignKey("mutual_funds.id"))
@@ -69,11 +88,30 @@ class FundPerformance(Base):
     fund = relationship("MutualFund", back_populates="performances")
 
 
+class FundSnapshot(Base):
+    """
+    One version of a fund's composition (holdings, sector and cap allocations), in effect
+    from valid_from until the day before valid_to. A fund's versions don't overlap; the
+    current one has no valid_to. content_hash identifies unchanged compositions.
+    """
+    __tablename__ = "fund_snapshots"
+    # As-of lookups: a fund's versions by start date
+    __table_args__ = (Index("ix_fund_snapshots_fund_id_valid_from", "fund_id", "valid_from"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fund_id = Column(String, ForeignKey("mutual_funds.id"), nullable=False)
+    valid_from = Column(Date, nullable=False)
+    valid_to = Column(Date)  # Exclusive; NULL for the current version
+    content_hash = Column(String)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class FundAllocation(Base):
     __tablename__ = "fund_allocations"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     fund_id = Column(String, ForeignKey("mutual_funds.id"))
+    snapshot_id = Column(Integer, ForeignKey("fund_snapshots.id"), index=True)
     sector = Column(String, nullable=False)
     percentage = Column(Float, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
@@ -82,12 +120,34 @@ class FundAllocation(Base):
     fund = relationship("MutualFund", back_populates="allocations")
 
 
+class Security(Base):
+    """A stock held by funds; holdings reference it by integer id"""
+    __tablename__ = "securities"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    isin = Column(String, unique=True)  # NULL when only a name is known
+    name = Column(String, nullable=False)  # Canonical name
+    sector = Column(String)
+    cap_type = Column(String)  # Large Cap, Mid Cap, Small Cap
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class SecurityAlias(Base):
+    """Normalized name variant (see app.services.securities.normalize_security_name) of a security"""
+    __tablename__ = "security_aliases"
+
+    alias = Column(String, primary_key=True)
+    security_id = Column(Integer, ForeignKey("securities.id"), index=True, nullable=False)
+
+
 class FundHolding(Base):
     __tablename__ = "fund_holdings"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     fund_id = Column(String, ForeignKey("mutual_funds.id"))
-    stock_name = Column(String, nullable=False)
+    snapshot_id = Column(Integer, ForeignKey("fund_snapshots.id"), index=True)
+    stock_name = Column(String, nullable=False)  # As reported by the fund
+    security_id = Column(Integer, ForeignKey("securities.id"), index=True)  # Resolved from stock_name
     percentage = Column(Float, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     
@@ -100,9 +160,75 @@ class FundCapAllocation(Base):
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     fund_id = Column(String, ForeignKey("mutual_funds.id"))
+    snapshot_id = Column(Integer, ForeignKey("fund_snapshots.id"), index=True)
     cap_type = Column(String, nullable=False)  # Large Cap, Mid Cap, Small Cap
     percentage = Column(Float, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
-    fund = relationship("MutualFund", back_populates="cap_allocations")
\ No newline at end of file
+    fund = relationship("MutualFund", back_populates="cap_allocations")
+
+class FundReturn(Base):
+    __tablename__ = "fund_returns"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    fund_id = Column(String, ForeignKey("mutual_funds.id"), unique=True, index=True, nullable=False)
+    as_of_date = Column(Date, nullable=False)
+    one_month = Column(Float)
+    three_month = Column(Float)
+    six_month = Column(Float)
+    one_year = Column(Float)
+    three_year = Column(Float)
+    five_year = Column(Float)
+    since_inception = Column(Float)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    fund = relationship("MutualFund")
+
+
+class PortfolioXirr(Base):
+    __tablename__ = "portfolio_xirr"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), index=True, nullable=False)
+    fund_id = Column(String, ForeignKey("mutual_funds.id"), nullable=True)  # NULL for the whole portfolio
+    as_of_date = Column(Date, index=True, nullable=False)
+    xirr = Column(Float)
+    created_at = Column(DateTime, server_default=func.now())
+
+    # One row per (user, fund, date) and per (user, date) for the portfolio, whose fund_id is NULL
+    __table_args__ = (
+        Index("uq_portfolio_xirr_user_fund_date", user_id, fund_id, as_of_date, unique=True,
+              sqlite_where=fund_id.isnot(None), postgresql_where=fund_id.isnot(None)),
+        Index("uq_portfolio_xirr_user_date", user_id, as_of_date, unique=True,
+              sqlite_where=fund_id.is_(None), postgresql_where=fund_id.is_(None)),
+    )
+
+
+class PortfolioValuation(Base):
+    __tablename__ = "portfolio_valuations"
+    __table_args__ = (UniqueConstraint("user_id", "as_of_date", name="uq_portfolio_valuations_user_date"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    as_of_date = Column(Date, index=True, nullable=False)
+    current_value = Column(Float, nullable=False)
+    initial_investment = Column(Float, nullable=False)
+    total_return = Column(Float, nullable=False)
+    return_percentage = Column(Float, nullable=False)
+    sector_allocations = Column(JSON)  # {sector: percentage}
+    cap_allocations = Column(JSON)  # {cap_type: percentage}
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class ValuationRun(Base):
+    __tablename__ = "valuation_runs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    as_of_date = Column(Date, unique=True, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running, completed
+    last_user_id = Column(String)  # Checkpoint: every user up to this id is written
+    users_processed = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, server_default=func.now())
+    completed_at = Column(DateTime)
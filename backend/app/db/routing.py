@@ -0,0 +1,232 @@
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Callable, Dict, Generator, List, Optional
+import hashlib
+import threading
+import time
+import logging
+
+from app.core.config import settings
+from app.db.database import SessionLocal, create_database_engine
+
+logger = logging.getLogger(__name__)
+
+# Cookie carrying the time until which a client's reads stay on the primary
+PRIMARY_COOKIE = "db_primary_until"
+
+# request.state attribute set once a request's primary session commits a write
+WROTE_PRIMARY = "wrote_primary"
+
+# Replication delay in seconds; 0 when the replica has replayed everything it received
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """One read replica engine with its last measured lag, refreshed at most every check_interval"""
+
+    def __init__(self, url: str, engine: Engine):
+        self.url = url
+        self.engine = engine
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def measure(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(connection.execute(_POSTGRES_LAG_SQL).scalar() or 0)
+                else:
+                    # Stand-in replicas (e.g. a second SQLite file) have no replication to lag behind
+                    connection.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.error = None
+        except Exception as e:
+            self.lag_seconds = None
+            self.error = str(e)
+            logger.warning(f"Replica {self.engine.url.render_as_string(hide_password=True)} unavailable: {e}")
+        self.checked_at = time.monotonic()
+
+    def due(self, check_interval: float) -> bool:
+        return self.checked_at is None or time.monotonic() - self.checked_at > check_interval
+
+    def usable(self, max_lag_seconds: float, check_interval: float) -> bool:
+        if self.due(check_interval):
+            with self._lock:
+                if self.due(check_interval):
+                    self.measure()
+        return self.error is None and self.lag_seconds is not None and self.lag_seconds <= max_lag_seconds
+
+
+class ReplicaRouter:
+    """
+    Round-robin over read replicas, skipping any that are unreachable or lag more than
+    max_lag_seconds. pick() returns None when no replica is usable, meaning "use the primary".
+    """
+
+    def __init__(self, urls: List[str], max_lag_seconds: float, check_interval: float):
+        self.replicas = [Replica(url, create_database_engine(url)) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def pick(self) -> Optional[Engine]:
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+            if replica.usable(self.max_lag_seconds, self.check_interval):
+                return replica.engine
+        return None
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "lag_seconds": replica.lag_seconds,
+                "error": replica.error,
+                "usable": replica.error is None and replica.lag_seconds is not None
+                and replica.lag_seconds <= self.max_lag_seconds
+            }
+            for replica in self.replicas
+        ]
+
+
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_LAG_CHECK_SECONDS,
+)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+class _RecentWriters:
+    """Clients (by credentials) that wrote recently, for workers that never saw their cookie"""
+
+    def __init__(self):
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: str, until: float) -> None:
+        with self._lock:
+            self._until[key] = until
+            if len(self._until) > 10000:
+                now = time.time()
+                self._until = {k: v for k, v in self._until.items() if v > now}
+
+    def active(self, key: str) -> bool:
+        return self._until.get(key, 0.0) > time.time()
+
+
+_recent_writers = _RecentWriters()
+
+
+def _client_key(headers: Headers) -> Optional[str]:
+    authorization = headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha1(authorization.encode()).hexdigest()
+
+
+def prefers_primary(request: Request) -> bool:
+    """True while the client is inside the read-your-writes window after its own write"""
+    try:
+        if float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    key = _client_key(request.headers)
+    return key is not None and _recent_writers.active(key)
+
+
+def read_session(request: Request) -> Session:
+    """A session for read-only work: a usable replica, or the primary when sticky or none is usable"""
+    engine = None if prefers_primary(request) else replica_router.pick()
+    if engine is None:
+        return SessionLocal()
+    return ReadSessionLocal(bind=engine)
+
+
+def read_session_factory(request: Request) -> Callable[[], Session]:
+    """Session factory for read-only work spread over several sessions in one request"""
+    return lambda: read_session(request)
+
+
+# Dependency to get a read-only DB session
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def track_writes(db: Session, request: Request) -> Session:
+    """Have db flag the request as a writer once it commits changes, for PrimaryStickinessMiddleware"""
+    db.info["request_state"] = request.state
+    return db
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session: Session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session: Session) -> None:
+    if session.info.pop("wrote", False) and "request_state" in session.info:
+        setattr(session.info["request_state"], WROTE_PRIMARY, True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+class PrimaryStickinessMiddleware:
+    """
+    After a request that committed a write through a tracked session (see track_writes), keep
+    that client's reads on the primary for READ_YOUR_WRITES_SECONDS: a cookie covers every
+    worker, and an in-process record keyed by credentials covers clients that don't send
+    cookies back. Read-only requests don't stick, whatever their method.
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: int):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not replica_router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and scope.get("state", {}).get(WROTE_PRIMARY):
+                until = time.time() + self.window_seconds
+                key = _client_key(Headers(scope=scope))
+                if key is not None:
+                    _recent_writers.mark(key, until)
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_COOKIE}={until:.0f}; Max-Age={self.window_seconds}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,20 +1,14 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
-
-# Create SQLAlchemy engine
-engine = create_engine(settings.DATABASE_URL)
-
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from starlette.requests import Request
+from app.db.database import engine, SessionLocal
+from app.db.routing import track_writes
 
 # Create Base class
 Base = declarative_base()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+# Dependency to get DB session; its committed writes keep the client's reads on the primary
+def get_db(request: Request):
+    db = track_writes(SessionLocal(), request)
     try:
         yield db
     finally:
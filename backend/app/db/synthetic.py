@@ -0,0 +1,456 @@
+"""
+Synthetic dataset generator for load tests and benchmarks.
+
+Generates funds with correlated daily NAV random walks, a stock universe with per-fund
+holdings (and sector/cap allocations derived from them), and users with investment lots
+in popular funds. Everything derives from one seed through independent random streams,
+so a given spec always produces the same rows regardless of chunk sizes. The NAV history
+ends today unless an end date is given, so reproducing a dataset needs the seed and
+the end date it was generated with. Rows are
+streamed to the database in chunks: COPY on PostgreSQL, multi-row inserts elsewhere.
+
+    python -m app.db.synthetic --funds 10000 --years 20 --users 1000000 --seed 7 --end-date 2024-12-31
+"""
+from sqlalchemy import Table, bindparam, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date
+import argparse
+import csv
+import io
+import itertools
+import numpy as np
+import time
+import logging
+
+from app.core.security import get_password_hash
+from app.db.models import (
+    User, MutualFund, Investment, FundPerformance, FundAllocation, FundHolding, FundCapAllocation, Security
+)
+from app.services.positions import rebuild_positions
+from app.services.fund_snapshots import backfill_fund_snapshots
+from app.services.securities import resolve_security_names
+from app.services.returns import refresh_fund_returns
+
+logger = logging.getLogger(__name__)
+
+# (fund_type, fund_category, annual drift, annual volatility, market beta)
+_CATEGORIES = [
+    ("Equity", "Large Cap", 0.11, 0.17, 0.95),
+    ("Equity", "Mid Cap", 0.13, 0.22, 0.85),
+    ("Equity", "Small Cap", 0.15, 0.28, 0.75),
+    ("Equity", "Flexi Cap", 0.12, 0.19, 0.90),
+    ("Equity", "Sectoral", 0.12, 0.26, 0.60),
+    ("Hybrid", "Balanced Advantage", 0.09, 0.10, 0.70),
+    ("Debt", "Short Duration", 0.065, 0.02, 0.10),
+    ("Debt", "Liquid", 0.055, 0.005, 0.0),
+]
+_FUND_HOUSES = [
+    "ICICI Prudential", "HDFC", "SBI", "Axis", "Mirae Asset", "Kotak", "Nippon India",
+    "Aditya Birla Sun Life", "UTI", "DSP", "Franklin Templeton", "Tata", "Parag Parikh", "Quant"
+]
+_SECTORS = [
+    "Financials", "IT", "Energy/Conglomerate", "Industrials", "Consumer", "Healthcare",
+    "Materials", "Utilities", "Telecom", "Automobile"
+]
+# Cap buckets by company rank: the first 10% of the universe is large cap, the next 20% mid cap
+_CAP_TYPES = ["Large Cap", "Mid Cap", "Small Cap"]
+_CAP_SHARES = [0.1, 0.2, 0.7]
+# How strongly each fund category prefers each cap bucket when picking stocks
+_CAP_PREFERENCE = {
+    "Large Cap": (1.0, 0.15, 0.02),
+    "Mid Cap": (0.2, 1.0, 0.2),
+    "Small Cap": (0.05, 0.3, 1.0),
+}
+_DEFAULT_CAP_PREFERENCE = (1.0, 0.5, 0.3)
+
+# Independent random streams, so e.g. changing the user count leaves the funds untouched
+_STREAM_FUNDS, _STREAM_NAVS, _STREAM_STOCKS, _STREAM_HOLDINGS, _STREAM_USERS, _STREAM_LOTS, _STREAM_IDS = range(7)
+
+# Fraction of funds that closely track an earlier fund (index funds, clone schemes)
+_CLONE_FRACTION = 0.05
+# Fraction of funds launched after the start of the history
+_LATE_LAUNCH_FRACTION = 0.3
+_TRADING_DAYS = 252
+
+
+class SyntheticSpec:
+    """
+    Size and shape of a synthetic dataset. end_date defaults to today, keeping the history
+    current for date-relative views; pass it explicitly for a reproducible dataset.
+    """
+
+    def __init__(
+        self,
+        funds: int = 100,
+        years: int = 5,
+        users: int = 1000,
+        lots_per_user: float = 5.0,
+        holdings_per_fund: int = 40,
+        stocks: int = 2000,
+        seed: int = 42,
+        end_date: Optional[date] = None,
+        password: str = "password123",
+    ):
+        self.funds = funds
+        self.years = years
+        self.users = users
+        self.lots_per_user = lots_per_user
+        self.holdings_per_fund = min(holdings_per_fund, stocks)
+        self.stocks = stocks
+        self.seed = seed
+        self.end_date = end_date or date.today()
+        self.password = password
+
+    def rng(self, stream: int, *keys: int) -> np.random.Generator:
+        """A generator for one stream (and optionally one fund/user within it)"""
+        return np.random.default_rng([self.seed, stream, *keys])
+
+    def isn(self, fund_index: int) -> str:
+        return f"SYN{self.seed:05d}{fund_index:07d}"
+
+    def email(self, user_index: int) -> str:
+        return f"user{user_index}@seed{self.seed}.synthetic.example"
+
+
+def _uuid_stream(rng: np.random.Generator, block: int = 65536) -> Iterator[str]:
+    """Endless version 4 UUID strings drawn from rng"""
+    while True:
+        raw = np.frombuffer(rng.bytes(16 * block), dtype=np.uint8).reshape(block, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        text = raw.tobytes().hex()
+        for i in range(0, block * 32, 32):
+            h = text[i:i + 32]
+            yield f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def business_days(spec: SyntheticSpec) -> np.ndarray:
+    """Weekdays covering spec.years up to spec.end_date, as datetime64[D]"""
+    end = spec.end_date
+    start = date(end.year - spec.years, end.month, min(end.day, 28))
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days)]
+
+
+class SyntheticFunds:
+    """Per-fund attributes as parallel arrays, indexed by fund number"""
+
+    def __init__(self, spec: SyntheticSpec, n_days: int):
+        n = spec.funds
+        rng = spec.rng(_STREAM_FUNDS)
+        self.ids = list(itertools.islice(_uuid_stream(spec.rng(_STREAM_IDS, 0)), n))
+        self.category = rng.integers(len(_CATEGORIES), size=n)
+        self.house = rng.integers(len(_FUND_HOUSES), size=n)
+        self.inception = np.where(
+            rng.random(n) < _LATE_LAUNCH_FRACTION, (rng.random(n) * n_days * 0.8).astype(np.int64), 0
+        )
+        self.start_nav = np.round(rng.uniform(10, 100, size=n), 4)
+
+        # Clones copy an earlier, original fund's category, shocks and holdings
+        self.clone_of = np.full(n, -1, dtype=np.int64)
+        clones = np.flatnonzero(rng.random(n) < _CLONE_FRACTION)
+        for i in clones[clones > 0]:
+            parent = int(rng.integers(i))
+            while self.clone_of[parent] >= 0:
+                parent = int(self.clone_of[parent])
+            self.clone_of[i] = parent
+            self.category[i] = self.category[parent]
+            self.inception[i] = max(self.inception[i], self.inception[parent])
+
+        self.names = []
+        for i in range(n):
+            fund_type, category = _CATEGORIES[self.category[i]][:2]
+            kind = "Index Fund" if self.clone_of[i] >= 0 else "Fund"
+            self.names.append(f"{_FUND_HOUSES[self.house[i]]} {category} {kind} {i + 1}")
+
+    def rows(self, spec: SyntheticSpec) -> Iterator[tuple]:
+        for i, fund_id in enumerate(self.ids):
+            fund_type, category = _CATEGORIES[self.category[i]][:2]
+            yield fund_id, self.names[i], spec.isn(i), fund_type, category, _FUND_HOUSES[self.house[i]]
+
+
+def _shocks(spec: SyntheticSpec, funds: SyntheticFunds, market: np.ndarray, i: int) -> np.ndarray:
+    """Standard normal daily shocks of fund i: market factor plus its own noise"""
+    parent = funds.clone_of[i]
+    own = spec.rng(_STREAM_NAVS, i).standard_normal(len(market))
+    if parent >= 0:
+        # Tracking error around the original fund
+        return _shocks(spec, funds, market, parent) + 0.05 * own
+    beta = _CATEGORIES[funds.category[i]][4]
+    return beta * market + np.sqrt(1 - beta ** 2) * own
+
+
+def nav_path(spec: SyntheticSpec, funds: SyntheticFunds, market: np.ndarray, i: int) -> np.ndarray:
+    """Daily NAVs of fund i from its inception (geometric random walk)"""
+    _, _, drift, volatility, _ = _CATEGORIES[funds.category[i]]
+    dt = 1 / _TRADING_DAYS
+    log_returns = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * _shocks(spec, funds, market, i)
+    log_returns = log_returns[funds.inception[i]:]
+    log_returns[0] = 0.0
+    return np.round(funds.start_nav[i] * np.exp(np.cumsum(log_returns)), 4)
+
+
+class SyntheticStocks:
+    """Stock universe, ordered from largest to smallest company"""
+
+    def __init__(self, spec: SyntheticSpec):
+        rng = spec.rng(_STREAM_STOCKS)
+        n = spec.stocks
+        self.names = [f"Synthetic Stock {i + 1:05d} Ltd" for i in range(n)]
+        self.sector = rng.integers(len(_SECTORS), size=n)
+        bounds = np.cumsum(_CAP_SHARES) * n
+        self.cap = np.searchsorted(bounds, np.arange(n), side="right").clip(0, len(_CAP_TYPES) - 1)
+        # Bigger companies are held by more funds
+        self.popularity = 1.0 / (np.arange(n) + 1) ** 0.6
+
+
+def load_securities(engine: Engine, stocks: SyntheticStocks) -> List[int]:
+    """
+    Security id of every stock in the universe. Stocks are resolved by name, so seeds
+    sharing a database share securities; new ones get the universe's sector and cap.
+    """
+    with Session(engine) as db:
+        resolved = resolve_security_names(db, stocks.names)
+        security_ids = [resolved[name] for name in stocks.names]
+        table = Security.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("security_id"), table.c.sector.is_(None))
+            .values(sector=bindparam("new_sector"), cap_type=bindparam("new_cap_type")),
+            [
+                {"security_id": security_id, "new_sector": _SECTORS[sector], "new_cap_type": _CAP_TYPES[cap]}
+                for security_id, sector, cap in zip(security_ids, stocks.sector.tolist(), stocks.cap.tolist())
+            ]
+        )
+        db.commit()
+    return security_ids
+
+
+def fund_holdings(spec: SyntheticSpec, funds: SyntheticFunds, stocks: SyntheticStocks,
+                  i: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(stock indices, percentages of NAV) held by fund i"""
+    rng = spec.rng(_STREAM_HOLDINGS, i)
+    parent = funds.clone_of[i]
+    if parent >= 0:
+        picked, weights = fund_holdings(spec, funds, stocks, parent)
+        weights = weights * (1 + 0.05 * rng.standard_normal(len(weights))).clip(0.5, 1.5)
+        return picked, np.maximum(np.round(weights, 2), 0.01)
+
+    category = _CATEGORIES[funds.category[i]][1]
+    preference = np.array(_CAP_PREFERENCE.get(category, _DEFAULT_CAP_PREFERENCE))
+    p = stocks.popularity * preference[stocks.cap]
+    picked = rng.choice(spec.stocks, size=spec.holdings_per_fund, replace=False, p=p / p.sum())
+    # The remainder of NAV sits in cash
+    invested = rng.uniform(92, 99)
+    weights = np.sort(rng.dirichlet(np.full(len(picked), 0.8)))[::-1] * invested
+    return picked, np.maximum(np.round(weights, 2), 0.01)
+
+
+def _allocation(labels: np.ndarray, weights: np.ndarray, names: List[str]) -> List[Tuple[str, float]]:
+    """Weights summed per label and rescaled to 100%"""
+    totals = np.bincount(labels, weights=weights, minlength=len(names))
+    totals = totals / totals.sum() * 100 if totals.sum() > 0 else totals
+    return [(names[k], round(float(totals[k]), 2)) for k in np.flatnonzero(totals)]
+
+
+class SyntheticLots:
+    """Investment lots as parallel arrays, sorted by user"""
+
+    def __init__(self, spec: SyntheticSpec, funds: SyntheticFunds, n_days: int):
+        rng = spec.rng(_STREAM_LOTS)
+        counts = np.maximum(rng.poisson(spec.lots_per_user, size=spec.users), 1)
+        self.user = np.repeat(np.arange(spec.users), counts)
+        n = len(self.user)
+
+        # Zipf-like fund popularity over a random ranking of the funds
+        rank = rng.permutation(spec.funds)
+        popularity = 1.0 / (rank + 1) ** 0.8
+        self.fund = rng.choice(spec.funds, size=n, p=popularity / popularity.sum())
+        inception = funds.inception[self.fund]
+        self.day = np.minimum(inception + (rng.random(n) * (n_days - inception)).astype(np.int64), n_days - 1)
+        self.amount = np.maximum(np.round(rng.lognormal(np.log(10000), 1.0, size=n) / 500) * 500, 500)
+        self.nav = np.full(n, np.nan)
+
+        # Lots grouped by fund, so each fund's NAV path fills its lots as it is generated
+        self._by_fund = np.argsort(self.fund, kind="stable")
+        self._fund_bounds = np.searchsorted(self.fund[self._by_fund], np.arange(spec.funds + 1))
+
+    def fill_navs(self, fund_index: int, inception: int, path: np.ndarray) -> None:
+        lots = self._by_fund[self._fund_bounds[fund_index]:self._fund_bounds[fund_index + 1]]
+        self.nav[lots] = path[self.day[lots] - inception]
+
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkLoader:
+    """Appends rows to tables chunk by chunk: COPY on PostgreSQL, executemany inserts elsewhere"""
+
+    def __init__(self, engine: Engine, chunk_rows: int = 100000):
+        self.engine = engine
+        self.chunk_rows = chunk_rows
+        self.use_copy = engine.dialect.name == "postgresql"
+        self.counts: Dict[str, int] = {}
+
+    def load(self, table: Table, columns: List[str], rows: Iterable[tuple]) -> int:
+        total = 0
+        for chunk in _chunks(rows, self.chunk_rows):
+            if self.use_copy:
+                self._copy(table, columns, chunk)
+            else:
+                with self.engine.begin() as connection:
+                    connection.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+            total += len(chunk)
+        self.counts[table.name] = self.counts.get(table.name, 0) + total
+        logger.info(f"Loaded {total} rows into {table.name}")
+        return total
+
+    def _copy(self, table: Table, columns: List[str], rows: List[tuple]) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+
+    def analyze(self) -> None:
+        """Refresh planner statistics after a bulk load (PostgreSQL)"""
+        if self.use_copy:
+            connection = self.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                for name in self.counts:
+                    cursor.execute(f"ANALYZE {name}")
+                cursor.close()
+                connection.commit()
+            finally:
+                connection.close()
+
+
+def generate(engine: Engine, spec: SyntheticSpec, chunk_rows: int = 100000, refresh_returns: bool = True) -> dict:
+    """
+    Generate and load a synthetic dataset into an existing schema.
+
+    Raises ValueError if this seed's funds are already loaded; different seeds can
+    share a database. Returns row counts per table and the elapsed time.
+    """
+    started = time.perf_counter()
+    with Session(engine) as db:
+        if db.query(MutualFund.id).filter(MutualFund.isn == spec.isn(0)).first() is not None:
+            raise ValueError(f"Synthetic data for seed {spec.seed} is already loaded")
+
+    days = business_days(spec)
+    day_dates = days.astype(object).tolist()
+    market = spec.rng(_STREAM_NAVS).standard_normal(len(days))
+    funds = SyntheticFunds(spec, len(days))
+    stocks = SyntheticStocks(spec)
+    lots = SyntheticLots(spec, funds, len(days))
+    loader = BulkLoader(engine, chunk_rows)
+    ids = _uuid_stream(spec.rng(_STREAM_IDS, 1))
+
+    loader.load(MutualFund.__table__, ["id", "name", "isn", "fund_type", "fund_category", "fund_house"],
+                funds.rows(spec))
+
+    def nav_rows() -> Iterator[tuple]:
+        for i, fund_id in enumerate(funds.ids):
+            inception = int(funds.inception[i])
+            path = nav_path(spec, funds, market, i)
+            lots.fill_navs(i, inception, path)
+            yield from zip(ids, itertools.repeat(fund_id), day_dates[inception:], path.tolist())
+
+    loader.load(FundPerformance.__table__, ["id", "fund_id", "date", "nav"], nav_rows())
+
+    security_ids = load_securities(engine, stocks)
+    holdings, sectors, caps = [], [], []
+    for i, fund_id in enumerate(funds.ids):
+        picked, weights = fund_holdings(spec, funds, stocks, i)
+        holdings.extend(
+            (next(ids), fund_id, stocks.names[k], security_ids[k], float(w))
+            for k, w in zip(picked.tolist(), weights.tolist())
+        )
+        sectors.extend(
+            (next(ids), fund_id, label, w) for label, w in _allocation(stocks.sector[picked], weights, _SECTORS)
+        )
+        caps.extend(
+            (next(ids), fund_id, label, w) for label, w in _allocation(stocks.cap[picked], weights, _CAP_TYPES)
+        )
+    loader.load(FundHolding.__table__, ["id", "fund_id", "stock_name", "security_id", "percentage"], holdings)
+    loader.load(FundAllocation.__table__, ["id", "fund_id", "sector", "percentage"], sectors)
+    loader.load(FundCapAllocation.__table__, ["id", "fund_id", "cap_type", "percentage"], caps)
+    del holdings, sectors, caps
+
+    # One shared hash: hashing a million passwords would dominate the load
+    password_hash = get_password_hash(spec.password)
+    user_ids = list(itertools.islice(_uuid_stream(spec.rng(_STREAM_USERS)), spec.users))
+    loader.load(
+        User.__table__, ["id", "email", "full_name", "password_hash", "is_active"],
+        ((user_id, spec.email(i), f"Synthetic User {i + 1}", password_hash, True) for i, user_id in enumerate(user_ids))
+    )
+
+    lot_dates = (day_dates[d] for d in lots.day.tolist())
+    loader.load(
+        Investment.__table__,
+        ["id", "user_id", "fund_id", "investment_date", "amount_invested", "nav_at_investment", "units"],
+        (
+            (next(ids), user_ids[u], funds.ids[f], d, amount, nav, round(amount / nav, 4))
+            for u, f, d, amount, nav in zip(lots.user.tolist(), lots.fund.tolist(), lot_dates,
+                                           lots.amount.tolist(), lots.nav.tolist())
+        )
+    )
+    with Session(engine) as db:
+        loader.counts["positions"] = rebuild_positions(db)
+        loader.counts["fund_snapshots"] = backfill_fund_snapshots(db)
+        db.commit()
+    loader.analyze()
+
+    if refresh_returns:
+        with Session(engine) as db:
+            for start in range(0, spec.funds, 1000):
+                refresh_fund_returns(db, funds.ids[start:start + 1000])
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Synthetic dataset (seed {spec.seed}, end date {spec.end_date}) loaded in {elapsed:.1f}s: {loader.counts}")
+    return {"rows": dict(loader.counts), "seconds": elapsed}
+
+
+if __name__ == "__main__":
+    from app.db.database import engine
+    from app.db.models import Base
+
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic dataset for load tests")
+    parser.add_argument("--funds", type=int, default=100, help="Number of funds")
+    parser.add_argument("--years", type=int, default=5, help="Years of daily NAV history")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users")
+    parser.add_argument("--lots-per-user", type=float, default=5.0, help="Mean investment lots per user")
+    parser.add_argument("--holdings-per-fund", type=int, default=40, help="Stocks held by each fund")
+    parser.add_argument("--stocks", type=int, default=2000, help="Size of the stock universe")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed and end date reproduce the same data")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Last NAV date (YYYY-MM-DD), default today; set it to reproduce a dataset")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="Rows per COPY/insert batch")
+    parser.add_argument("--skip-returns", action="store_true", help="Don't precompute trailing returns")
+    parser.add_argument("--create-tables", action="store_true", help="Create missing tables first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.create_tables:
+        Base.metadata.create_all(bind=engine)
+    spec = SyntheticSpec(
+        funds=args.funds, years=args.years, users=args.users, lots_per_user=args.lots_per_user,
+        holdings_per_fund=args.holdings_per_fund, stocks=args.stocks, seed=args.seed, end_date=args.end_date
+    )
+    stats = generate(engine, spec, chunk_rows=args.chunk_rows, refresh_returns=not args.skip_returns)
+    for table, count in stats["rows"].items():
+        print(f"{table:24} {count:>12}")
+    print(f"Loaded in {stats['seconds']:.1f}s")
@@ -0,0 +1 @@
+# Batch jobs, runnable as modules (python -m app.jobs.<name>)
@@ -0,0 +1,39 @@
+from sqlalchemy.orm import Session
+from typing import Iterator, List, Optional, Tuple
+from datetime import date
+
+from app.db.models import Investment
+
+
+def iter_investment_pages(
+    db: Session,
+    columns: tuple,
+    users_per_page: int,
+    after_user_id: Optional[str] = None,
+    on_or_before: Optional[date] = None,
+) -> Iterator[Tuple[str, List[tuple]]]:
+    """
+    Stream investment lots ordered by user, a page of users at a time.
+
+    Pages are cut on user boundaries with keyset pagination on user_id, so no cursor stays
+    open across commits and a job can restart after the last user it finished.
+    With on_or_before, only lots invested on or before that date are read.
+    Yields (last user id of the page, rows) where rows are the requested columns.
+    """
+    while True:
+        page = db.query(Investment.user_id).distinct()
+        if on_or_before is not None:
+            page = page.filter(Investment.investment_date <= on_or_before)
+        if after_user_id is not None:
+            page = page.filter(Investment.user_id > after_user_id)
+        user_ids = [user_id for (user_id,) in page.order_by(Investment.user_id).limit(users_per_page)]
+        if not user_ids:
+            return
+
+        lots = db.query(Investment.user_id, *columns).filter(Investment.user_id <= user_ids[-1])
+        if on_or_before is not None:
+            lots = lots.filter(Investment.investment_date <= on_or_before)
+        if after_user_id is not None:
+            lots = lots.filter(Investment.user_id > after_user_id)
+        yield user_ids[-1], lots.order_by(Investment.user_id).all()
+        after_user_id = user_ids[-1]
@@ -0,0 +1,51 @@
+"""
+Bulk-import a user's investment lots from a CSV file or a consolidated account statement export.
+
+    python -m app.jobs.import_investments --email user@example.com --file lots.csv
+    python -m app.jobs.import_investments --email user@example.com --file cas.json --format cas_json --dry-run
+"""
+import argparse
+import json
+import logging
+import sys
+
+from app.db.models import User
+from app.services.investment_import import import_investments, iter_cas_json_lots, iter_csv_lots
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import investment lots for one user")
+    parser.add_argument("--email", required=True, help="User to import the lots for")
+    parser.add_argument("--file", required=True, help="CSV file or statement export")
+    parser.add_argument("--format", choices=["csv", "cas_json"], default="csv", help="File format")
+    parser.add_argument("--strict", action="store_true", help="Import nothing if any row has an error")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report without importing")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Also import lots identical to held ones")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Lots per insert statement")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            sys.exit(f"No user with email {args.email}")
+        with open(args.file, encoding="utf-8-sig", newline="") as f:
+            rows = iter_cas_json_lots(json.load(f)) if args.format == "cas_json" else iter_csv_lots(f)
+            report = import_investments(
+                db, user.id, rows, strict=args.strict, dry_run=args.dry_run,
+                skip_duplicates=not args.keep_duplicates, batch_size=args.batch_size
+            )
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+    action = "Would import" if report["dry_run"] else "Imported"
+    print(
+        f"{action} {report['imported']} lots: "
+        f"{report['duplicates']} duplicates, {report['skipped']} skipped, {report['error_count']} errors"
+    )
+    if report["error_count"]:
+        sys.exit(1)
@@ -0,0 +1,153 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date
+import argparse
+import numpy as np
+import time
+import logging
+
+from app.db.models import Investment, PortfolioXirr
+from app.jobs.batching import iter_investment_pages
+from app.services.mutual_fund import get_latest_navs
+from app.services.xirr import solve_cash_flows
+
+logger = logging.getLogger(__name__)
+
+
+class _Chunk:
+    """Investment lots of a group of users, buffered as flat columns"""
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self.pairs: Dict[Tuple[str, str], int] = {}
+        self.lot_users: List[int] = []
+        self.lot_pairs: List[int] = []
+        self.ordinals: List[int] = []
+        self.amounts: List[float] = []
+        self.values: List[float] = []
+
+    def add(self, user_id: str, fund_id: str, investment_date: date, amount: float, value: float):
+        if not self.user_ids or self.user_ids[-1] != user_id:
+            self.user_ids.append(user_id)
+        pair = self.pairs.setdefault((user_id, fund_id), len(self.pairs))
+        self.lot_users.append(len(self.user_ids) - 1)
+        self.lot_pairs.append(pair)
+        self.ordinals.append(investment_date.toordinal())
+        self.amounts.append(amount)
+        self.values.append(value)
+
+    def solve(self, as_of: date) -> List[dict]:
+        """
+        One XIRR per user (whole portfolio) and per (user, fund) holding,
+        all solved together as a single batch.
+        """
+        n_users, n_pairs = len(self.user_ids), len(self.pairs)
+        lot_users = np.array(self.lot_users, dtype=np.int64)
+        lot_pairs = np.array(self.lot_pairs, dtype=np.int64) + n_users
+        ordinals = np.array(self.ordinals, dtype=np.int64)
+        amounts = np.array(self.amounts, dtype=np.float64)
+        values = np.array(self.values, dtype=np.float64)
+
+        # Sets 0..n_users-1 are portfolios, the rest are holdings
+        n_sets = n_users + n_pairs
+        terminal = np.bincount(lot_users, values, minlength=n_sets) + np.bincount(lot_pairs, values, minlength=n_sets)
+        set_codes = np.concatenate((lot_users, lot_pairs, np.arange(n_sets)))
+        flow_ordinals = np.concatenate((ordinals, ordinals, np.full(n_sets, as_of.toordinal())))
+        flow_amounts = np.concatenate((-amounts, -amounts, terminal))
+
+        rates = solve_cash_flows(set_codes, flow_ordinals, flow_amounts, n_sets) * 100
+
+        rows = []
+        for code, user_id in enumerate(self.user_ids):
+            rows.append({"user_id": user_id, "fund_id": None, "as_of_date": as_of, "xirr": rates[code]})
+        for (user_id, fund_id), pair in self.pairs.items():
+            rows.append({"user_id": user_id, "fund_id": fund_id, "as_of_date": as_of, "xirr": rates[n_users + pair]})
+        for row in rows:
+            row["xirr"] = None if np.isnan(row["xirr"]) else float(row["xirr"])
+        return rows
+
+
+def _replace_rows(db: Session, as_of: date, after_user_id: Optional[str], last_user_id: Optional[str], rows: List[dict]) -> None:
+    """Swap the as_of rows of users in (after_user_id, last_user_id] for rows and commit"""
+    stale = db.query(PortfolioXirr).filter(PortfolioXirr.as_of_date == as_of)
+    if after_user_id is not None:
+        stale = stale.filter(PortfolioXirr.user_id > after_user_id)
+    if last_user_id is not None:
+        stale = stale.filter(PortfolioXirr.user_id <= last_user_id)
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(PortfolioXirr), rows)
+    db.commit()
+
+
+def run_nightly_xirr(db: Session, as_of: Optional[date] = None, chunk_size: int = 20000) -> dict:
+    """
+    Compute portfolio and per-fund XIRR for every user as of a date and store them in
+    portfolio_xirr, replacing any earlier run for that date a page of users at a time:
+    each page's old rows are deleted and its new rows inserted in one transaction.
+
+    Only lots invested by as_of count, valued at each fund's last NAV on or before as_of.
+    Investments are read in pages of chunk_size users, and each page is solved as one batch.
+    """
+    as_of = as_of or datetime.now().date()
+    started = time.perf_counter()
+    latest_navs = get_latest_navs(db, on_or_before=as_of)
+
+    pages = iter_investment_pages(
+        db,
+        (Investment.fund_id, Investment.investment_date, Investment.amount_invested, Investment.units),
+        users_per_page=chunk_size,
+        on_or_before=as_of
+    )
+
+    users = 0
+    rows_written = 0
+    after_user_id = None
+
+    for last_user_id, lots in pages:
+        chunk = _Chunk()
+        for user_id, fund_id, investment_date, amount, units in lots:
+            nav = latest_navs.get(fund_id)
+            if nav is None:
+                continue
+            chunk.add(user_id, fund_id, investment_date, amount, units * nav)
+        rows = chunk.solve(as_of) if chunk.user_ids else []
+        # Replace the page's users' rows in one transaction, so readers never see them missing
+        _replace_rows(db, as_of, after_user_id, last_user_id, rows)
+        after_user_id = last_user_id
+        users += len(chunk.user_ids)
+        rows_written += len(rows)
+    # Users past the last page no longer hold anything on as_of
+    _replace_rows(db, as_of, after_user_id, None, [])
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "as_of_date": as_of,
+        "users": users,
+        "rows": rows_written,
+        "seconds": elapsed,
+        "users_per_second": users / elapsed if elapsed > 0 else 0
+    }
+    logger.info(
+        f"Nightly XIRR for {as_of}: {users} users, {rows_written} rows in {elapsed:.2f}s "
+        f"({stats['users_per_second']:.0f} users/s)"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Compute XIRR for every user's portfolio and holdings")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="Valuation date (YYYY-MM-DD), default today")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Users solved per batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        stats = run_nightly_xirr(db, as_of=args.as_of, chunk_size=args.chunk_size)
+        print(f"{stats['users']} users in {stats['seconds']:.2f}s ({stats['users_per_second']:.0f} users/s)")
+    finally:
+        db.close()
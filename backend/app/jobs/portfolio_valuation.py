@@ -0,0 +1,268 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+from datetime import datetime, date
+import argparse
+import os
+import numpy as np
+import time
+import logging
+
+from app.db.models import Investment, FundAllocation, FundCapAllocation, PortfolioValuation, ValuationRun
+from app.jobs.batching import iter_investment_pages
+from app.services.mutual_fund import get_latest_navs
+from app.services.fund_snapshots import in_effect
+
+logger = logging.getLogger(__name__)
+
+
+class ValuationContext:
+    """
+    Read-only data shared by every chunk: the latest NAV vector and the
+    fund x sector and fund x cap weight matrices, all indexed by fund code.
+    """
+
+    def __init__(self, fund_ids: List[str], navs: np.ndarray, sectors: List[str], sector_weights: np.ndarray,
+                 cap_types: List[str], cap_weights: np.ndarray):
+        self.fund_ids = fund_ids
+        self.fund_index = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+        self.navs = navs
+        self.sectors = sectors
+        self.sector_weights = sector_weights
+        self.cap_types = cap_types
+        self.cap_weights = cap_weights
+
+
+def load_valuation_context(db: Session, as_of: Optional[date] = None) -> ValuationContext:
+    """Load the NAVs and allocation weights of all funds as of a date, latest by default (three queries)"""
+    latest_navs = get_latest_navs(db, on_or_before=as_of)
+    fund_ids = sorted(latest_navs)
+    fund_index = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    navs = np.array([latest_navs[fund_id] for fund_id in fund_ids], dtype=np.float64)
+
+    def weights(rows) -> Tuple[List[str], np.ndarray]:
+        rows = [row for row in rows if row[0] in fund_index]
+        labels = sorted({label for _, label, _ in rows})
+        label_index = {label: i for i, label in enumerate(labels)}
+        matrix = np.zeros((len(fund_ids), len(labels)))
+        for fund_id, label, percentage in rows:
+            matrix[fund_index[fund_id], label_index[label]] += percentage / 100
+        return labels, matrix
+
+    sectors, sector_weights = weights(in_effect(
+        db.query(FundAllocation.fund_id, FundAllocation.sector, FundAllocation.percentage), FundAllocation, as_of=as_of
+    ).all())
+    cap_types, cap_weights = weights(in_effect(
+        db.query(FundCapAllocation.fund_id, FundCapAllocation.cap_type, FundCapAllocation.percentage),
+        FundCapAllocation, as_of=as_of
+    ).all())
+    return ValuationContext(fund_ids, navs, sectors, sector_weights, cap_types, cap_weights)
+
+
+_context: Optional[ValuationContext] = None
+
+
+def _init_worker(context: ValuationContext) -> None:
+    """Process pool initializer: receive the shared context once per worker"""
+    global _context
+    _context = context
+
+
+def value_chunk(
+    user_ids: List[str],
+    user_codes: np.ndarray,
+    fund_codes: np.ndarray,
+    units: np.ndarray,
+    amounts: np.ndarray,
+    as_of: date,
+    context: Optional[ValuationContext] = None,
+) -> List[dict]:
+    """
+    Aggregate the lots of a chunk of users into one valuation row per user.
+    Lots are parallel arrays; user_codes index into user_ids.
+    """
+    context = context or _context
+    n_users = len(user_ids)
+
+    values = units * context.navs[fund_codes]
+    current_value = np.bincount(user_codes, values, minlength=n_users)
+    invested = np.bincount(user_codes, amounts, minlength=n_users)
+
+    user_sectors = np.zeros((n_users, len(context.sectors)))
+    np.add.at(user_sectors, user_codes, values[:, np.newaxis] * context.sector_weights[fund_codes])
+    user_caps = np.zeros((n_users, len(context.cap_types)))
+    np.add.at(user_caps, user_codes, values[:, np.newaxis] * context.cap_weights[fund_codes])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sector_shares = np.nan_to_num(user_sectors / current_value[:, np.newaxis] * 100)
+        cap_shares = np.nan_to_num(user_caps / current_value[:, np.newaxis] * 100)
+
+    rows = []
+    for code, user_id in enumerate(user_ids):
+        total_return = current_value[code] - invested[code]
+        rows.append({
+            "user_id": user_id,
+            "as_of_date": as_of,
+            "current_value": float(current_value[code]),
+            "initial_investment": float(invested[code]),
+            "total_return": float(total_return),
+            "return_percentage": float(total_return / invested[code] * 100) if invested[code] > 0 else 0.0,
+            "sector_allocations": {
+                sector: float(share) for sector, share in zip(context.sectors, sector_shares[code]) if share > 0
+            },
+            "cap_allocations": {
+                cap_type: float(share) for cap_type, share in zip(context.cap_types, cap_shares[code]) if share > 0
+            }
+        })
+    return rows
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately in this process (workers=0)"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def _start_run(db: Session, as_of: date) -> ValuationRun:
+    """Get the run for as_of, resuming an interrupted one or restarting a completed one"""
+    run = db.query(ValuationRun).filter(ValuationRun.as_of_date == as_of).first()
+    if run is None:
+        run = ValuationRun(as_of_date=as_of, status="running", users_processed=0)
+        db.add(run)
+    elif run.status == "completed":
+        db.query(PortfolioValuation).filter(PortfolioValuation.as_of_date == as_of).delete(synchronize_session=False)
+        run.status = "running"
+        run.last_user_id = None
+        run.users_processed = 0
+        run.completed_at = None
+    else:
+        logger.info(f"Resuming valuation run for {as_of} after user {run.last_user_id}")
+    db.commit()
+    return run
+
+
+def run_portfolio_valuation(
+    db: Session,
+    as_of: Optional[date] = None,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Value every user's portfolio as of a date and write one portfolio_valuations row per user.
+
+    Only lots invested by as_of count, valued at NAVs and allocations as of that date.
+    Investments are read in pages of chunk_size users, which are valued across a process
+    pool against a shared NAV vector. Each chunk's rows are
+    written together with the run checkpoint, so a crashed run resumes after the last
+    written user.
+    """
+    as_of = as_of or datetime.now().date()
+    workers = os.cpu_count() if workers is None else workers
+    started = time.perf_counter()
+
+    run = _start_run(db, as_of)
+    context = load_valuation_context(db, as_of)
+
+    pages = iter_investment_pages(
+        db,
+        (Investment.fund_id, Investment.units, Investment.amount_invested),
+        users_per_page=chunk_size,
+        after_user_id=run.last_user_id,
+        on_or_before=as_of
+    )
+
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,))
+    else:
+        _init_worker(context)
+        executor = _InlineExecutor()
+
+    pending: Deque[Tuple[Future, str]] = deque()
+    users_written = 0
+
+    def write_oldest():
+        nonlocal users_written
+        future, last_user_id = pending.popleft()
+        rows = future.result()
+        if rows:
+            db.execute(insert(PortfolioValuation), rows)
+        run.last_user_id = last_user_id
+        run.users_processed += len(rows)
+        db.commit()
+        users_written += len(rows)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Valued {users_written} users ({users_written / elapsed:.0f} users/s)")
+
+    try:
+        for last_user_id, lots in pages:
+            user_ids: List[str] = []
+            user_codes, fund_codes, units, amounts = [], [], [], []
+            for user_id, fund_id, lot_units, amount in lots:
+                fund_code = context.fund_index.get(fund_id)
+                if fund_code is None:
+                    continue
+                if not user_ids or user_ids[-1] != user_id:
+                    user_ids.append(user_id)
+                user_codes.append(len(user_ids) - 1)
+                fund_codes.append(fund_code)
+                units.append(lot_units)
+                amounts.append(amount)
+
+            future = executor.submit(
+                value_chunk,
+                user_ids,
+                np.array(user_codes, dtype=np.int64),
+                np.array(fund_codes, dtype=np.int64),
+                np.array(units, dtype=np.float64),
+                np.array(amounts, dtype=np.float64),
+                as_of,
+            )
+            pending.append((future, last_user_id))
+            # Bound the work in flight and keep writes in user order for the checkpoint
+            while len(pending) > max(workers, 1) * 2:
+                write_oldest()
+        while pending:
+            write_oldest()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    run.status = "completed"
+    run.completed_at = datetime.now()
+    db.commit()
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "as_of_date": as_of,
+        "users": run.users_processed,
+        "users_this_session": users_written,
+        "seconds": elapsed,
+        "users_per_second": users_written / elapsed if elapsed > 0 else 0
+    }
+    logger.info(
+        f"Portfolio valuation for {as_of} completed: {users_written} users in {elapsed:.2f}s "
+        f"({stats['users_per_second']:.0f} users/s)"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Value every user's portfolio as of a date")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="Valuation date (YYYY-MM-DD), default today")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Users per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (0 = in-process), default CPU count")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        stats = run_portfolio_valuation(db, as_of=args.as_of, chunk_size=args.chunk_size, workers=args.workers)
+        print(f"{stats['users_this_session']} users in {stats['seconds']:.2f}s ({stats['users_per_second']:.0f} users/s)")
+    finally:
+        db.close()
@@ -0,0 +1,103 @@
+"""
+Publish fund compositions (factsheet disclosures) as dated versions.
+
+    python -m app.jobs.publish_compositions --file compositions.json
+
+The file holds a list of full compositions, each identifying its fund by fund_id or isn:
+
+    [{"isn": "INF000000001", "effective_date": "2024-06-30",
+      "holdings": {"Infosys": 8.2, "HDFC Bank": 7.5},
+      "sectors": {"IT": 24.0, "Banking": 31.5},
+      "caps": {"Large Cap": 82.0, "Mid Cap": 18.0}}]
+
+Compositions are published in effective-date order, so one file can carry several
+versions of a fund. Unchanged compositions write nothing.
+"""
+from sqlalchemy.orm import Session
+from typing import Iterable, List
+from datetime import date
+import argparse
+import json
+import logging
+import sys
+
+from app.db.models import MutualFund
+from app.services.fund_snapshots import current_snapshot, publish_fund_composition
+
+logger = logging.getLogger(__name__)
+
+
+def _pairs(composition: dict, kind: str) -> List[tuple]:
+    return [(name, float(percentage)) for name, percentage in (composition.get(kind) or {}).items()]
+
+
+def publish_compositions(db: Session, compositions: Iterable[dict]) -> dict:
+    """
+    Publish each composition through publish_fund_composition, committing per fund version.
+    Compositions with an unknown fund, a bad date or a date before the fund's current
+    version are reported and skipped. Returns counts and the errors by position in the input.
+    """
+    stats = {"published": 0, "unchanged": 0, "errors": []}
+    parsed = []
+    for position, composition in enumerate(compositions):
+        try:
+            as_of = date.fromisoformat(composition["effective_date"])
+            parsed.append((as_of, position, composition))
+        except (KeyError, TypeError, ValueError) as e:
+            stats["errors"].append({"row": position, "error": f"Invalid effective_date: {e}"})
+
+    isns = {composition["isn"] for _, _, composition in parsed if composition.get("isn")}
+    fund_by_isn = dict(db.query(MutualFund.isn, MutualFund.id).filter(MutualFund.isn.in_(isns)).all()) if isns else {}
+    fund_ids = {composition["fund_id"] for _, _, composition in parsed if composition.get("fund_id")}
+    known_ids = set()
+    if fund_ids:
+        known_ids = {fund_id for (fund_id,) in db.query(MutualFund.id).filter(MutualFund.id.in_(fund_ids))}
+
+    for as_of, position, composition in sorted(parsed, key=lambda item: (item[0], item[1])):
+        fund_id = composition.get("fund_id")
+        fund_id = fund_id if fund_id in known_ids else fund_by_isn.get(composition.get("isn"))
+        if fund_id is None:
+            stats["errors"].append({"row": position, "error": "Unknown fund"})
+            continue
+        current = current_snapshot(db, fund_id)
+        previous = (current.id, current.content_hash) if current is not None else None
+        try:
+            snapshot = publish_fund_composition(
+                db, fund_id, as_of,
+                _pairs(composition, "holdings"), _pairs(composition, "sectors"), _pairs(composition, "caps")
+            )
+        except (TypeError, ValueError) as e:
+            db.rollback()
+            stats["errors"].append({"row": position, "error": str(e)})
+            continue
+        stats["unchanged" if (snapshot.id, snapshot.content_hash) == previous else "published"] += 1
+
+    stats["errors"].sort(key=lambda error: error["row"])
+    logger.info(
+        f"Published {stats['published']} fund compositions, {stats['unchanged']} unchanged, "
+        f"{len(stats['errors'])} errors"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Publish fund compositions with their effective dates")
+    parser.add_argument("--file", required=True, help="JSON list of compositions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.file, encoding="utf-8") as f:
+        compositions = json.load(f)
+    db = SessionLocal()
+    try:
+        stats = publish_compositions(db, compositions)
+    finally:
+        db.close()
+
+    for error in stats["errors"]:
+        print(f"  row {error['row']}: {error['error']}")
+    print(f"{stats['published']} published, {stats['unchanged']} unchanged, {len(stats['errors'])} errors")
+    if stats["errors"]:
+        sys.exit(1)
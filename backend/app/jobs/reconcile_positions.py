@@ -0,0 +1,135 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists
+from typing import Dict, List, Tuple
+import argparse
+import math
+import time
+import logging
+
+from app.db.models import Investment, Position
+from app.jobs.batching import iter_investment_pages
+from app.services.positions import rebuild_positions
+
+logger = logging.getLogger(__name__)
+
+
+def _matches(position: tuple, expected: tuple) -> bool:
+    units, invested, first_investment_date, lot_count = position
+    expected_units, expected_invested, expected_date, expected_count = expected
+    return (
+        math.isclose(units, expected_units, rel_tol=1e-9, abs_tol=1e-6)
+        and math.isclose(invested, expected_invested, rel_tol=1e-9, abs_tol=1e-6)
+        and first_investment_date == expected_date
+        and lot_count == expected_count
+    )
+
+
+def reconcile_positions(db: Session, fix: bool = False, users_per_page: int = 5000, max_reported: int = 20) -> dict:
+    """
+    Compare every position with the aggregate of its investment lots.
+
+    Lots are read a page of users at a time and compared with the positions of the same
+    users; positions without any lots are found with one anti-join at the end. With fix,
+    the positions of every user with a mismatch are rebuilt, committing per page.
+    Returns counts of missing, stale and orphaned positions and a sample of them.
+    """
+    started = time.perf_counter()
+    stats = {"users": 0, "positions": 0, "missing": 0, "stale": 0, "orphaned": 0, "fixed_users": 0, "examples": []}
+
+    def report(kind: str, user_id: str, fund_id: str) -> None:
+        stats[kind] += 1
+        if len(stats["examples"]) < max_reported:
+            stats["examples"].append({"kind": kind, "user_id": user_id, "fund_id": fund_id})
+
+    pages = iter_investment_pages(
+        db,
+        (Investment.fund_id, Investment.units, Investment.amount_invested, Investment.investment_date),
+        users_per_page=users_per_page
+    )
+    after_user_id = None
+    for last_user_id, lots in pages:
+        expected: Dict[Tuple[str, str], list] = {}
+        for user_id, fund_id, units, amount, investment_date in lots:
+            aggregate = expected.get((user_id, fund_id))
+            if aggregate is None:
+                expected[(user_id, fund_id)] = [units, amount, investment_date, 1]
+            else:
+                aggregate[0] += units
+                aggregate[1] += amount
+                aggregate[2] = min(aggregate[2], investment_date)
+                aggregate[3] += 1
+
+        stored = db.query(
+            Position.user_id, Position.fund_id, Position.units, Position.invested,
+            Position.first_investment_date, Position.lot_count
+        ).filter(Position.user_id <= last_user_id)
+        if after_user_id is not None:
+            stored = stored.filter(Position.user_id > after_user_id)
+        positions = {(row[0], row[1]): tuple(row[2:]) for row in stored}
+
+        broken_users = set()
+        for key, aggregate in expected.items():
+            position = positions.get(key)
+            if position is None:
+                report("missing", *key)
+                broken_users.add(key[0])
+            elif not _matches(position, tuple(aggregate)):
+                report("stale", *key)
+                broken_users.add(key[0])
+        for key in positions.keys() - expected.keys():
+            report("orphaned", *key)
+            broken_users.add(key[0])
+
+        stats["users"] += len({user_id for user_id, _ in expected})
+        stats["positions"] += len(expected)
+        if fix and broken_users:
+            rebuild_positions(db, broken_users)
+            db.commit()
+            stats["fixed_users"] += len(broken_users)
+        after_user_id = last_user_id
+
+    # Positions of users past the last page, or without any lots left at all
+    has_lots = exists().where(and_(Investment.user_id == Position.user_id, Investment.fund_id == Position.fund_id))
+    orphans = db.query(Position.user_id, Position.fund_id).filter(~has_lots)
+    if after_user_id is not None:
+        orphans = orphans.filter(Position.user_id > after_user_id)
+    orphaned_users: List[str] = []
+    for user_id, fund_id in orphans.all():
+        report("orphaned", user_id, fund_id)
+        orphaned_users.append(user_id)
+    if fix and orphaned_users:
+        rebuild_positions(db, set(orphaned_users))
+        db.commit()
+        stats["fixed_users"] += len(set(orphaned_users))
+
+    stats["seconds"] = time.perf_counter() - started
+    logger.info(
+        f"Reconciled {stats['positions']} positions of {stats['users']} users in {stats['seconds']:.2f}s: "
+        f"{stats['missing']} missing, {stats['stale']} stale, {stats['orphaned']} orphaned"
+        + (f", rebuilt {stats['fixed_users']} users" if fix else "")
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    import sys
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Check the positions table against the investment lots")
+    parser.add_argument("--fix", action="store_true", help="Rebuild the positions of users with mismatches")
+    parser.add_argument("--users-per-page", type=int, default=5000, help="Users compared per page")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        stats = reconcile_positions(db, fix=args.fix, users_per_page=args.users_per_page)
+    finally:
+        db.close()
+    for example in stats["examples"]:
+        print(f"  {example['kind']:<9} user {example['user_id']} fund {example['fund_id']}")
+    mismatches = stats["missing"] + stats["stale"] + stats["orphaned"]
+    print(f"{stats['positions']} positions checked, {mismatches} mismatched")
+    # Exit status 1 flags unrepaired drift for schedulers
+    if mismatches and not args.fix:
+        sys.exit(1)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, model_validator
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 # Base investment schema
 class InvestmentBase(BaseModel):
@@ -41,6 +41,28 @@ class InvestmentUpdate(BaseModel):
             raise ValueError('NAV must be positive')
         return v
 
+# Operations of one batch request, applied in a single transaction
+MAX_BATCH_OPERATIONS = 1000
+
+class InvestmentBatchUpdate(InvestmentUpdate):
+    id: str
+
+class InvestmentBatch(BaseModel):
+    create: List[InvestmentCreate] = []
+    update: List[InvestmentBatchUpdate] = []
+    delete: List[str] = []
+
+    @model_validator(mode='after')
+    def validate_operations(self):
+        if len(self.create) + len(self.update) + len(self.delete) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+        update_ids = [item.id for item in self.update]
+        if len(set(update_ids)) != len(update_ids) or len(set(self.delete)) != len(self.delete):
+            raise ValueError('Each investment may appear only once per operation')
+        if set(update_ids) & set(self.delete):
+            raise ValueError('An investment cannot be both updated and deleted')
+        return self
+
 # Schema for investment response
 class InvestmentResponse(InvestmentBase):
     id: str
@@ -49,4 +71,22 @@ class InvestmentResponse(InvestmentBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True  
\ No newline at end of file
+        from_attributes = True  
+
+# Schemas for the bulk import report
+class InvestmentImportError(BaseModel):
+    row: int
+    error: str
+
+class InvestmentImportReport(BaseModel):
+    imported: int
+    duplicates: int
+    skipped: int
+    error_count: int
+    errors: List[InvestmentImportError]
+    dry_run: bool
+
+class InvestmentBatchResult(BaseModel):
+    created: List[InvestmentResponse]
+    updated: List[InvestmentResponse]
+    deleted: List[InvestmentResponse]
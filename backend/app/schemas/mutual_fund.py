@@ -53,6 +53,7 @@ class SectorAllocation(BaseModel):
 # Stock holding schemas
 class StockHolding(BaseModel):
     stock_name: str
+    security_id: Optional[int] = None
     percentage: float
 
     class Config:
@@ -91,6 +92,7 @@ class MutualFundCompare(BaseModel):
 class MutualFundReturns(BaseModel):
     fund_id: str
     name: str
+    as_of_date: Optional[date] = None
     one_month: Optional[float] = None
     three_month: Optional[float] = None
     six_month: Optional[float] = None
@@ -100,4 +102,76 @@ class MutualFundReturns(BaseModel):
     since_inception: Optional[float] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+# Schemas for arbitrary-range return queries
+class ReturnRangeQuery(BaseModel):
+    fund_id: str
+    start_date: date
+    end_date: date
+
+class ReturnRangeRequest(BaseModel):
+    queries: List[ReturnRangeQuery] = Field(..., max_length=10000)
+
+class ReturnRangeResult(BaseModel):
+    fund_id: str
+    start_date: date
+    end_date: date
+    resolved_start_date: Optional[date] = None
+    resolved_end_date: Optional[date] = None
+    absolute_return: Optional[float] = None
+    annualized_return: Optional[float] = None
+
+# Risk metrics schemas (returns, volatility and drawdowns in percent)
+class RiskMetrics(BaseModel):
+    window: str
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    observations: int
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+    beta: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    rolling_return_mean: Optional[float] = None
+    rolling_return_min: Optional[float] = None
+    rolling_return_max: Optional[float] = None
+    rolling_return_positive_share: Optional[float] = None
+
+class MutualFundRisk(RiskMetrics):
+    fund_id: str
+
+# Return correlation schemas (Pearson correlation and covariance of daily returns, pairwise-complete)
+class FundCorrelation(BaseModel):
+    fund_id: str
+    fund_name: str
+    correlation: float
+    covariance: float
+    observations: int
+
+class CorrelationMatrix(BaseModel):
+    window: str
+    start_date: date
+    end_date: date
+    fund_ids: List[str]
+    fund_names: List[str]
+    correlation: List[List[Optional[float]]]
+    covariance: List[List[Optional[float]]]
+    observations: List[List[int]]
+
+# Holdings similarity schemas (estimated weighted Jaccard similarity of current holdings, 0-1)
+class SimilarFund(BaseModel):
+    fund_id: str
+    fund_name: str
+    fund_house: Optional[str] = None
+    similarity: float
+
+class NearClonePair(BaseModel):
+    fund1_id: str
+    fund1_name: str
+    fund1_house: Optional[str] = None
+    fund2_id: str
+    fund2_name: str
+    fund2_house: Optional[str] = None
+    similarity: float
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Portfolio summary schema
 class PortfolioSummary(BaseModel):
@@ -12,6 +12,17 @@ class PortfolioSummary(BaseModel):
     best_performing_return: float
     worst_performing_fund: str
     worst_performing_return: float
+    xirr: Optional[float] = None
+
+# Per-fund holding schema
+class PortfolioHolding(BaseModel):
+    fund_id: str
+    fund_name: str
+    units: float
+    invested: float
+    current_value: float
+    return_percentage: float
+    xirr: Optional[float] = None
 
 # Portfolio performance schema
 class PortfolioPerformance(BaseModel):
@@ -42,9 +53,24 @@ class PortfolioComposition(BaseModel):
     stock_allocations: List[StockAllocation]
     cap_allocations: List[CapAllocation]
 
+# Composition history point schema (label -> percentage of the portfolio value)
+class CompositionPoint(BaseModel):
+    date: date
+    value: float
+    sector_allocations: Dict[str, float]
+    cap_allocations: Dict[str, float]
+
 # Fund overlap schema
 class FundOverlap(BaseModel):
     fund1_name: str
     fund2_name: str
     overlap_percentage: float
-    common_stocks: List[str]
\ No newline at end of file
+    common_stocks: List[str]
+
+# Aggregated dashboard schema (sections not requested are null)
+class PortfolioDashboard(BaseModel):
+    summary: Optional[PortfolioSummary] = None
+    holdings: Optional[List[PortfolioHolding]] = None
+    performance: Optional[List[PortfolioPerformance]] = None
+    composition: Optional[PortfolioComposition] = None
+    overlap: Optional[List[FundOverlap]] = None
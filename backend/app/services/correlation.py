@@ -0,0 +1,200 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import numpy as np
+import threading
+import time
+import logging
+
+from app.db.models import Investment, MutualFund
+from app.services.nav_data import NavArrays, get_nav_arrays, to_date
+
+logger = logging.getLogger(__name__)
+
+# Look-back windows in calendar days, ending at the latest NAV date overall
+CORRELATION_WINDOWS = {"1Y": 365, "3Y": 365 * 3}
+
+# Fewer common return days than this leave a pair's correlation undefined
+MIN_OBSERVATIONS = 20
+
+def returns_matrix(arrays: NavArrays, start: int, end: int) -> tuple:
+    """
+    Daily returns of every fund on the window's date grid (every date in (start, end] on
+    which any fund has a NAV), as (grid, dates x funds returns, valid mask).
+
+    A return is recorded only on days the fund actually has a NAV, measured from its
+    previous NAV, so a missing day is neither a flat day nor a gap-sized jump on a
+    date the fund didn't price; its move is attributed to the next priced day.
+    """
+    rows = np.flatnonzero((arrays.dates > start) & (arrays.dates <= end))
+    # A fund's first NAV has nothing to measure from
+    rows = rows[rows != arrays.starts[arrays.fund_codes[rows]]]
+    grid = np.unique(arrays.dates[rows])
+
+    returns = np.zeros((len(grid), len(arrays)))
+    valid = np.zeros((len(grid), len(arrays)), dtype=bool)
+    positions = np.searchsorted(grid, arrays.dates[rows])
+    columns = arrays.fund_codes[rows]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = arrays.navs[rows] / arrays.navs[rows - 1] - 1.0
+    usable = np.isfinite(values)
+    returns[positions[usable], columns[usable]] = values[usable]
+    valid[positions[usable], columns[usable]] = True
+    return grid, returns, valid
+
+
+def pairwise_moments(returns: np.ndarray, valid: np.ndarray, columns: Optional[np.ndarray] = None) -> tuple:
+    """
+    Pairwise-complete covariance and correlation of every series with the given columns
+    (all by default): each pair uses only the days on which both have a return. Computed
+    with five matrix products over the masked returns; returns (observations, covariance,
+    correlation) as series x columns matrices, NaN where a pair has under MIN_OBSERVATIONS days.
+    """
+    if columns is None:
+        columns = np.arange(returns.shape[1])
+    mask = valid.astype(np.float64)
+    squares = returns ** 2
+    block_returns, block_mask = returns[:, columns], mask[:, columns]
+
+    counts = mask.T @ block_mask
+    sums = returns.T @ block_mask               # sum of x_i over days j also has a return
+    partner_sums = mask.T @ block_returns       # sum of x_j over days i also has a return
+    sums_of_squares = squares.T @ block_mask
+    partner_squares = mask.T @ (block_returns ** 2)
+    products = returns.T @ block_returns
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = (products - sums * partner_sums / counts) / (counts - 1)
+        variance = (sums_of_squares - sums ** 2 / counts) / (counts - 1)
+        partner_variance = (partner_squares - partner_sums ** 2 / counts) / (counts - 1)
+        correlation = covariance / np.sqrt(variance * partner_variance)
+    enough = counts >= MIN_OBSERVATIONS
+    covariance = np.where(enough, covariance, np.nan)
+    correlation = np.where(enough, np.clip(correlation, -1.0, 1.0), np.nan)
+    return counts.astype(np.int32), covariance, correlation
+
+
+class WindowReturns:
+    """
+    Daily returns of all funds over one window (dates x funds), the only per-window data
+    kept in memory. Correlations are computed from it per request for just the funds asked
+    about, so memory grows with funds x days rather than funds x funds.
+    """
+
+    def __init__(self, arrays: NavArrays, window: str):
+        self.arrays = arrays
+        self.window = window
+        if not len(arrays):
+            self.start = self.end = 0
+            self.returns = np.zeros((0, 0))
+            self.valid = np.zeros((0, 0), dtype=bool)
+            return
+        self.end = int(arrays.dates.max())
+        self.start = self.end - CORRELATION_WINDOWS[window]
+        _, self.returns, self.valid = returns_matrix(arrays, self.start, self.end)
+
+    def codes(self, fund_ids: List[str]) -> np.ndarray:
+        return np.array([self.arrays.fund_index[fund_id] for fund_id in fund_ids], dtype=np.int64)
+
+    def among(self, codes: np.ndarray) -> tuple:
+        """(observations, covariance, correlation) between the given funds, funds x funds"""
+        return pairwise_moments(self.returns[:, codes], self.valid[:, codes])
+
+    def against_all(self, code: int) -> tuple:
+        """(observations, covariance, correlation) of one fund with every fund, as vectors"""
+        # Other days add nothing to any pair with this fund
+        days = self.valid[:, code]
+        counts, covariance, correlation = pairwise_moments(self.returns[days], self.valid[days], np.array([code]))
+        return counts[:, 0], covariance[:, 0], correlation[:, 0]
+
+
+_window_returns: Dict[str, WindowReturns] = {}
+_window_returns_lock = threading.Lock()
+
+
+def get_window_returns(db: Session, window: str = "1Y") -> WindowReturns:
+    """Daily returns of all funds for a window, cached until the NAV history is reloaded"""
+    if window not in CORRELATION_WINDOWS:
+        raise ValueError(f"Invalid window: {window}")
+    arrays = get_nav_arrays(db)
+    with _window_returns_lock:
+        cached = _window_returns.get(window)
+        if cached is None or cached.arrays is not arrays:
+            started = time.perf_counter()
+            cached = _window_returns[window] = WindowReturns(arrays, window)
+            logger.info(
+                f"Loaded {window} daily returns of {len(arrays)} funds in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return cached
+
+
+def invalidate_correlations() -> None:
+    """Drop the cached return matrices (after NAV ingest) so they are rebuilt on next use"""
+    with _window_returns_lock:
+        _window_returns.clear()
+
+
+def _nullable(matrix: np.ndarray) -> List[list]:
+    return [[None if not np.isfinite(value) else value for value in row] for row in matrix.astype(np.float64).tolist()]
+
+
+def get_portfolio_correlation(db: Session, user_id: str, window: str = "1Y") -> Optional[dict]:
+    """
+    Correlation and covariance of daily returns between the funds a user holds, computed
+    from the cached window returns. Funds without NAVs are left out; None if none are left.
+    """
+    window_returns = get_window_returns(db, window)
+    held = sorted(
+        fund_id for (fund_id,) in db.query(Investment.fund_id).filter(Investment.user_id == user_id).distinct()
+        if fund_id in window_returns.arrays.fund_index
+    )
+    if not held:
+        return None
+    names = dict(db.query(MutualFund.id, MutualFund.name).filter(MutualFund.id.in_(held)).all())
+    observations, covariance, correlation = window_returns.among(window_returns.codes(held))
+    return {
+        "window": window,
+        "start_date": to_date(window_returns.start + 1),
+        "end_date": to_date(window_returns.end),
+        "fund_ids": held,
+        "fund_names": [names.get(fund_id, "Unknown Fund") for fund_id in held],
+        "correlation": _nullable(correlation),
+        "covariance": _nullable(covariance),
+        "observations": observations.tolist(),
+    }
+
+
+def get_fund_correlations(
+    db: Session,
+    fund_id: str,
+    window: str = "1Y",
+    limit: int = 20,
+    descending: bool = True,
+) -> Optional[List[dict]]:
+    """
+    Correlation of one fund's daily returns with every other fund, most correlated first
+    (least with descending=False). Pairs without enough common days are left out;
+    None if the fund has no NAV history.
+    """
+    window_returns = get_window_returns(db, window)
+    code = window_returns.arrays.fund_index.get(fund_id)
+    if code is None:
+        return None
+    observations, covariance, row = window_returns.against_all(code)
+    candidates = np.flatnonzero(np.isfinite(row))
+    candidates = candidates[candidates != code]
+    order = np.argsort(-row[candidates] if descending else row[candidates], kind="stable")
+    picked = candidates[order[:limit]]
+
+    fund_ids = [window_returns.arrays.fund_ids[other] for other in picked.tolist()]
+    names = dict(db.query(MutualFund.id, MutualFund.name).filter(MutualFund.id.in_(fund_ids)).all()) if fund_ids else {}
+    return [
+        {
+            "fund_id": other_id,
+            "fund_name": names.get(other_id, "Unknown Fund"),
+            "correlation": float(row[other]),
+            "covariance": float(covariance[other]),
+            "observations": int(observations[other]),
+        }
+        for other_id, other in zip(fund_ids, picked.tolist())
+    ]
@@ -0,0 +1,242 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set, Tuple
+from collections import Counter
+from bisect import bisect_left
+import heapq
+import re
+import threading
+import time
+import logging
+
+from app.db.models import MutualFund
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse everything that is not a letter or digit into single spaces"""
+    return _NON_ALNUM.sub(" ", (text or "").lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Padded character trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FundSearchIndex:
+    """
+    In-memory prefix and trigram index over the mutual fund universe.
+
+    Documents are the fund rows themselves (already shaped like MutualFundResponse),
+    so a search never goes back to the database.
+    """
+
+    def __init__(self, funds: List[dict]):
+        self.docs = funds
+        self.names = [normalize(fund["name"]) for fund in funds]
+
+        token_postings: Dict[str, Set[int]] = {}
+        self.trigram_postings: Dict[str, Set[int]] = {}
+        self.field_postings: Dict[Tuple[str, str], Set[int]] = {}
+
+        for doc_id, (fund, name) in enumerate(zip(funds, self.names)):
+            for token in name.split():
+                token_postings.setdefault(token, set()).add(doc_id)
+
+            for gram in trigrams(name):
+                self.trigram_postings.setdefault(gram, set()).add(doc_id)
+
+            for field in ("fund_type", "fund_category", "fund_house"):
+                key = (field, (fund[field] or "").lower())
+                self.field_postings.setdefault(key, set()).add(doc_id)
+
+        # Sorted vocabulary: a token prefix maps to a contiguous slice found by bisection
+        self.vocabulary = sorted(token_postings)
+        self.token_postings = [token_postings[token] for token in self.vocabulary]
+
+        # Alphabetical order of full names, used for whole-name prefixes and tie-breaking
+        self.sorted_doc_ids = sorted(range(len(funds)), key=self.names.__getitem__)
+        self.sorted_names = [self.names[doc_id] for doc_id in self.sorted_doc_ids]
+        self.rank = [0] * len(funds)
+        for position, doc_id in enumerate(self.sorted_doc_ids):
+            self.rank[doc_id] = position
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _prefix_docs(self, prefix: str) -> Set[int]:
+        """Documents with at least one name token starting with prefix"""
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff", lo=start)
+        result: Set[int] = set()
+        for postings in self.token_postings[start:end]:
+            result |= postings
+        return result
+
+    def _filter_docs(
+        self,
+        fund_type: Optional[str],
+        fund_category: Optional[str],
+        fund_house: Optional[str],
+    ) -> Optional[Set[int]]:
+        """Documents matching every given filter, or None when no filter is set"""
+        allowed = None
+        for field, value in (
+            ("fund_type", fund_type),
+            ("fund_category", fund_category),
+            ("fund_house", fund_house),
+        ):
+            if not value:
+                continue
+            postings = self.field_postings.get((field, value.lower()), set())
+            allowed = set(postings) if allowed is None else allowed & postings
+        return allowed
+
+    def search(
+        self,
+        term: str,
+        fund_type: Optional[str] = None,
+        fund_category: Optional[str] = None,
+        fund_house: Optional[str] = None,
+        limit: int = 20,
+        min_similarity: float = 0.5,
+    ) -> List[dict]:
+        """
+        Rank funds by name match quality, filling the page tier by tier:
+        exact name, name prefix, prefix of every query token, substring, then
+        trigram similarity for typos. Ties are broken alphabetically.
+        """
+        query = normalize(term)
+        allowed = self._filter_docs(fund_type, fund_category, fund_house)
+        rank = self.rank.__getitem__
+
+        if not query:
+            candidates = range(len(self.docs)) if allowed is None else allowed
+            return [self.docs[doc_id] for doc_id in heapq.nsmallest(limit, candidates, key=rank)]
+
+        results: List[int] = []
+        seen: Set[int] = set()
+
+        def take(doc_ids) -> bool:
+            """Append doc_ids in order until the page is full; True once it is"""
+            for doc_id in doc_ids:
+                if doc_id in seen or (allowed is not None and doc_id not in allowed):
+                    continue
+                seen.add(doc_id)
+                results.append(doc_id)
+                if len(results) >= limit:
+                    return True
+            return False
+
+        # Exact name and whole-name prefix come straight off the sorted name list
+        start = bisect_left(self.sorted_names, query)
+        end = bisect_left(self.sorted_names, query + "\uffff", lo=start)
+        if take(self.sorted_doc_ids[start:end]):
+            return self._page(results)
+
+        # Every query token must prefix some name token
+        tokens = query.split()
+        token_matches = self._prefix_docs(tokens[0])
+        for token in tokens[1:]:
+            if not token_matches:
+                break
+            token_matches &= self._prefix_docs(token)
+        if allowed is not None:
+            token_matches &= allowed
+        token_matches -= seen
+        if take(heapq.nsmallest(limit - len(results), token_matches, key=rank)):
+            return self._page(results)
+
+        # Substring: intersect trigram postings, then verify
+        if len(query) >= 3:
+            candidates: Optional[Set[int]] = None
+            for i in range(len(query) - 2):
+                postings = self.trigram_postings.get(query[i:i + 3], set())
+                candidates = set(postings) if candidates is None else candidates & postings
+                if not candidates:
+                    break
+            matches = [doc_id for doc_id in (candidates or set()) - seen if query in self.names[doc_id]]
+            if take(sorted(matches, key=rank)):
+                return self._page(results)
+
+        # Typo tolerance: share of the query's trigrams found in the name
+        query_grams = trigrams(query)
+        overlap: Counter = Counter()
+        for gram in query_grams:
+            overlap.update(self.trigram_postings.get(gram, ()))
+        fuzzy = [
+            (-shared / len(query_grams), rank(doc_id), doc_id)
+            for doc_id, shared in overlap.items()
+            if shared / len(query_grams) >= min_similarity and doc_id not in seen
+        ]
+        take(doc_id for _, _, doc_id in heapq.nsmallest(limit - len(results), fuzzy))
+        return self._page(results)
+
+    def _page(self, doc_ids: List[int]) -> List[dict]:
+        return [self.docs[doc_id] for doc_id in doc_ids]
+
+
+_index: Optional[FundSearchIndex] = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def build_fund_search_index(db: Session) -> FundSearchIndex:
+    """Load the fund universe in one query and build a fresh index"""
+    rows = db.query(
+        MutualFund.id,
+        MutualFund.name,
+        MutualFund.isn,
+        MutualFund.fund_type,
+        MutualFund.fund_category,
+        MutualFund.fund_house,
+        MutualFund.created_at,
+    ).all()
+    return FundSearchIndex([dict(row._mapping) for row in rows])
+
+
+def get_fund_search_index(db: Session) -> FundSearchIndex:
+    """Return the shared index, rebuilding it when invalidated or older than the TTL"""
+    global _index, _index_built_at
+
+    with _index_lock:
+        stale = time.monotonic() - _index_built_at > settings.FUND_SEARCH_INDEX_TTL_SECONDS
+        if _index is None or stale:
+            started = time.perf_counter()
+            _index = build_fund_search_index(db)
+            _index_built_at = time.monotonic()
+            logger.info(
+                f"Built fund search index over {len(_index)} funds in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return _index
+
+
+def invalidate_fund_search_index() -> None:
+    """Drop the shared index so the next search rebuilds it"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def search_mutual_funds(
+    db: Session,
+    term: str,
+    fund_type: Optional[str] = None,
+    fund_category: Optional[str] = None,
+    fund_house: Optional[str] = None,
+    limit: int = 20,
+) -> List[dict]:
+    """Search mutual funds by name with optional type, category and house filters."""
+    index = get_fund_search_index(db)
+    return index.search(
+        term,
+        fund_type=fund_type,
+        fund_category=fund_category,
+        fund_house=fund_house,
+        limit=limit,
+    )
@@ -0,0 +1,351 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import threading
+import time
+import logging
+
+from app.db.models import MutualFund, FundSnapshot, FundHolding
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Signature length and LSH banding: 32 bands of 4 rows make funds with a weighted
+# Jaccard similarity of 0.5 share a bucket with probability ~0.87, and 0.2 with ~0.05
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+# Holding percentage per MinHash token: a 4% holding is 8 tokens, so signatures
+# estimate the weighted Jaccard similarity sum(min) / sum(max) of the two portfolios
+WEIGHT_QUANTUM = 0.5
+
+# Funds signed per chunk, to bound the (permutations x tokens) hash matrix
+_CHUNK_FUNDS = 128
+
+_SEED = 20240601
+
+
+def _hash_parameters() -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed multiply-shift hash family, so signatures are comparable across processes"""
+    rng = np.random.default_rng(_SEED)
+    multipliers = rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+    return multipliers[:, np.newaxis], offsets[:, np.newaxis]
+
+
+_MULTIPLIERS, _OFFSETS = _hash_parameters()
+
+
+def minhash_signatures(fund_codes: np.ndarray, security_ids: np.ndarray, percentages: np.ndarray, n_funds: int) -> np.ndarray:
+    """
+    Weighted MinHash signatures (funds x NUM_PERM, uint32) from holdings given as parallel
+    arrays. Each holding becomes one token per WEIGHT_QUANTUM of its percentage (at least
+    one), and every token is hashed by all permutations at once. Funds without holdings
+    get the all-ones signature, which only matches other empty funds.
+    """
+    signatures = np.full((n_funds, NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not len(fund_codes):
+        return signatures
+    multiplicity = np.maximum(np.rint(np.asarray(percentages, dtype=np.float64) / WEIGHT_QUANTUM), 1).astype(np.int64)
+    holding_of_token = np.repeat(np.arange(len(fund_codes)), multiplicity)
+    # Rank of each token within its holding: 0, 1, ... multiplicity - 1
+    ranks = np.arange(len(holding_of_token)) - np.repeat(np.cumsum(multiplicity) - multiplicity, multiplicity)
+    tokens = (np.asarray(security_ids, dtype=np.uint64)[holding_of_token] << np.uint64(16)) | ranks.astype(np.uint64)
+    token_funds = np.asarray(fund_codes, dtype=np.int64)[holding_of_token]
+
+    order = np.argsort(token_funds, kind="stable")
+    tokens, token_funds = tokens[order], token_funds[order]
+    for chunk_start in range(0, n_funds, _CHUNK_FUNDS):
+        lo, hi = np.searchsorted(token_funds, [chunk_start, chunk_start + _CHUNK_FUNDS])
+        if lo == hi:
+            continue
+        # Multiply-shift hashing wraps around uint64 by design
+        with np.errstate(over="ignore"):
+            hashed = ((_MULTIPLIERS * tokens[lo:hi] + _OFFSETS) >> np.uint64(32)).astype(np.uint32)
+        funds, starts = np.unique(token_funds[lo:hi], return_index=True)
+        signatures[funds] = np.minimum.reduceat(hashed, starts, axis=1).T
+    return signatures
+
+
+class FundSimilarityIndex:
+    """
+    MinHash signatures of every fund's current holdings with LSH band buckets.
+
+    A fund's candidates are the funds sharing at least one band with it, so a lookup
+    touches only its buckets instead of every fund. Funds are re-signed individually when
+    the content hash of their current composition changes. Funds without holdings are
+    left out (their signatures would all match each other); only their content hash is kept.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+        self.content_hashes: Dict[str, str] = {}
+        self.empty_hashes: Dict[str, str] = {}
+        self.houses: Dict[str, Optional[str]] = {}
+        self.buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(BANDS)]
+        self._free_rows: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _band_keys(self, row: int) -> List[bytes]:
+        signature = self.signatures[row]
+        return [signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes() for band in range(BANDS)]
+
+    def known_hash(self, fund_id: str) -> Optional[str]:
+        """Content hash the fund was last indexed (or left out) with"""
+        return self.content_hashes.get(fund_id, self.empty_hashes.get(fund_id))
+
+    def exclude(self, fund_id: str, content_hash: str) -> None:
+        """Leave a fund without holdings out of the index, remembering its content hash"""
+        self.remove(fund_id)
+        self.empty_hashes[fund_id] = content_hash
+
+    def remove(self, fund_id: str) -> None:
+        self.empty_hashes.pop(fund_id, None)
+        row = self.rows.pop(fund_id, None)
+        if row is None:
+            return
+        for band, key in enumerate(self._band_keys(row)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(fund_id)
+                if not bucket:
+                    del self.buckets[band][key]
+        self.content_hashes.pop(fund_id, None)
+        self.houses.pop(fund_id, None)
+        self._free_rows.append(row)
+
+    def update(self, fund_ids: List[str], signatures: np.ndarray, content_hashes: List[str], houses: List[Optional[str]]) -> None:
+        """Replace (or add) the signatures of the given funds and re-bucket them"""
+        for fund_id in fund_ids:
+            self.remove(fund_id)
+        needed = len(fund_ids) - len(self._free_rows)
+        if needed > 0:
+            start = len(self.signatures)
+            self.signatures = np.vstack([self.signatures, np.zeros((needed, NUM_PERM), dtype=np.uint32)])
+            self._free_rows.extend(range(start, start + needed))
+        for fund_id, signature, content_hash, house in zip(fund_ids, signatures, content_hashes, houses):
+            row = self._free_rows.pop()
+            self.rows[fund_id] = row
+            self.signatures[row] = signature
+            self.content_hashes[fund_id] = content_hash
+            self.houses[fund_id] = house
+            for band, key in enumerate(self._band_keys(row)):
+                self.buckets[band].setdefault(key, set()).add(fund_id)
+
+    def candidates(self, fund_id: str) -> Set[str]:
+        row = self.rows.get(fund_id)
+        if row is None:
+            return set()
+        found: Set[str] = set()
+        for band, key in enumerate(self._band_keys(row)):
+            found |= self.buckets[band].get(key, set())
+        found.discard(fund_id)
+        return found
+
+    def estimate(self, fund_id: str, others: List[str]) -> np.ndarray:
+        """Estimated weighted Jaccard similarity of a fund's holdings with each of others"""
+        if not others:
+            return np.zeros(0)
+        rows = np.array([self.rows[other] for other in others])
+        return (self.signatures[rows] == self.signatures[self.rows[fund_id]]).mean(axis=1)
+
+    def similar(self, fund_id: str, limit: int = 10, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Most similar funds among the LSH candidates, best first"""
+        others = sorted(self.candidates(fund_id))
+        scores = self.estimate(fund_id, others)
+        order = np.argsort(-scores, kind="stable")
+        return [(others[i], float(scores[i])) for i in order[:limit].tolist() if scores[i] >= min_similarity]
+
+    def near_clones(self, min_similarity: float = 0.8, across_houses: bool = True) -> List[Tuple[str, str, float]]:
+        """
+        Fund pairs with an estimated similarity of at least min_similarity, best first.
+        Only pairs sharing a bucket are compared; with across_houses, both funds must
+        belong to different fund houses.
+        """
+        pairs: Set[Tuple[str, str]] = set()
+        for buckets in self.buckets:
+            for bucket in buckets.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, fund_id1 in enumerate(members):
+                    for fund_id2 in members[i + 1:]:
+                        if not across_houses or self.houses[fund_id1] != self.houses[fund_id2]:
+                            pairs.add((fund_id1, fund_id2))
+        if not pairs:
+            return []
+        pair_list = sorted(pairs)
+        first = np.array([self.rows[fund_id1] for fund_id1, _ in pair_list])
+        second = np.array([self.rows[fund_id2] for _, fund_id2 in pair_list])
+        scores = (self.signatures[first] == self.signatures[second]).mean(axis=1)
+        keep = np.flatnonzero(scores >= min_similarity)
+        keep = keep[np.argsort(-scores[keep], kind="stable")]
+        return [(*pair_list[i], float(scores[i])) for i in keep.tolist()]
+
+
+def _current_versions(db: Session, fund_ids: Optional[Iterable[str]] = None) -> List[tuple]:
+    """(fund_id, content_hash, fund_house) of funds with a current composition"""
+    query = db.query(FundSnapshot.fund_id, FundSnapshot.content_hash, MutualFund.fund_house)\
+        .join(MutualFund, MutualFund.id == FundSnapshot.fund_id)\
+        .filter(FundSnapshot.valid_to.is_(None))
+    if fund_ids is not None:
+        query = query.filter(FundSnapshot.fund_id.in_(list(fund_ids)))
+    return query.all()
+
+
+def _sign_funds(db: Session, index: FundSimilarityIndex, versions: List[tuple]) -> None:
+    """
+    Load the current holdings of the given funds in one query and (re-)sign them.
+    Funds without any resolved holding are excluded from the index instead.
+    """
+    if not versions:
+        return
+    rows = db.query(FundSnapshot.fund_id, FundHolding.security_id, FundHolding.percentage)\
+        .join(FundSnapshot, FundHolding.snapshot_id == FundSnapshot.id)\
+        .filter(
+            FundSnapshot.fund_id.in_([fund_id for fund_id, _, _ in versions]),
+            FundSnapshot.valid_to.is_(None),
+            FundHolding.security_id.isnot(None)
+        ).all()
+    held = {fund_id for fund_id, _, _ in rows}
+    for fund_id, content_hash, _ in versions:
+        if fund_id not in held:
+            index.exclude(fund_id, content_hash)
+    versions = [version for version in versions if version[0] in held]
+    if not versions:
+        return
+    fund_ids = [fund_id for fund_id, _, _ in versions]
+    codes = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    signatures = minhash_signatures(
+        np.fromiter((codes[fund_id] for fund_id, _, _ in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((security_id for _, security_id, _ in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((percentage for _, _, percentage in rows), dtype=np.float64, count=len(rows)),
+        len(fund_ids),
+    )
+    index.update(fund_ids, signatures, [content_hash for _, content_hash, _ in versions],
+                 [house for _, _, house in versions])
+
+
+_index: Optional[FundSimilarityIndex] = None
+_index_checked_at = 0.0
+_changed_funds: Set[str] = set()
+_index_lock = threading.Lock()
+
+
+def get_fund_similarity_index(db: Session) -> FundSimilarityIndex:
+    """
+    Return the shared similarity index, built on first use. Funds marked as changed are
+    re-signed on the next call; beyond that, current compositions are compared by content
+    hash at most once per TTL (catching changes made by other workers), and only funds
+    whose hash moved, or is stale after single-row edits, are re-signed.
+    """
+    global _index, _index_checked_at
+
+    with _index_lock:
+        started = time.perf_counter()
+        if _index is None:
+            _index = FundSimilarityIndex()
+            _sign_funds(db, _index, _current_versions(db))
+            _changed_funds.clear()
+            _index_checked_at = time.monotonic()
+            logger.info(
+                f"Built fund similarity index over {len(_index)} funds in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return _index
+
+        if time.monotonic() - _index_checked_at > settings.SIMILARITY_INDEX_TTL_SECONDS:
+            versions = _current_versions(db)
+            _index_checked_at = time.monotonic()
+            current = {fund_id for fund_id, _, _ in versions}
+            dropped = [fund_id for fund_id in (*_index.rows, *_index.empty_hashes) if fund_id not in current]
+            changed = [
+                version for version in versions
+                if version[1] is None or _index.known_hash(version[0]) != version[1]
+                or (version[0] in _index.rows and _index.houses.get(version[0]) != version[2])
+            ]
+        elif _changed_funds:
+            versions = _current_versions(db, _changed_funds)
+            current = {fund_id for fund_id, _, _ in versions}
+            dropped = [fund_id for fund_id in _changed_funds if fund_id not in current]
+            changed = [
+                version for version in versions
+                if version[1] is None or _index.known_hash(version[0]) != version[1]
+            ]
+        else:
+            return _index
+
+        _changed_funds.clear()
+        for fund_id in dropped:
+            _index.remove(fund_id)
+        _sign_funds(db, _index, changed)
+        if changed or dropped:
+            logger.info(
+                f"Re-signed {len(changed)} and dropped {len(dropped)} funds in the similarity index in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return _index
+
+
+def mark_funds_changed(fund_ids: Iterable[str]) -> None:
+    """Have the next similarity lookup re-sign these funds (after a composition change)"""
+    with _index_lock:
+        _changed_funds.update(fund_ids)
+
+
+def _fund_details(db: Session, fund_ids: Iterable[str]) -> Dict[str, tuple]:
+    fund_ids = set(fund_ids)
+    if not fund_ids:
+        return {}
+    rows = db.query(MutualFund.id, MutualFund.name, MutualFund.fund_house).filter(MutualFund.id.in_(fund_ids))
+    return {fund_id: (name, house) for fund_id, name, house in rows}
+
+
+def get_similar_funds(db: Session, fund_id: str, limit: int = 10, min_similarity: float = 0.0) -> Optional[List[dict]]:
+    """
+    Funds whose holdings are most similar to a fund's, by estimated weighted Jaccard
+    similarity (0-1) of their current holdings. None if the fund has no current holdings.
+    """
+    index = get_fund_similarity_index(db)
+    if fund_id not in index.rows:
+        return None
+    similar = index.similar(fund_id, limit=limit, min_similarity=min_similarity)
+    details = _fund_details(db, [other for other, _ in similar])
+    return [
+        {
+            "fund_id": other,
+            "fund_name": details.get(other, ("Unknown Fund", None))[0],
+            "fund_house": details.get(other, ("Unknown Fund", None))[1],
+            "similarity": similarity,
+        }
+        for other, similarity in similar
+    ]
+
+
+def get_near_clone_funds(
+    db: Session,
+    min_similarity: float = 0.8,
+    across_houses: bool = True,
+    limit: int = 100,
+) -> List[dict]:
+    """Pairs of funds with near-identical holdings, best first, by default only across fund houses"""
+    index = get_fund_similarity_index(db)
+    pairs = index.near_clones(min_similarity=min_similarity, across_houses=across_houses)[:limit]
+    details = _fund_details(db, [fund_id for pair in pairs for fund_id in pair[:2]])
+    unknown = ("Unknown Fund", None)
+    return [
+        {
+            "fund1_id": fund_id1,
+            "fund1_name": details.get(fund_id1, unknown)[0],
+            "fund1_house": details.get(fund_id1, unknown)[1],
+            "fund2_id": fund_id2,
+            "fund2_name": details.get(fund_id2, unknown)[0],
+            "fund2_house": details.get(fund_id2, unknown)[1],
+            "similarity": similarity,
+        }
+        for fund_id1, fund_id2, similarity in pairs
+    ]
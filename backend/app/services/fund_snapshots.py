@@ -0,0 +1,217 @@
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import bindparam, func, insert, or_, select, update
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime
+import hashlib
+import logging
+
+from app.db.models import FundSnapshot, FundPerformance, FundAllocation, FundHolding, FundCapAllocation
+from app.services.securities import resolve_security_names
+from app.services.fund_similarity import mark_funds_changed
+
+logger = logging.getLogger(__name__)
+
+# Composition tables and the column naming each row
+_COMPOSITION = (
+    ("holdings", FundHolding, FundHolding.stock_name),
+    ("sectors", FundAllocation, FundAllocation.sector),
+    ("caps", FundCapAllocation, FundCapAllocation.cap_type),
+)
+
+
+def in_effect(query: Query, model, fund_ids: Optional[Iterable[str]] = None, as_of: Optional[date] = None) -> Query:
+    """
+    Restrict a query over a composition table (FundHolding, FundAllocation, FundCapAllocation)
+    to the fund versions in effect on as_of, or the current ones. Rows are reached through
+    the fund_snapshots index and snapshot_id, so past dates cost the same as today.
+    """
+    query = query.join(FundSnapshot, model.snapshot_id == FundSnapshot.id)
+    if fund_ids is not None:
+        query = query.filter(FundSnapshot.fund_id.in_(list(fund_ids)))
+    if as_of is None:
+        return query.filter(FundSnapshot.valid_to.is_(None))
+    return query.filter(
+        FundSnapshot.valid_from <= as_of,
+        or_(FundSnapshot.valid_to.is_(None), FundSnapshot.valid_to > as_of)
+    )
+
+
+def content_hash(holdings: Iterable[tuple], sectors: Iterable[tuple], caps: Iterable[tuple]) -> str:
+    """Order-independent hash of a composition given as (name, percentage) pairs per kind"""
+    lines = sorted(
+        f"{kind}|{name}|{round(percentage, 4)!r}"
+        for kind, rows in (("holdings", holdings), ("sectors", sectors), ("caps", caps))
+        for name, percentage in rows
+    )
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()
+
+
+def _contents(db: Session, snapshot_ids: List[int]) -> Dict[int, Dict[str, List[tuple]]]:
+    contents = {snapshot_id: {"holdings": [], "sectors": [], "caps": []} for snapshot_id in snapshot_ids}
+    for kind, model, label in _COMPOSITION:
+        rows = db.query(model.snapshot_id, label, model.percentage).filter(model.snapshot_id.in_(snapshot_ids))
+        for snapshot_id, name, percentage in rows:
+            contents[snapshot_id][kind].append((name, percentage))
+    return contents
+
+
+def refresh_content_hashes(db: Session, snapshot_ids: Iterable[int]) -> None:
+    """Recompute the content hash of snapshots whose rows were edited in place (or attached)"""
+    snapshot_ids = list(snapshot_ids)
+    if not snapshot_ids:
+        return
+    db.flush()
+    db.execute(
+        update(FundSnapshot.__table__).where(FundSnapshot.__table__.c.id == bindparam("snapshot_id"))
+        .values(content_hash=bindparam("new_hash")),
+        [
+            {"snapshot_id": snapshot_id, "new_hash": content_hash(**content)}
+            for snapshot_id, content in _contents(db, snapshot_ids).items()
+        ]
+    )
+
+
+def current_snapshot(db: Session, fund_id: str) -> Optional[FundSnapshot]:
+    """The fund's current version, None if it has none"""
+    return db.query(FundSnapshot).filter(FundSnapshot.fund_id == fund_id, FundSnapshot.valid_to.is_(None)).first()
+
+
+def _copy_rows(db: Session, from_id: int, to_id: int) -> None:
+    for _, model, _ in _COMPOSITION:
+        columns = [column for column in model.__table__.c if column.name not in ("id", "snapshot_id", "created_at")]
+        rows = db.execute(select(*columns).where(model.snapshot_id == from_id)).mappings().all()
+        if rows:
+            db.execute(insert(model), [{**row, "snapshot_id": to_id} for row in rows])
+
+
+def editable_snapshot(db: Session, fund_id: str) -> FundSnapshot:
+    """
+    The version single-row edits go to: the current one if it starts today (or later),
+    otherwise a new version from today carrying over the current rows, so dates before
+    today keep their composition. Its content hash is cleared as stale, to be recomputed
+    when the fund is next published or backfilled rather than on every row. Doesn't commit.
+    """
+    today = datetime.now().date()
+    current = current_snapshot(db, fund_id)
+    if current is not None and current.valid_from >= today:
+        snapshot = current
+    else:
+        snapshot = FundSnapshot(fund_id=fund_id, valid_from=today)
+        db.add(snapshot)
+        if current is not None:
+            current.valid_to = today
+        db.flush()
+        if current is not None:
+            _copy_rows(db, current.id, snapshot.id)
+    snapshot.content_hash = None
+    return snapshot
+
+
+def publish_fund_composition(
+    db: Session,
+    fund_id: str,
+    as_of: date,
+    holdings: List[Tuple[str, float]],
+    sectors: List[Tuple[str, float]],
+    caps: List[Tuple[str, float]],
+) -> FundSnapshot:
+    """
+    Record a fund's full composition, in effect from as_of.
+
+    An unchanged composition (same content hash as the current version) writes nothing
+    but the current version's hash, if single-row edits had left it stale.
+    Otherwise the current version ends at as_of and a new one starts; a composition for the
+    current version's own start date replaces it. Dates before that start raise ValueError.
+    Commits; returns the version in effect from as_of.
+    """
+    new_hash = content_hash(holdings, sectors, caps)
+    current = current_snapshot(db, fund_id)
+    if current is not None:
+        if current.content_hash is None:
+            # Stale after single-row edits; kept even when the composition turns out unchanged
+            current.content_hash = content_hash(**_contents(db, [current.id])[current.id])
+        if current.content_hash == new_hash:
+            db.commit()
+            return current
+        if as_of < current.valid_from:
+            raise ValueError(f"Fund {fund_id} already has a composition from {current.valid_from}")
+
+    if current is not None and current.valid_from == as_of:
+        snapshot = current
+        for _, model, _ in _COMPOSITION:
+            db.query(model).filter(model.snapshot_id == snapshot.id).delete(synchronize_session=False)
+        snapshot.content_hash = new_hash
+    else:
+        if current is not None:
+            current.valid_to = as_of
+        snapshot = FundSnapshot(fund_id=fund_id, valid_from=as_of, content_hash=new_hash)
+        db.add(snapshot)
+    db.flush()
+
+    security_ids = resolve_security_names(db, [name for name, _ in holdings])
+    for rows, model, columns in (
+        ([(name, security_ids[name], percentage) for name, percentage in holdings],
+         FundHolding, ("stock_name", "security_id", "percentage")),
+        (sectors, FundAllocation, ("sector", "percentage")),
+        (caps, FundCapAllocation, ("cap_type", "percentage")),
+    ):
+        if rows:
+            db.execute(insert(model), [
+                {"fund_id": fund_id, "snapshot_id": snapshot.id, **dict(zip(columns, row))} for row in rows
+            ])
+    db.commit()
+    mark_funds_changed([fund_id])
+    logger.info(f"Fund {fund_id} composition from {as_of}: snapshot {snapshot.id}")
+    return snapshot
+
+
+def backfill_fund_snapshots(db: Session, valid_from: Optional[date] = None) -> int:
+    """
+    Attach composition rows without a snapshot (loaded before versioning, or in bulk) to
+    their fund's current version, creating one where needed. New versions are in effect
+    from valid_from or, as nothing older is known, from the fund's first NAV (the day the
+    oldest row was recorded for funds without NAVs). Also recomputes content hashes left
+    stale by single-row edits. Doesn't commit; returns the number of funds attached.
+    """
+    stale = [snapshot_id for (snapshot_id,) in db.query(FundSnapshot.id).filter(FundSnapshot.content_hash.is_(None))]
+    refresh_content_hashes(db, stale)
+
+    unversioned: Dict[str, Optional[date]] = {}
+    for _, model, _ in _COMPOSITION:
+        rows = db.query(model.fund_id, func.min(model.created_at)).filter(
+            model.snapshot_id.is_(None)
+        ).group_by(model.fund_id)
+        for fund_id, recorded in rows:
+            recorded = recorded.date() if isinstance(recorded, datetime) else recorded
+            earliest = unversioned.get(fund_id)
+            unversioned[fund_id] = recorded if earliest is None or (recorded and recorded < earliest) else earliest
+    if not unversioned:
+        return 0
+
+    today = datetime.now().date()
+    snapshots = dict(db.query(FundSnapshot.fund_id, FundSnapshot.id).filter(
+        FundSnapshot.fund_id.in_(list(unversioned)), FundSnapshot.valid_to.is_(None)
+    ).all())
+    missing = [fund_id for fund_id in unversioned if fund_id not in snapshots]
+    if missing:
+        first_navs = {} if valid_from else dict(
+            db.query(FundPerformance.fund_id, func.min(FundPerformance.date))
+            .filter(FundPerformance.fund_id.in_(missing)).group_by(FundPerformance.fund_id)
+        )
+        table = FundSnapshot.__table__
+        created = db.execute(insert(table).returning(table.c.fund_id, table.c.id), [
+            {"fund_id": fund_id, "valid_from": valid_from or first_navs.get(fund_id) or unversioned[fund_id] or today}
+            for fund_id in missing
+        ]).all()
+        snapshots.update(dict(created))
+
+    for _, model, _ in _COMPOSITION:
+        table = model.__table__
+        db.execute(
+            update(table).where(table.c.fund_id == bindparam("owner"), table.c.snapshot_id.is_(None))
+            .values(snapshot_id=bindparam("attached_id")),
+            [{"owner": fund_id, "attached_id": snapshots[fund_id]} for fund_id in unversioned]
+        )
+    refresh_content_hashes(db, [snapshots[fund_id] for fund_id in unversioned])
+    logger.info(f"Attached composition rows of {len(unversioned)} funds to snapshots")
+    return len(unversioned)
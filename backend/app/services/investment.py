@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import Date, Float, String, bindparam, delete, func, insert, update
 from typing import List, Optional
 from datetime import date
 
 from app.db.models import Investment, MutualFund
-from app.schemas.investment import InvestmentCreate, InvestmentUpdate
+from app.schemas.investment import InvestmentBatch, InvestmentCreate, InvestmentUpdate
 from app.core.exceptions import NotFoundError, ForbiddenError
+from app.services.live_updates import notify_portfolio_changed
+from app.services import positions
 
 def create_investment(db: Session, investment_data: InvestmentCreate, user_id: str) -> Investment:
     """Create a new investment record."""
@@ -27,8 +30,10 @@ def create_investment(db: Session, investment_data: InvestmentCreate, user_id: s
     )
     
     db.add(db_investment)
+    positions.add_lot(db, db_investment)
     db.commit()
     db.refresh(db_investment)
+    notify_portfolio_changed(db, user_id)
     
     return db_investment
 
@@ -51,6 +56,7 @@ def update_investment(db: Session, investment_id: str, investment_data: Investme
     """Update an investment."""
     # Get the investment
     investment = get_investment_by_id(db, investment_id)
+    old_units, old_amount, old_date = investment.units, investment.amount_invested, investment.investment_date
     
     # Update fields
     if investment_data.investment_date is not None:
@@ -69,8 +75,10 @@ def update_investment(db: Session, investment_id: str, investment_data: Investme
         investment.nav_at_investment = investment_data.nav_at_investment
         investment.units = investment.amount_invested / investment_data.nav_at_investment
     
+    positions.replace_lot(db, investment, old_units, old_amount, old_date)
     db.commit()
     db.refresh(investment)
+    notify_portfolio_changed(db, investment.user_id)
     
     return investment
 
@@ -79,8 +87,98 @@ def delete_investment(db: Session, investment_id: str) -> Investment:
     # Get the investment
     investment = get_investment_by_id(db, investment_id)
     
+    user_id = investment.user_id
+    
     # Delete the investment
     db.delete(investment)
+    positions.remove_lot(db, investment)
     db.commit()
+    notify_portfolio_changed(db, user_id)
     
-    return investment
\ No newline at end of file
+    return investment
+
+
+def apply_investment_batch(db: Session, user_id: str, batch: InvestmentBatch) -> dict:
+    """
+    Apply many creates, updates and deletes of one user's investments in one transaction.
+
+    Each operation type is a single statement scoped to the user (WHERE user_id = :uid):
+    one DELETE ... RETURNING, one executemany UPDATE (followed by one SELECT of the updated
+    lots) and one INSERT ... RETURNING, plus one query to check the funds of the creates.
+    Ids that don't exist or belong to someone else abort the whole batch with NotFoundError.
+    Positions are rebuilt and live streams notified once.
+    Returns {"created", "updated", "deleted"} lists of investments.
+    """
+    table = Investment.__table__
+    try:
+        deleted = []
+        if batch.delete:
+            deleted = db.execute(
+                delete(table).where(table.c.user_id == user_id, table.c.id.in_(batch.delete)).returning(*table.c)
+            ).all()
+            missing = set(batch.delete) - {row.id for row in deleted}
+            if missing:
+                raise NotFoundError(f"Investments not found: {', '.join(sorted(missing))}")
+
+        updated = []
+        if batch.update:
+            amount = func.coalesce(bindparam("new_amount", type_=Float), table.c.amount_invested)
+            nav = func.coalesce(bindparam("new_nav", type_=Float), table.c.nav_at_investment)
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("investment_id", type_=String), table.c.user_id == user_id)
+                .values(
+                    investment_date=func.coalesce(bindparam("new_date", type_=Date), table.c.investment_date),
+                    amount_invested=amount,
+                    nav_at_investment=nav,
+                    units=amount / nav,
+                ),
+                [
+                    {
+                        "investment_id": item.id,
+                        "new_date": item.investment_date,
+                        "new_amount": item.amount_invested,
+                        "new_nav": item.nav_at_investment,
+                    }
+                    for item in batch.update
+                ]
+            )
+            update_ids = [item.id for item in batch.update]
+            updated = db.execute(
+                table.select().where(table.c.user_id == user_id, table.c.id.in_(update_ids))
+            ).all()
+            missing = set(update_ids) - {row.id for row in updated}
+            if missing:
+                raise NotFoundError(f"Investments not found: {', '.join(sorted(missing))}")
+            order = {investment_id: i for i, investment_id in enumerate(update_ids)}
+            updated.sort(key=lambda row: order[row.id])
+
+        created = []
+        if batch.create:
+            fund_ids = {item.fund_id for item in batch.create}
+            found = {fund_id for (fund_id,) in db.query(MutualFund.id).filter(MutualFund.id.in_(fund_ids))}
+            if fund_ids - found:
+                raise NotFoundError(f"Mutual funds not found: {', '.join(sorted(fund_ids - found))}")
+            created = db.execute(
+                insert(table).returning(*table.c),
+                [
+                    {
+                        "user_id": user_id,
+                        "fund_id": item.fund_id,
+                        "investment_date": item.investment_date,
+                        "amount_invested": item.amount_invested,
+                        "nav_at_investment": item.nav_at_investment,
+                        "units": item.amount_invested / item.nav_at_investment,
+                    }
+                    for item in batch.create
+                ]
+            ).all()
+
+        positions.rebuild_positions(db, [user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    notify_portfolio_changed(db, user_id)
+
+    return {"created": created, "updated": updated, "deleted": deleted}
@@ -0,0 +1,249 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import Counter
+from datetime import date, datetime
+import csv
+import logging
+
+from app.db.models import Investment, MutualFund
+from app.services.live_updates import notify_portfolio_changed
+from app.services.positions import rebuild_positions
+
+logger = logging.getLogger(__name__)
+
+# Header names accepted for each field, case-insensitive. The second names match the CSV
+# export of consolidated account statements (casparser: isin, date, amount, nav, units, type).
+_COLUMNS = {
+    "isn": ("isn", "isin"),
+    "investment_date": ("investment_date", "date"),
+    "amount_invested": ("amount_invested", "amount"),
+    "nav_at_investment": ("nav_at_investment", "nav"),
+    "units": ("units",),
+    "type": ("type", "transaction_type"),
+}
+_REQUIRED = ("isn", "investment_date", "amount_invested", "nav_at_investment")
+
+# Statement transaction types that add units; redemptions, switch-outs, taxes and payouts
+# have no lot to create and are counted as skipped
+_PURCHASE_TYPES = {"PURCHASE", "PURCHASE_SIP", "SWITCH_IN", "SWITCH_IN_MERGER", "DIVIDEND_REINVEST"}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%b-%Y", "%d-%m-%Y", "%d/%m/%Y")
+
+# Errors returned in a report; the count covers all of them
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportRowError(ValueError):
+    """A row that can't become a lot"""
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"Invalid date: {value!r}")
+
+
+def _parse_number(value, field: str) -> float:
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        raise ImportRowError(f"Invalid {field}: {value!r}")
+    if number <= 0:
+        raise ImportRowError(f"{field} must be positive")
+    return number
+
+
+def _is_purchase(kind: Optional[str]) -> bool:
+    return not kind or kind.strip().upper() in _PURCHASE_TYPES
+
+
+def _parse_lot(isn, investment_date, amount, nav, units=None) -> tuple:
+    """(isn, date, amount, nav, units or None) from raw field values"""
+    if not isn or not str(isn).strip():
+        raise ImportRowError("Missing ISN")
+    if isinstance(investment_date, str):
+        investment_date = _parse_date(investment_date)
+    return (
+        str(isn).strip().upper(),
+        investment_date,
+        _parse_number(amount, "amount_invested"),
+        _parse_number(nav, "nav_at_investment"),
+        _parse_number(units, "units") if units not in (None, "") else None,
+    )
+
+
+def iter_csv_lots(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[tuple], Optional[str]]]:
+    """
+    Parse CSV lots row by row: a header row, then one lot per row.
+    Yields (row number, lot, error); both are None for a skipped transaction type.
+    The header is row 1.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    positions = {}
+    for field, aliases in _COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                positions[field] = names.index(alias)
+                break
+    missing = [field for field in _REQUIRED if field not in positions]
+    if missing:
+        raise ImportRowError(f"Missing columns: {', '.join(missing)}")
+
+    for row_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        values = {field: row[index] if index < len(row) else None for field, index in positions.items()}
+        if not _is_purchase(values.get("type")):
+            yield row_number, None, None
+            continue
+        try:
+            lot = _parse_lot(
+                values["isn"], values["investment_date"] or "", values["amount_invested"],
+                values["nav_at_investment"], values.get("units")
+            )
+        except ImportRowError as e:
+            yield row_number, None, str(e)
+            continue
+        yield row_number, lot, None
+
+
+def iter_cas_json_lots(statement: dict) -> Iterator[Tuple[int, Optional[tuple], Optional[str]]]:
+    """
+    Parse the transactions of a consolidated account statement in its JSON export
+    ({"folios": [{"schemes": [{"isin", "transactions": [{"date", "amount", "nav", "units", "type"}]}]}]}).
+    Transactions are numbered in statement order; yields as iter_csv_lots.
+    """
+    row_number = 0
+    for folio in statement.get("folios", []):
+        for scheme in folio.get("schemes", []):
+            for transaction in scheme.get("transactions", []):
+                row_number += 1
+                if not _is_purchase(transaction.get("type")):
+                    yield row_number, None, None
+                    continue
+                try:
+                    lot = _parse_lot(
+                        scheme.get("isin"), str(transaction.get("date") or ""), transaction.get("amount"),
+                        transaction.get("nav"), transaction.get("units")
+                    )
+                except ImportRowError as e:
+                    yield row_number, None, str(e)
+                    continue
+                yield row_number, lot, None
+
+
+def import_investments(
+    db: Session,
+    user_id: str,
+    rows: Iterable[Tuple[int, Optional[tuple], Optional[str]]],
+    strict: bool = False,
+    dry_run: bool = False,
+    skip_duplicates: bool = True,
+    batch_size: int = 1000,
+) -> dict:
+    """
+    Import parsed lots for a user in one transaction.
+
+    Funds are resolved by ISN with one query; lots are inserted in batches of batch_size,
+    and positions and live streams are refreshed once at the end. Lots equal to one the
+    user already has (fund, date, amount and units) are skipped when skip_duplicates is set,
+    one per held copy, so a statement can be imported again. With strict, any row error aborts the import;
+    with dry_run everything is validated and nothing is written (imported is then
+    the number of lots that would be).
+    Returns {"imported", "duplicates", "skipped", "error_count", "errors": [{"row", "error"}], "dry_run"}.
+    """
+    errors = []
+    error_count = 0
+
+    def report(row_number: int, error: str) -> None:
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row_number, "error": error})
+
+    parsed = []
+    skipped = 0
+    for row_number, lot, error in rows:
+        if error is not None:
+            report(row_number, error)
+        elif lot is None:
+            skipped += 1
+        else:
+            parsed.append((row_number, lot))
+
+    isns = {lot[0] for _, lot in parsed}
+    funds: Dict[str, str] = dict(
+        db.query(MutualFund.isn, MutualFund.id).filter(MutualFund.isn.in_(isns)).all()
+    ) if isns else {}
+
+    # Counted, so identical lots within one file still import once per held copy
+    existing: Counter = Counter()
+    if skip_duplicates and funds:
+        existing.update(
+            (fund_id, investment_date, round(amount, 4), round(units, 4))
+            for fund_id, investment_date, amount, units in db.query(
+                Investment.fund_id, Investment.investment_date, Investment.amount_invested, Investment.units
+            ).filter(Investment.user_id == user_id, Investment.fund_id.in_(set(funds.values())))
+        )
+
+    lots: List[dict] = []
+    duplicates = 0
+    for row_number, (isn, investment_date, amount, nav, units) in parsed:
+        fund_id = funds.get(isn)
+        if fund_id is None:
+            report(row_number, f"Unknown ISN {isn}")
+            continue
+        units = units if units is not None else amount / nav
+        key = (fund_id, investment_date, round(amount, 4), round(units, 4))
+        if existing[key] > 0:
+            existing[key] -= 1
+            duplicates += 1
+            continue
+        lots.append({
+            "user_id": user_id,
+            "fund_id": fund_id,
+            "investment_date": investment_date,
+            "amount_invested": amount,
+            "nav_at_investment": nav,
+            "units": units,
+        })
+
+    errors.sort(key=lambda error: error["row"])
+    result = {
+        "imported": 0,
+        "duplicates": duplicates,
+        "skipped": skipped,
+        "error_count": error_count,
+        "errors": errors,
+        "dry_run": dry_run,
+    }
+    if strict and error_count:
+        return result
+    if dry_run:
+        result["imported"] = len(lots)
+        return result
+    if not lots:
+        return result
+
+    try:
+        for start in range(0, len(lots), batch_size):
+            db.execute(insert(Investment), lots[start:start + batch_size])
+        rebuild_positions(db, [user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    notify_portfolio_changed(db, user_id)
+
+    result["imported"] = len(lots)
+    logger.info(f"Imported {len(lots)} lots for user {user_id} ({duplicates} duplicates, {error_count} errors)")
+    return result
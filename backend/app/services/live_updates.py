@@ -0,0 +1,128 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional, Set
+import asyncio
+import json
+import logging
+
+from app.db.models import Investment
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioBroker:
+    """
+    Routes change notifications to the live streams of the users they affect.
+
+    Streams are indexed by user and users by the funds they hold, so a NAV batch only
+    touches the users holding those funds. Every stream waits on a one-slot queue:
+    a pending wake-up absorbs further ones, so bursts of ingest coalesce into a
+    single refresh per stream.
+
+    All state is owned by the event loop; publishers running in worker threads or
+    sync code hand their work over with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._streams: Dict[str, Set[asyncio.Queue]] = {}
+        self._fund_users: Dict[str, Set[str]] = {}
+        self._user_funds: Dict[str, Set[str]] = {}
+
+    @property
+    def stream_count(self) -> int:
+        return sum(len(queues) for queues in self._streams.values())
+
+    def has_streams(self, user_id: str) -> bool:
+        return user_id in self._streams
+
+    def subscribe(self, user_id: str, fund_ids: Iterable[str]) -> asyncio.Queue:
+        """Open a stream for a user (call on the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._streams.setdefault(user_id, set()).add(queue)
+        self._index(user_id, fund_ids)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        """Close a stream; the user leaves the fund index with their last stream"""
+        queues = self._streams.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._streams[user_id]
+            self._index(user_id, ())
+
+    def publish_nav_update(self, fund_ids: Iterable[str]) -> None:
+        """Wake the streams of every user holding one of the funds (thread-safe)"""
+        self._dispatch(self._nav_update, list(fund_ids))
+
+    def publish_portfolio_change(self, user_id: str, fund_ids: Iterable[str]) -> None:
+        """Re-index a user's holdings after their investments changed and wake their streams (thread-safe)"""
+        self._dispatch(self._portfolio_change, user_id, set(fund_ids))
+
+    def _index(self, user_id: str, fund_ids: Iterable[str]) -> None:
+        previous = self._user_funds.pop(user_id, set())
+        current = set(fund_ids) if user_id in self._streams else set()
+        for fund_id in previous - current:
+            users = self._fund_users.get(fund_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._fund_users[fund_id]
+        for fund_id in current - previous:
+            self._fund_users.setdefault(fund_id, set()).add(user_id)
+        if current:
+            self._user_funds[user_id] = current
+
+    def _wake(self, user_ids: Iterable[str]) -> None:
+        for user_id in user_ids:
+            for queue in self._streams.get(user_id, ()):
+                if queue.empty():
+                    queue.put_nowait(True)
+
+    def _nav_update(self, fund_ids: list) -> None:
+        users: Set[str] = set()
+        for fund_id in fund_ids:
+            users |= self._fund_users.get(fund_id, set())
+        if users:
+            logger.info(f"NAV update for {len(fund_ids)} funds reaches {len(users)} live users")
+        self._wake(users)
+
+    def _portfolio_change(self, user_id: str, fund_ids: Set[str]) -> None:
+        if user_id in self._streams:
+            self._index(user_id, fund_ids)
+            self._wake([user_id])
+
+    def _dispatch(self, callback, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback(*args)
+        else:
+            loop.call_soon_threadsafe(callback, *args)
+
+
+portfolio_broker = PortfolioBroker()
+
+
+def get_held_fund_ids(db: Session, user_id: str) -> Set[str]:
+    """Get the IDs of the funds a user holds."""
+    rows = db.query(Investment.fund_id).filter(Investment.user_id == user_id).distinct().all()
+    return {fund_id for (fund_id,) in rows}
+
+
+def notify_portfolio_changed(db: Session, user_id: str) -> None:
+    """Tell the user's live streams, if any, that their investments changed."""
+    if portfolio_broker.has_streams(user_id):
+        portfolio_broker.publish_portfolio_change(user_id, get_held_fund_ids(db, user_id))
+
+
+def format_event(event: str, data: dict) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
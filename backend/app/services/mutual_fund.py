@@ -1,7 +1,17 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert, func, and_
+from typing import Dict, List, Optional, Iterable
+from datetime import date
 
 from app.db.models import MutualFund, FundPerformance, FundAllocation, FundHolding, FundCapAllocation
+from app.services.fund_search import invalidate_fund_search_index
+from app.services.returns import refresh_fund_returns
+from app.services.nav_data import invalidate_nav_arrays
+from app.services.correlation import invalidate_correlations
+from app.services.live_updates import portfolio_broker
+from app.services.securities import resolve_security
+from app.services.fund_snapshots import editable_snapshot, in_effect
+from app.services.fund_similarity import mark_funds_changed
 
 def get_mutual_funds(db: Session, skip: int = 0, limit: int = 100) -> List[MutualFund]:
     """Get a list of mutual funds."""
@@ -19,17 +29,62 @@ def get_mutual_fund_performances(db: Session, fund_id: str) -> List[FundPerforma
     """Get performance data for a mutual fund."""
     return db.query(FundPerformance).filter(FundPerformance.fund_id == fund_id).all()
 
-def get_mutual_fund_allocations(db: Session, fund_id: str) -> List[FundAllocation]:
-    """Get sector allocations for a mutual fund."""
-    return db.query(FundAllocation).filter(FundAllocation.fund_id == fund_id).all()
+def get_mutual_fund_nav_series(db: Session, fund_id: str) -> List[dict]:
+    """Get a mutual fund's NAV history in date order as plain rows."""
+    rows = db.query(FundPerformance.date, FundPerformance.nav)\
+        .filter(FundPerformance.fund_id == fund_id)\
+        .order_by(FundPerformance.date)\
+        .all()
+    return [{"date": nav_date, "nav": nav} for nav_date, nav in rows]
 
-def get_mutual_fund_holdings(db: Session, fund_id: str) -> List[FundHolding]:
-    """Get stock holdings for a mutual fund."""
-    return db.query(FundHolding).filter(FundHolding.fund_id == fund_id).all()
+def get_latest_navs(
+    db: Session,
+    fund_ids: Optional[Iterable[str]] = None,
+    on_or_before: Optional[date] = None
+) -> Dict[str, float]:
+    """Get the latest NAV of each fund (all funds by default), or the last one on or before a date, in a single query."""
+    latest = db.query(
+        FundPerformance.fund_id,
+        func.max(FundPerformance.date).label("date")
+    ).group_by(FundPerformance.fund_id)
+    if fund_ids is not None:
+        latest = latest.filter(FundPerformance.fund_id.in_(list(fund_ids)))
+    if on_or_before is not None:
+        latest = latest.filter(FundPerformance.date <= on_or_before)
+    latest = latest.subquery()
+
+    rows = db.query(FundPerformance.fund_id, FundPerformance.nav)\
+        .join(latest, and_(
+            FundPerformance.fund_id == latest.c.fund_id,
+            FundPerformance.date == latest.c.date
+        ))\
+        .all()
+    return {fund_id: nav for fund_id, nav in rows}
+
+def get_mutual_fund_allocations(db: Session, fund_id: str, as_of: Optional[date] = None) -> List[FundAllocation]:
+    """Get sector allocations for a mutual fund, current or in effect on as_of."""
+    return in_effect(db.query(FundAllocation), FundAllocation, [fund_id], as_of).all()
+
+def get_mutual_fund_holdings(db: Session, fund_id: str, as_of: Optional[date] = None) -> List[FundHolding]:
+    """Get stock holdings for a mutual fund, current or in effect on as_of."""
+    return in_effect(db.query(FundHolding), FundHolding, [fund_id], as_of).all()
 
-def get_mutual_fund_cap_allocations(db: Session, fund_id: str) -> List[FundCapAllocation]:
-    """Get market cap allocations for a mutual fund."""
-    return db.query(FundCapAllocation).filter(FundCapAllocation.fund_id == fund_id).all()
+def get_mutual_fund_cap_allocations(db: Session, fund_id: str, as_of: Optional[date] = None) -> List[FundCapAllocation]:
+    """Get market cap allocations for a mutual fund, current or in effect on as_of."""
+    return in_effect(db.query(FundCapAllocation), FundCapAllocation, [fund_id], as_of).all()
+
+def get_mutual_fund_detail(db: Session, fund_id: str) -> Optional[dict]:
+    """Get a mutual fund with its NAV history and its current composition (not every version's rows)."""
+    fund = get_mutual_fund_by_id(db, fund_id)
+    if fund is None:
+        return None
+    return {
+        **{column.name: getattr(fund, column.name) for column in MutualFund.__table__.columns},
+        "performances": get_mutual_fund_nav_series(db, fund_id),
+        "sector_allocations": get_mutual_fund_allocations(db, fund_id),
+        "holdings": get_mutual_fund_holdings(db, fund_id),
+        "cap_allocations": get_mutual_fund_cap_allocations(db, fund_id),
+    }
 
 def create_mutual_fund(
     db: Session, 
@@ -50,6 +105,7 @@ def create_mutual_fund(
     db.add(db_fund)
     db.commit()
     db.refresh(db_fund)
+    invalidate_fund_search_index()
     return db_fund
 
 def add_fund_performance(
@@ -67,17 +123,43 @@ def add_fund_performance(
     db.add(db_performance)
     db.commit()
     db.refresh(db_performance)
+    refresh_after_nav_ingest(db, [fund_id])
     return db_performance
 
+def add_fund_performances(db: Session, performances: List[dict]) -> int:
+    """
+    Add a batch of NAV rows (dicts with fund_id, date and nav) in one statement,
+    then refresh derived data once for the affected funds.
+    """
+    if not performances:
+        return 0
+    db.execute(insert(FundPerformance), performances)
+    db.commit()
+    refresh_after_nav_ingest(db, {row["fund_id"] for row in performances})
+    return len(performances)
+
+def refresh_after_nav_ingest(db: Session, fund_ids: Iterable[str]) -> None:
+    """Recompute data derived from NAV history after new NAVs land for the given funds."""
+    fund_ids = list(fund_ids)
+    refresh_fund_returns(db, fund_ids)
+    invalidate_nav_arrays()
+    invalidate_correlations()
+    portfolio_broker.publish_nav_update(fund_ids)
+
 def add_fund_allocation(
     db: Session,
     fund_id: str,
     sector: str,
     percentage: float
 ) -> FundAllocation:
-    """Add sector allocation for a mutual fund."""
+    """
+    Add a sector allocation to a mutual fund's composition from today. Use
+    publish_fund_composition to record a full composition with its effective date.
+    """
+    snapshot = editable_snapshot(db, fund_id)
     db_allocation = FundAllocation(
         fund_id=fund_id,
+        snapshot_id=snapshot.id,
         sector=sector,
         percentage=percentage
     )
@@ -92,14 +174,21 @@ def add_fund_holding(
     stock_name: str,
     percentage: float
 ) -> FundHolding:
-    """Add stock holding for a mutual fund."""
+    """
+    Add a stock holding to a mutual fund's composition from today, resolving the stock to its
+    security. Use publish_fund_composition to record a full composition with its effective date.
+    """
+    snapshot = editable_snapshot(db, fund_id)
     db_holding = FundHolding(
         fund_id=fund_id,
+        snapshot_id=snapshot.id,
         stock_name=stock_name,
+        security_id=resolve_security(db, stock_name),
         percentage=percentage
     )
     db.add(db_holding)
     db.commit()
+    mark_funds_changed([fund_id])
     db.refresh(db_holding)
     return db_holding
 
@@ -109,9 +198,14 @@ def add_fund_cap_allocation(
     cap_type: str,
     percentage: float
 ) -> FundCapAllocation:
-    """Add market cap allocation for a mutual fund."""
+    """
+    Add a market cap allocation to a mutual fund's composition from today. Use
+    publish_fund_composition to record a full composition with its effective date.
+    """
+    snapshot = editable_snapshot(db, fund_id)
     db_cap_allocation = FundCapAllocation(
         fund_id=fund_id,
+        snapshot_id=snapshot.id,
         cap_type=cap_type,
         percentage=percentage
     )
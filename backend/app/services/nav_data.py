@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+import numpy as np
+import threading
+import time
+import logging
+
+from app.db.models import FundPerformance
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Spacing between funds in the composite (fund, date) key; comfortably above any date ordinal
+_FUND_STRIDE = 1 << 22
+
+
+class NavArrays:
+    """
+    NAV history of many funds packed into flat NumPy arrays.
+
+    Rows are sorted by fund and then by date, so each fund occupies the contiguous
+    slice starts[i]:ends[i]. Dates are stored as proleptic Gregorian ordinals.
+    """
+
+    def __init__(self, fund_ids: List[str], fund_codes: np.ndarray, dates: np.ndarray, navs: np.ndarray):
+        self.fund_ids = fund_ids
+        self.fund_index: Dict[str, int] = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+        self.fund_codes = fund_codes
+        self.dates = dates
+        self.navs = navs
+
+        counts = np.bincount(fund_codes, minlength=len(fund_ids))
+        self.ends = np.cumsum(counts)
+        self.starts = self.ends - counts
+        self._keys = fund_codes.astype(np.int64) * _FUND_STRIDE + dates
+
+    def __len__(self) -> int:
+        return len(self.fund_ids)
+
+    @property
+    def first_dates(self) -> np.ndarray:
+        return self.dates[self.starts]
+
+    @property
+    def last_positions(self) -> np.ndarray:
+        return self.ends - 1
+
+    def asof_positions(self, fund_codes: np.ndarray, ordinals: np.ndarray) -> np.ndarray:
+        """
+        Row position of the latest NAV on or before each (fund, date) pair,
+        or -1 where the fund has no NAV that early. Fully vectorized.
+        """
+        fund_codes = np.asarray(fund_codes, dtype=np.int64)
+        targets = fund_codes * _FUND_STRIDE + np.asarray(ordinals, dtype=np.int64)
+        positions = np.searchsorted(self._keys, targets, side="right") - 1
+        return np.where(positions >= self.starts[fund_codes], positions, -1)
+
+    def aligned_matrix(
+        self,
+        fund_codes: np.ndarray,
+        start_ordinal: Optional[int] = None,
+        end_ordinal: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        NAVs of the given funds on a shared date grid: every date in [start, end] on which
+        at least one of them has a NAV. Gaps are forward-filled as-of; cells before a
+        fund's first NAV are NaN. Returns (grid ordinals, dates x funds matrix).
+        """
+        fund_codes = np.asarray(fund_codes, dtype=np.int64)
+        selected = np.isin(self.fund_codes, fund_codes)
+        if start_ordinal is not None:
+            selected &= self.dates >= start_ordinal
+        if end_ordinal is not None:
+            selected &= self.dates <= end_ordinal
+        grid = np.unique(self.dates[selected])
+
+        positions = self.asof_positions(fund_codes[np.newaxis, :], grid[:, np.newaxis])
+        matrix = np.where(positions >= 0, self.navs[positions], np.nan)
+        return grid, matrix
+
+
+def load_nav_arrays(db: Session, fund_ids: Optional[List[str]] = None) -> NavArrays:
+    """Load NAV history for the given funds (all funds by default) in a single query"""
+    query = db.query(FundPerformance.fund_id, FundPerformance.date, FundPerformance.nav)
+    if fund_ids is not None:
+        query = query.filter(FundPerformance.fund_id.in_(fund_ids))
+    rows = query.order_by(FundPerformance.fund_id, FundPerformance.date).all()
+
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return NavArrays([], empty, empty, np.empty(0, dtype=np.float64))
+
+    fund_col, date_col, nav_col = zip(*rows)
+    funds = np.array(fund_col, dtype=object)
+    # Rows arrive grouped by fund in database collation order; code funds by order of appearance
+    boundaries = np.ones(len(funds), dtype=bool)
+    boundaries[1:] = funds[1:] != funds[:-1]
+    codes = np.cumsum(boundaries) - 1
+    ids = funds[boundaries].tolist()
+    dates = np.fromiter((nav_date.toordinal() for nav_date in date_col), dtype=np.int64, count=len(rows))
+    navs = np.asarray(nav_col, dtype=np.float64)
+
+    return NavArrays(ids, codes, dates, navs)
+
+
+def load_nav_window(db: Session, fund_ids: List[str], start_date: date, end_date: date) -> NavArrays:
+    """
+    Load only the NAVs needed to price the given funds over [start, end]: each fund's
+    latest NAV on or before start as the as-of anchor, plus every NAV after it up to end.
+    """
+    if not fund_ids:
+        empty = np.empty(0, dtype=np.int64)
+        return NavArrays([], empty, empty, np.empty(0, dtype=np.float64))
+
+    anchor_dates = db.query(
+        FundPerformance.fund_id,
+        func.max(FundPerformance.date).label("date")
+    ).filter(
+        FundPerformance.fund_id.in_(fund_ids),
+        FundPerformance.date <= start_date
+    ).group_by(FundPerformance.fund_id).subquery()
+
+    anchors = db.query(FundPerformance.fund_id, FundPerformance.date, FundPerformance.nav)\
+        .join(anchor_dates, and_(
+            FundPerformance.fund_id == anchor_dates.c.fund_id,
+            FundPerformance.date == anchor_dates.c.date
+        ))
+    window = db.query(FundPerformance.fund_id, FundPerformance.date, FundPerformance.nav)\
+        .filter(
+            FundPerformance.fund_id.in_(fund_ids),
+            FundPerformance.date > start_date,
+            FundPerformance.date <= end_date
+        )
+    rows = anchors.all() + window.all()
+
+    fund_index = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    codes = np.fromiter((fund_index[fund_id] for fund_id, _, _ in rows), dtype=np.int64, count=len(rows))
+    dates = np.fromiter((nav_date.toordinal() for _, nav_date, _ in rows), dtype=np.int64, count=len(rows))
+    navs = np.fromiter((nav for _, _, nav in rows), dtype=np.float64, count=len(rows))
+    order = np.lexsort((dates, codes))
+    return NavArrays(list(fund_ids), codes[order], dates[order], navs[order])
+
+
+_arrays: Optional[NavArrays] = None
+_arrays_built_at = 0.0
+_arrays_lock = threading.Lock()
+
+
+def get_nav_arrays(db: Session) -> NavArrays:
+    """
+    Shared NAV history of all funds, reloaded when invalidated or older than the TTL.
+    Caches derived from it compare identity with the returned object to know when to rebuild.
+    """
+    global _arrays, _arrays_built_at
+
+    with _arrays_lock:
+        stale = time.monotonic() - _arrays_built_at > settings.NAV_CACHE_TTL_SECONDS
+        if _arrays is None or stale:
+            started = time.perf_counter()
+            _arrays = load_nav_arrays(db)
+            _arrays_built_at = time.monotonic()
+            logger.info(
+                f"Loaded {len(_arrays.navs)} NAVs for {len(_arrays)} funds in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return _arrays
+
+
+def invalidate_nav_arrays() -> None:
+    """Drop the shared NAV history so it is reloaded on next use"""
+    global _arrays
+    with _arrays_lock:
+        _arrays = None
+
+
+def units_matrix(
+    grid: np.ndarray,
+    fund_columns: np.ndarray,
+    investment_ordinals: np.ndarray,
+    units: np.ndarray,
+    n_funds: int,
+) -> np.ndarray:
+    """
+    Units held of each fund on each grid date (dates x funds), given investment lots
+    as parallel arrays of fund column, investment date ordinal and units.
+    """
+    first_rows = np.searchsorted(grid, investment_ordinals, side="left")
+    deltas = np.zeros((len(grid) + 1, n_funds))
+    np.add.at(deltas, (first_rows, fund_columns), units)
+    return np.cumsum(deltas[:-1], axis=0)
+
+
+def to_date(ordinal: int) -> date:
+    return date.fromordinal(int(ordinal))
@@ -1,25 +1,188 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_
 from datetime import datetime, timedelta, date
-from typing import List, Optional, Dict
-import uuid
+from fastapi.concurrency import run_in_threadpool
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import numpy as np
+import hashlib
 
-from app.db.models import Investment, MutualFund, FundPerformance, FundAllocation, FundHolding, FundCapAllocation
+from app.db.models import (
+    Investment, Position, MutualFund, FundSnapshot, FundAllocation, FundHolding, FundCapAllocation, Security
+)
+from app.services.mutual_fund import get_latest_navs
+from app.services.fund_snapshots import in_effect
+from app.services.nav_data import get_nav_arrays, load_nav_window, units_matrix, to_date
+from app.services.xirr import xirr_for_sets
+from app.core.responses import column_records
 
-def get_portfolio_summary(db: Session, user_id: str):
+class PortfolioSnapshot:
     """
-    Get a summary of the user's portfolio including:
-    - Current value
-    - Initial investment
-    - Total return
-    - Return percentage
-    - Best performing fund
-    - Worst performing fund
+    One user's positions with everything the portfolio views derive from them:
+    latest NAVs, fund names, investment cash flows when loaded and, when loaded,
+    fund sector, stock and cap allocations, all as of one day (today by default). Stock allocations are per fund
+    (security ids, percentages) arrays, with the securities' names in security_names.
+    Positions in funds without any NAV are left out of all calculations.
+
+    cash_flows maps fund ids to [(date, -amount invested that day)]; with
+    cash_flows="portfolio" it has a single None key holding the whole portfolio's flows.
     """
-    # Get all investments for the user
-    investments = db.query(Investment).filter(Investment.user_id == user_id).all()
-    
-    if not investments:
+
+    def __init__(
+        self,
+        user_id: str,
+        positions: List[tuple],
+        latest_navs: Dict[str, float],
+        fund_names: Dict[str, str],
+        allocations: Optional[Dict[str, Dict[str, object]]] = None,
+        cash_flows: Optional[Dict[Optional[str], List[tuple]]] = None,
+        security_names: Optional[Dict[int, str]] = None,
+        as_of: Optional[date] = None,
+    ):
+        self.user_id = user_id
+        self.latest_navs = latest_navs
+        self.fund_names = fund_names
+        self.allocations = allocations
+        self.cash_flows = cash_flows
+        self.security_names = security_names or {}
+        self.as_of = as_of or datetime.now().date()
+
+        # Priced positions, in first-investment order
+        self.funds: Dict[str, dict] = {}
+        for fund_id, units, invested, first_investment_date in sorted(positions, key=lambda p: (p[3], p[0])):
+            if fund_id not in latest_navs:
+                continue
+            self.funds[fund_id] = {
+                "units": units,
+                "invested": invested,
+                "first_investment_date": first_investment_date,
+                "current_value": units * latest_navs[fund_id],
+            }
+
+    @property
+    def current_value(self) -> float:
+        return sum(fund["current_value"] for fund in self.funds.values())
+
+    def fund_name(self, fund_id: str) -> str:
+        return self.fund_names.get(fund_id, "Unknown Fund")
+
+    def fund_cash_flows(self, fund_id: str) -> List[tuple]:
+        if self.cash_flows is None or None in self.cash_flows:
+            raise ValueError("Snapshot was loaded without per-fund cash flows")
+        return self.cash_flows.get(fund_id, [])
+
+    def portfolio_cash_flows(self) -> List[tuple]:
+        if self.cash_flows is None:
+            raise ValueError("Snapshot was loaded without cash flows")
+        if None in self.cash_flows:
+            return list(self.cash_flows[None])
+        return [flow for fund_id in self.funds for flow in self.cash_flows.get(fund_id, [])]
+
+
+# Cash flow granularities a snapshot can load; "funds" also serves the portfolio XIRR
+_CASH_FLOWS = (None, "portfolio", "funds")
+
+
+def load_portfolio_snapshot(
+    db: Session,
+    user_id: str,
+    with_allocations: bool = False,
+    cash_flows: Optional[str] = "funds",
+    as_of: Optional[date] = None,
+) -> PortfolioSnapshot:
+    """
+    Load a user's portfolio snapshot with a fixed number of queries, independent of
+    the number of investments and funds held.
+
+    Holdings come from the positions table, one row per fund. Lots are only read for
+    the XIRR cash flows, summed per day: per fund (cash_flows="funds"), for the whole
+    portfolio ("portfolio") or not at all (None).
+
+    With as_of, the portfolio is the one held at the end of that day: positions are
+    summed from the lots made by then, NAVs are the last on or before it and fund
+    compositions are the versions then in effect.
+    """
+    if cash_flows not in _CASH_FLOWS:
+        raise ValueError(f"Invalid cash_flows: {cash_flows}")
+    if as_of is None:
+        positions = db.query(
+            Position.fund_id,
+            Position.units,
+            Position.invested,
+            Position.first_investment_date
+        ).filter(Position.user_id == user_id).all()
+    else:
+        positions = db.query(
+            Investment.fund_id,
+            func.sum(Investment.units),
+            func.sum(Investment.amount_invested),
+            func.min(Investment.investment_date)
+        ).filter(Investment.user_id == user_id, Investment.investment_date <= as_of).group_by(Investment.fund_id).all()
+
+    fund_ids = {fund_id for fund_id, _, _, _ in positions}
+    empty_flows = None if cash_flows is None else {}
+    if not fund_ids:
+        return PortfolioSnapshot(
+            user_id, [], {}, {}, {"sectors": {}, "stocks": {}, "caps": {}} if with_allocations else None, empty_flows,
+            as_of=as_of
+        )
+
+    latest_navs = get_latest_navs(db, fund_ids, on_or_before=as_of)
+    fund_names = dict(db.query(MutualFund.id, MutualFund.name).filter(MutualFund.id.in_(fund_ids)).all())
+    priced = [fund_id for fund_id in fund_ids if fund_id in latest_navs]
+
+    flows = empty_flows
+    lot_filter = (Investment.user_id == user_id, Investment.fund_id.in_(priced))
+    if as_of is not None:
+        lot_filter += (Investment.investment_date <= as_of,)
+    if cash_flows == "funds" and priced:
+        rows = db.query(Investment.fund_id, Investment.investment_date, func.sum(Investment.amount_invested)).filter(
+            *lot_filter
+        ).group_by(Investment.fund_id, Investment.investment_date).all()
+        for fund_id, investment_date, amount in rows:
+            flows.setdefault(fund_id, []).append((investment_date, -amount))
+    elif cash_flows == "portfolio" and priced:
+        rows = db.query(Investment.investment_date, func.sum(Investment.amount_invested)).filter(
+            *lot_filter
+        ).group_by(Investment.investment_date).all()
+        flows[None] = [(investment_date, -amount) for investment_date, amount in rows]
+
+    allocations = None
+    security_names = None
+    if with_allocations:
+        allocations = {"sectors": {}, "stocks": {}, "caps": {}}
+        for kind, model, label in (
+            ("sectors", FundAllocation, FundAllocation.sector),
+            ("caps", FundCapAllocation, FundCapAllocation.cap_type),
+        ):
+            rows = in_effect(db.query(model.fund_id, label, model.percentage), model, fund_ids, as_of).all()
+            for fund_id, name, percentage in rows:
+                allocations[kind].setdefault(fund_id, []).append((name, percentage))
+
+        # Holdings as integer security ids; names are read once per distinct security
+        rows = in_effect(
+            db.query(FundHolding.fund_id, FundHolding.security_id, FundHolding.percentage), FundHolding, fund_ids, as_of
+        ).filter(FundHolding.security_id.isnot(None)).all()
+        stocks: Dict[str, tuple] = {}
+        for fund_id, security_id, percentage in rows:
+            ids, percentages = stocks.setdefault(fund_id, ([], []))
+            ids.append(security_id)
+            percentages.append(percentage)
+        allocations["stocks"] = {
+            fund_id: (np.array(ids, dtype=np.int64), np.array(percentages, dtype=np.float64))
+            for fund_id, (ids, percentages) in stocks.items()
+        }
+        security_ids = {security_id for _, security_id, _ in rows}
+        security_names = dict(
+            db.query(Security.id, Security.name).filter(Security.id.in_(security_ids)).all()
+        ) if security_ids else {}
+
+    return PortfolioSnapshot(user_id, positions, latest_navs, fund_names, allocations, flows, security_names, as_of)
+
+
+def summarize_portfolio(snapshot: PortfolioSnapshot) -> dict:
+    """Portfolio summary computed from a snapshot"""
+    if not snapshot.funds:
         return {
             "current_value": 0,
             "initial_investment": 0,
@@ -28,56 +191,27 @@ def get_portfolio_summary(db: Session, user_id: str):
             "best_performing_fund": "",
             "best_performing_return": 0,
             "worst_performing_fund": "",
-            "worst_performing_return": 0
+            "worst_performing_return": 0,
+            "xirr": None
         }
     
-    # Calculate current value and total investment
-    current_value = 0
-    initial_investment = 0
-    fund_performance = {}
+    current_value = snapshot.current_value
+    initial_investment = sum(fund["invested"] for fund in snapshot.funds.values())
     
-    for investment in investments:
-        # Get the latest NAV for the fund
-        latest_nav = db.query(FundPerformance)\
-            .filter(FundPerformance.fund_id == investment.fund_id)\
-            .order_by(FundPerformance.date.desc())\
-            .first()
-        
-        if latest_nav:
-            # Calculate current value of this investment
-            investment_value = investment.units * latest_nav.nav
-            current_value += investment_value
-            
-            # Add to initial investment
-            initial_investment += investment.amount_invested
-            
-            # Calculate return for this fund
-            fund_return = (investment_value - investment.amount_invested) / investment.amount_invested * 100
-            
-            # Get fund name
-            fund = db.query(MutualFund).filter(MutualFund.id == investment.fund_id).first()
-            fund_name = fund.name if fund else "Unknown Fund"
-            
-            fund_performance[fund_name] = fund_return
+    # Money-weighted return, treating the current value as a redemption today
+    xirr = xirr_for_sets([snapshot.portfolio_cash_flows() + [(snapshot.as_of, current_value)]])[0]
     
     # Calculate total return
     total_return = current_value - initial_investment
     return_percentage = (total_return / initial_investment) * 100 if initial_investment > 0 else 0
     
-    # Find best and worst performing funds
-    best_fund = ""
-    best_return = -float('inf')
-    worst_fund = ""
-    worst_return = float('inf')
-    
-    for fund_name, fund_return in fund_performance.items():
-        if fund_return > best_return:
-            best_fund = fund_name
-            best_return = fund_return
-        
-        if fund_return < worst_return:
-            worst_fund = fund_name
-            worst_return = fund_return
+    # Find best and worst performing funds by return on the amount invested in them
+    fund_returns = {
+        snapshot.fund_name(fund_id): (fund["current_value"] - fund["invested"]) / fund["invested"] * 100
+        for fund_id, fund in snapshot.funds.items() if fund["invested"] > 0
+    }
+    best_fund = max(fund_returns, key=fund_returns.get, default="")
+    worst_fund = min(fund_returns, key=fund_returns.get, default="")
     
     return {
         "current_value": current_value,
@@ -85,242 +219,496 @@ def get_portfolio_summary(db: Session, user_id: str):
         "total_return": total_return,
         "return_percentage": return_percentage,
         "best_performing_fund": best_fund,
-        "best_performing_return": best_return,
+        "best_performing_return": fund_returns.get(best_fund, 0),
         "worst_performing_fund": worst_fund,
-        "worst_performing_return": worst_return
+        "worst_performing_return": fund_returns.get(worst_fund, 0),
+        "xirr": xirr
     }
 
-def get_portfolio_performance(db: Session, user_id: str, timeframe: str = "1M"):
+def get_portfolio_summary(db: Session, user_id: str):
     """
-    Get performance data for the user's portfolio over a specified timeframe.
-    Timeframes: 1M, 3M, 6M, 1Y, 3Y, MAX
+    Get a summary of the user's portfolio including:
+    - Current value
+    - Initial investment
+    - Total return
+    - Return percentage
+    - Best performing fund
+    - Worst performing fund
+    - XIRR (money-weighted annual return)
     """
-    # Determine date range based on timeframe
-    end_date = datetime.now().date()
+    return summarize_portfolio(load_portfolio_snapshot(db, user_id, cash_flows="portfolio"))
+
+def portfolio_holdings(snapshot: PortfolioSnapshot) -> List[dict]:
+    """Per-fund holdings computed from a snapshot"""
+    funds = list(snapshot.funds.items())
     
-    if timeframe == "1M":
-        start_date = end_date - timedelta(days=30)
-    elif timeframe == "3M":
-        start_date = end_date - timedelta(days=90)
-    elif timeframe == "6M":
-        start_date = end_date - timedelta(days=180)
-    elif timeframe == "1Y":
-        start_date = end_date - timedelta(days=365)
-    elif timeframe == "3Y":
-        start_date = end_date - timedelta(days=365 * 3)
-    else:  # MAX
-        start_date = date(2000, 1, 1)  # A date far in the past
+    # Solve every fund's XIRR in one batch
+    rates = xirr_for_sets([
+        snapshot.fund_cash_flows(fund_id) + [(snapshot.as_of, fund["current_value"])] for fund_id, fund in funds
+    ])
     
-    # Get all investments for the user
-    investments = db.query(Investment).filter(Investment.user_id == user_id).all()
+    result = []
+    for (fund_id, fund), rate in zip(funds, rates):
+        invested = fund["invested"]
+        result.append({
+            "fund_id": fund_id,
+            "fund_name": snapshot.fund_name(fund_id),
+            "units": fund["units"],
+            "invested": invested,
+            "current_value": fund["current_value"],
+            "return_percentage": (fund["current_value"] - invested) / invested * 100 if invested > 0 else 0,
+            "xirr": rate
+        })
     
+    result.sort(key=lambda x: x["current_value"], reverse=True)
+    return result
+
+def get_portfolio_holdings(db: Session, user_id: str):
+    """
+    Get the user's holdings aggregated per fund, with current value,
+    absolute return and XIRR for each fund.
+    """
+    return portfolio_holdings(load_portfolio_snapshot(db, user_id))
+
+# Look-back of each fixed performance timeframe in days; anything else means MAX
+PERFORMANCE_TIMEFRAMES = {"1M": 30, "3M": 90, "6M": 180, "1Y": 365, "3Y": 365 * 3}
+
+
+def _investments_fingerprint(investments) -> str:
+    """Short hash of the user's lots; changes whenever an investment is added, edited or removed"""
+    digest = hashlib.sha1()
+    for investment_id, fund_id, investment_date, units in sorted(investments):
+        digest.update(f"{investment_id}|{fund_id}|{investment_date}|{units!r};".encode())
+    return digest.hexdigest()[:12]
+
+
+def _parse_since(since: str):
+    """A since value is either a date (YYYY-MM-DD) or a version token (<settled date>.<fingerprint>)"""
+    settled, _, fingerprint = since.partition(".")
+    try:
+        return date.fromisoformat(settled), fingerprint or None
+    except ValueError:
+        raise ValueError(f"Invalid since value: {since}")
+
+
+def get_portfolio_performance_window(
+    db: Session,
+    user_id: str,
+    timeframe: str = "1M",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    since: Optional[str] = None,
+) -> dict:
+    """
+    Get daily portfolio values over a window, optionally only the points that are new or
+    changed since an earlier fetch.
+
+    The window is start_date..end_date when given, otherwise the timeframe ending today.
+    since is either a date, returning points after it, or the version token from an earlier
+    response. A version records the date up to which every held fund had a real NAV, so
+    points after it (forward-filled or new) are sent again; if the investments changed
+    since the token was issued the full window is returned with reset set.
+
+    Only NAVs inside the computed range (plus one as-of anchor per fund) are read.
+    Returns {"points", "version", "reset"}.
+    """
+    end_date = end_date or datetime.now().date()
+    investments = db.query(
+        Investment.id, Investment.fund_id, Investment.investment_date, Investment.units
+    ).filter(Investment.user_id == user_id).all()
+    fingerprint = _investments_fingerprint(investments)
+
+    if start_date is None:
+        if timeframe in PERFORMANCE_TIMEFRAMES:
+            start_date = end_date - timedelta(days=PERFORMANCE_TIMEFRAMES[timeframe])
+        else:  # MAX
+            start_date = min((day for _, _, day, _ in investments), default=end_date)
+
+    reset = False
+    compute_from = start_date
+    if since is not None:
+        since_date, since_fingerprint = _parse_since(since)
+        if since_fingerprint is not None and since_fingerprint != fingerprint:
+            reset = True
+        else:
+            compute_from = max(start_date, since_date + timedelta(days=1))
+
     if not investments:
-        return []
+        return {"points": [], "version": f"{end_date.isoformat()}.{fingerprint}", "reset": reset}
+
+    fund_ids = sorted({fund_id for _, fund_id, _, _ in investments})
+    columns = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    arrays = load_nav_window(db, fund_ids, compute_from, end_date)
+
+    # Everything up to the earliest last NAV among held funds is final
+    priced = arrays.ends > arrays.starts
+    last_dates = arrays.dates[arrays.ends[priced] - 1]
+    settled = to_date(last_dates.min()) if len(last_dates) else end_date
+    version = f"{min(settled, end_date).isoformat()}.{fingerprint}"
+
+    if compute_from > end_date:
+        return {"points": [], "version": version, "reset": reset}
+
+    grid = np.arange(compute_from.toordinal(), end_date.toordinal() + 1)
+    codes = np.arange(len(fund_ids))
+    positions = arrays.asof_positions(codes[np.newaxis, :], grid[:, np.newaxis])
+    navs = np.where(positions >= 0, arrays.navs[np.maximum(positions, 0)], 0.0) if len(arrays.navs) else np.zeros(positions.shape)
+    units = units_matrix(
+        grid,
+        np.array([columns[fund_id] for _, fund_id, _, _ in investments]),
+        np.array([day.toordinal() for _, _, day, _ in investments]),
+        np.array([lot_units for _, _, _, lot_units in investments], dtype=np.float64),
+        len(fund_ids),
+    )
+    values = (units * navs).sum(axis=1)
+
+    held = values > 0
+    points = column_records(date=[to_date(ordinal) for ordinal in grid[held].tolist()], value=values[held])
+    return {"points": points, "version": version, "reset": reset}
+
+
+def get_portfolio_performance(
+    db: Session,
+    user_id: str,
+    timeframe: str = "1M",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Get performance data for the user's portfolio over a specified timeframe.
+    Timeframes: 1M, 3M, 6M, 1Y, 3Y, MAX
+    """
+    return get_portfolio_performance_window(db, user_id, timeframe, start_date, end_date)["points"]
+
+def _stock_exposure(snapshot: PortfolioSnapshot):
+    """(security ids, amounts held through all funds), summed per security over integer ids"""
+    ids, amounts = [], []
+    for fund_id, fund in snapshot.funds.items():
+        fund_ids, percentages = snapshot.allocations["stocks"].get(fund_id, _NO_STOCKS)
+        ids.append(fund_ids)
+        amounts.append(percentages * (fund["current_value"] / 100))
+    if not ids:
+        return _NO_STOCKS
+    securities, codes = np.unique(np.concatenate(ids), return_inverse=True)
+    return securities, np.bincount(codes, weights=np.concatenate(amounts), minlength=len(securities))
+
+
+_NO_STOCKS = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+
+
+def portfolio_composition(snapshot: PortfolioSnapshot) -> dict:
+    """Sector, stock and market cap composition computed from a snapshot with allocations"""
+    portfolio_value = snapshot.current_value
     
-    # Get performance data for each date in the range
-    performance_data = []
-    current_date = start_date
+    def percentage_of(amount: float) -> float:
+        return (amount / portfolio_value) * 100 if portfolio_value > 0 else 0
     
-    while current_date <= end_date:
-        portfolio_value = 0
-        
-        for investment in investments:
-            # If investment date is after current date, skip
-            if investment.investment_date > current_date:
-                continue
-            
-            # Get the NAV for the fund on this date
-            nav = db.query(FundPerformance)\
-                .filter(
-                    FundPerformance.fund_id == investment.fund_id,
-                    FundPerformance.date <= current_date
-                )\
-                .order_by(FundPerformance.date.desc())\
-                .first()
-            
-            if nav:
-                # Calculate value of this investment on this date
-                investment_value = investment.units * nav.nav
-                portfolio_value += investment_value
+    def breakdown(kind: str, key: str) -> List[dict]:
+        amounts: Dict[str, float] = {}
+        for fund_id, fund in snapshot.funds.items():
+            for name, percentage in snapshot.allocations[kind].get(fund_id, ()):
+                amounts[name] = amounts.get(name, 0) + fund["current_value"] * (percentage / 100)
         
-        # Add data point
-        if portfolio_value > 0:
-            performance_data.append({
-                "date": current_date,
-                "value": portfolio_value
+        result = [
+            {key: name, "amount": amount, "percentage": percentage_of(amount)}
+            for name, amount in amounts.items()
+        ]
+        # Sort by percentage in descending order
+        result.sort(key=lambda x: x["percentage"], reverse=True)
+        return result
+    
+    securities, amounts = _stock_exposure(snapshot)
+    order = np.argsort(-amounts, kind="stable")
+    stock_allocations = [
+        {"stock_name": snapshot.security_names.get(security_id, "Unknown"), "amount": amount, "percentage": percentage_of(amount)}
+        for security_id, amount in zip(securities[order].tolist(), amounts[order].tolist())
+    ]
+    
+    return {
+        "sector_allocations": breakdown("sectors", "sector"),
+        "stock_allocations": stock_allocations,
+        "cap_allocations": breakdown("caps", "cap_type")
+    }
+
+def portfolio_overlap(snapshot: PortfolioSnapshot) -> List[dict]:
+    """
+    Stock overlap between every pair of held funds, computed from a snapshot with allocations.
+    Common stock counts for all pairs come from one product of the funds' security incidence matrix.
+    """
+    fund_ids = list(snapshot.funds)
+    stock_ids = [np.unique(snapshot.allocations["stocks"].get(fund_id, _NO_STOCKS)[0]) for fund_id in fund_ids]
+    securities = np.unique(np.concatenate(stock_ids)) if stock_ids else _NO_STOCKS[0]
+    incidence = np.zeros((len(fund_ids), len(securities)), dtype=np.int32)
+    for i, ids in enumerate(stock_ids):
+        incidence[i, np.searchsorted(securities, ids)] = 1
+    common = incidence @ incidence.T
+    counts = incidence.sum(axis=1)
+    
+    result = []
+    for i, fund_id1 in enumerate(fund_ids):
+        for j in range(i + 1, len(fund_ids)):
+            shared = securities[np.flatnonzero(incidence[i] & incidence[j])].tolist() if common[i, j] else []
+            result.append({
+                "fund1_name": snapshot.fund_name(fund_id1),
+                "fund2_name": snapshot.fund_name(fund_ids[j]),
+                "overlap_percentage": float(common[i, j] / counts[i] * 100) if counts[i] else 0,
+                "common_stocks": sorted(snapshot.security_names.get(security_id, "Unknown") for security_id in shared)
             })
-        
-        # Move to next date
-        current_date += timedelta(days=1)
     
-    return performance_data
+    result.sort(key=lambda x: x["overlap_percentage"], reverse=True)
+    return result
 
-def get_portfolio_composition(db: Session, user_id: str):
+def get_portfolio_composition(db: Session, user_id: str, as_of: Optional[date] = None):
     """
-    Get composition details of the user's portfolio including:
+    Get composition details of the user's portfolio, today or as held on as_of, including:
     - Sector allocations
     - Stock allocations
     - Market cap allocations
     """
-    # Get all investments for the user
-    investments = db.query(Investment).filter(Investment.user_id == user_id).all()
-    
-    if not investments:
-        return {
-            "sector_allocations": [],
-            "stock_allocations": [],
-            "cap_allocations": []
+    return portfolio_composition(
+        load_portfolio_snapshot(db, user_id, with_allocations=True, cash_flows=None, as_of=as_of)
+    )
+
+# Point spacings of the composition history: month ends or weeks back from the end date
+COMPOSITION_FREQUENCIES = ("M", "W")
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _composition_points(start_date: date, end_date: date, frequency: str) -> np.ndarray:
+    """Ordinals of the history points in [start, end]; the end date is always the last point"""
+    start, end = start_date.toordinal(), end_date.toordinal()
+    if frequency == "W":
+        return np.arange(end, start - 1, -7)[::-1]
+    months = np.arange(np.datetime64(start_date, "M"), np.datetime64(end_date, "M") + 1)
+    month_ends = ((months + 1).astype("datetime64[D]") - 1).astype(np.int64) + _EPOCH_ORDINAL
+    points = month_ends[(month_ends >= start) & (month_ends < end)]
+    return np.append(points, end)
+
+
+def _snapshot_positions(snapshots: List[tuple], fund_columns: Dict[str, int], grid: np.ndarray) -> np.ndarray:
+    """
+    Row in snapshots of the version in effect for each (grid date, fund column), or -1,
+    found with one searchsorted over (fund, valid_from) keys as NavArrays does for NAVs.
+    snapshots are (id, fund_id, valid_from, valid_to) rows sorted by fund column and valid_from.
+    """
+    n_funds = len(fund_columns)
+    if not snapshots:
+        return np.full((len(grid), n_funds), -1)
+    codes = np.array([fund_columns[fund_id] for _, fund_id, _, _ in snapshots], dtype=np.int64)
+    valid_from = np.array([day.toordinal() for _, _, day, _ in snapshots], dtype=np.int64)
+    valid_to = np.array([day.toordinal() if day else np.iinfo(np.int64).max for _, _, _, day in snapshots])
+    stride = int(max(grid.max(), valid_from.max())) + 1
+    keys = codes * stride + valid_from
+
+    columns = np.arange(n_funds, dtype=np.int64)
+    positions = np.searchsorted(keys, columns[np.newaxis, :] * stride + grid[:, np.newaxis], side="right") - 1
+    safe = np.maximum(positions, 0)
+    in_effect_then = (positions >= 0) & (codes[safe] == columns) & (valid_to[safe] > grid[:, np.newaxis])
+    return np.where(in_effect_then, positions, -1)
+
+
+def get_portfolio_composition_history(
+    db: Session,
+    user_id: str,
+    timeframe: str = "3Y",
+    frequency: str = "M",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> List[dict]:
+    """
+    Sector and market cap mix of the user's portfolio at monthly (frequency="M", month
+    ends) or weekly ("W") points over a window, the end date included.
+
+    Computed in one pass with a fixed number of queries: units held per point from the
+    lots, as-of NAVs from the shared NAV history, and each fund's composition version
+    in effect at each point. Exposures are (points x funds values) times (version x label
+    weights), gathered per point, with percentages of the portfolio value at that point.
+    Points before the first investment are left out.
+    """
+    if frequency not in COMPOSITION_FREQUENCIES:
+        raise ValueError(f"Invalid frequency: {frequency}")
+    end_date = end_date or datetime.now().date()
+    lots = db.query(Investment.fund_id, Investment.investment_date, Investment.units).filter(
+        Investment.user_id == user_id, Investment.investment_date <= end_date
+    ).all()
+    if not lots:
+        return []
+    if start_date is None:
+        if timeframe in PERFORMANCE_TIMEFRAMES:
+            start_date = end_date - timedelta(days=PERFORMANCE_TIMEFRAMES[timeframe])
+        else:  # MAX
+            start_date = min(day for _, day, _ in lots)
+    start_date = max(start_date, min(day for _, day, _ in lots))
+    if start_date > end_date:
+        return []
+
+    fund_ids = sorted({fund_id for fund_id, _, _ in lots})
+    columns = {fund_id: i for i, fund_id in enumerate(fund_ids)}
+    grid = _composition_points(start_date, end_date, frequency)
+
+    units = units_matrix(
+        grid,
+        np.array([columns[fund_id] for fund_id, _, _ in lots]),
+        np.array([day.toordinal() for _, day, _ in lots]),
+        np.array([lot_units for _, _, lot_units in lots], dtype=np.float64),
+        len(fund_ids),
+    )
+    # As-of NAVs come from the shared NAV history; funds without any NAV are worth nothing
+    arrays = get_nav_arrays(db)
+    codes = np.array([arrays.fund_index.get(fund_id, -1) for fund_id in fund_ids], dtype=np.int64)
+    priced = codes >= 0
+    navs = np.zeros((len(grid), len(fund_ids)))
+    if priced.any():
+        nav_positions = arrays.asof_positions(codes[priced][np.newaxis, :], grid[:, np.newaxis])
+        navs[:, priced] = np.where(nav_positions >= 0, arrays.navs[np.maximum(nav_positions, 0)], 0.0)
+    values = units * navs  # points x funds
+    totals = values.sum(axis=1)
+
+    snapshots = db.query(FundSnapshot.id, FundSnapshot.fund_id, FundSnapshot.valid_from, FundSnapshot.valid_to).filter(
+        FundSnapshot.fund_id.in_(fund_ids),
+        FundSnapshot.valid_from <= end_date,
+        or_(FundSnapshot.valid_to.is_(None), FundSnapshot.valid_to > start_date)
+    ).all()
+    snapshots.sort(key=lambda row: (columns[row[1]], row[2]))
+    versions = _snapshot_positions(snapshots, columns, grid)
+    snapshot_rows = {row[0]: i for i, row in enumerate(snapshots)}
+
+    def exposures(model, label) -> Tuple[List[str], np.ndarray]:
+        rows = db.query(model.snapshot_id, label, model.percentage).filter(
+            model.snapshot_id.in_(list(snapshot_rows))
+        ).all() if snapshot_rows else []
+        labels = sorted({name for _, name, _ in rows})
+        label_columns = {name: i for i, name in enumerate(labels)}
+        # One extra all-zero row stands for "no version in effect" (-1)
+        weights = np.zeros((len(snapshots) + 1, len(labels)))
+        for snapshot_id, name, percentage in rows:
+            weights[snapshot_rows[snapshot_id], label_columns[name]] += percentage / 100
+        amounts = np.einsum("pf,pfl->pl", values, weights[versions])
+        return labels, amounts
+
+    sectors, sector_amounts = exposures(FundAllocation, FundAllocation.sector)
+    cap_types, cap_amounts = exposures(FundCapAllocation, FundCapAllocation.cap_type)
+
+    held = totals > 0
+    scale = np.divide(100.0, totals, out=np.zeros_like(totals), where=held)
+    sector_percentages = (sector_amounts * scale[:, np.newaxis])[held].tolist()
+    cap_percentages = (cap_amounts * scale[:, np.newaxis])[held].tolist()
+    return [
+        {
+            "date": to_date(ordinal),
+            "value": value,
+            "sector_allocations": dict(zip(sectors, sector_row)),
+            "cap_allocations": dict(zip(cap_types, cap_row)),
         }
-    
-    # Calculate portfolio value
-    portfolio_value = 0
-    investment_values = {}
-    
-    for investment in investments:
-        # Get the latest NAV for the fund
-        latest_nav = db.query(FundPerformance)\
-            .filter(FundPerformance.fund_id == investment.fund_id)\
-            .order_by(FundPerformance.date.desc())\
-            .first()
-        
-        if latest_nav:
-            # Calculate current value of this investment
-            investment_value = investment.units * latest_nav.nav
-            investment_values[investment.fund_id] = investment_value
-            portfolio_value += investment_value
-    
-    # Initialize dictionaries to aggregate allocations
-    sector_allocations = {}
-    stock_allocations = {}
-    cap_allocations = {}
-    
-    # Process each investment
-    for investment in investments:
-        if investment.fund_id not in investment_values:
-            continue
-        
-        investment_value = investment_values[investment.fund_id]
-        investment_weight = investment_value / portfolio_value if portfolio_value > 0 else 0
-        
-        # Get sector allocations for this fund
-        fund_sectors = db.query(FundAllocation).filter(FundAllocation.fund_id == investment.fund_id).all()
-        for sector in fund_sectors:
-            sector_value = investment_value * (sector.percentage / 100)
-            if sector.sector in sector_allocations:
-                sector_allocations[sector.sector] += sector_value
-            else:
-                sector_allocations[sector.sector] = sector_value
-        
-        # Get stock holdings for this fund
-        fund_holdings = db.query(FundHolding).filter(FundHolding.fund_id == investment.fund_id).all()
-        for holding in fund_holdings:
-            stock_value = investment_value * (holding.percentage / 100)
-            if holding.stock_name in stock_allocations:
-                stock_allocations[holding.stock_name] += stock_value
-            else:
-                stock_allocations[holding.stock_name] = stock_value
-        
-        # Get market cap allocations for this fund
-        fund_caps = db.query(FundCapAllocation).filter(FundCapAllocation.fund_id == investment.fund_id).all()
-        for cap in fund_caps:
-            cap_value = investment_value * (cap.percentage / 100)
-            if cap.cap_type in cap_allocations:
-                cap_allocations[cap.cap_type] += cap_value
-            else:
-                cap_allocations[cap.cap_type] = cap_value
-    
-    # Convert to percentage and format for response
-    sector_result = []
-    for sector, amount in sector_allocations.items():
-        percentage = (amount / portfolio_value) * 100 if portfolio_value > 0 else 0
-        sector_result.append({
-            "sector": sector,
-            "amount": amount,
-            "percentage": percentage
-        })
-    
-    stock_result = []
-    for stock, amount in stock_allocations.items():
-        percentage = (amount / portfolio_value) * 100 if portfolio_value > 0 else 0
-        stock_result.append({
-            "stock_name": stock,
-            "amount": amount,
-            "percentage": percentage
-        })
-    
-    cap_result = []
-    for cap_type, amount in cap_allocations.items():
-        percentage = (amount / portfolio_value) * 100 if portfolio_value > 0 else 0
-        cap_result.append({
-            "cap_type": cap_type,
-            "amount": amount,
-            "percentage": percentage
-        })
-    
-    # Sort by percentage in descending order
-    sector_result.sort(key=lambda x: x["percentage"], reverse=True)
-    stock_result.sort(key=lambda x: x["percentage"], reverse=True)
-    cap_result.sort(key=lambda x: x["percentage"], reverse=True)
-    
-    return {
-        "sector_allocations": sector_result,
-        "stock_allocations": stock_result,
-        "cap_allocations": cap_result
-    }
+        for ordinal, value, sector_row, cap_row in zip(
+            grid[held].tolist(), totals[held].tolist(), sector_percentages, cap_percentages
+        )
+    ]
+
+# Sections of the dashboard endpoint; all but performance are computed from one snapshot
+DASHBOARD_SECTIONS = ("summary", "holdings", "performance", "composition", "overlap")
+
+_SNAPSHOT_SECTIONS = {
+    "summary": summarize_portfolio,
+    "holdings": portfolio_holdings,
+    "composition": portfolio_composition,
+    "overlap": portfolio_overlap,
+}
+
+
+async def get_portfolio_dashboard(
+    session_factory: Callable[[], Session],
+    user_id: str,
+    sections: Iterable[str] = DASHBOARD_SECTIONS,
+    timeframe: str = "1M",
+) -> dict:
+    """
+    Get several portfolio views in one call.
+
+    The snapshot (positions, cash flows, latest NAVs, names and allocations) is loaded once and
+    every selected section is computed from it; the performance series, which reads
+    NAV history, loads concurrently on its own session. Sections not requested are None.
+    """
+    sections = set(sections)
+
+    def with_session(fn, *args):
+        db = session_factory()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    loads = []
+    snapshot_sections = [name for name in DASHBOARD_SECTIONS if name in sections and name in _SNAPSHOT_SECTIONS]
+    if snapshot_sections:
+        with_allocations = "composition" in sections or "overlap" in sections
+        cash_flows = "funds" if "holdings" in sections else "portfolio" if "summary" in sections else None
+        loads.append(run_in_threadpool(with_session, load_portfolio_snapshot, user_id, with_allocations, cash_flows))
+    if "performance" in sections:
+        loads.append(run_in_threadpool(with_session, get_portfolio_performance, user_id, timeframe))
+    loaded = await asyncio.gather(*loads)
+
+    result = {name: None for name in DASHBOARD_SECTIONS}
+    if "performance" in sections:
+        result["performance"] = loaded[-1]
+    if snapshot_sections:
+        snapshot = loaded[0]
+        computed = await asyncio.gather(*(
+            run_in_threadpool(_SNAPSHOT_SECTIONS[name], snapshot) for name in snapshot_sections
+        ))
+        result.update(zip(snapshot_sections, computed))
+    return result
 
-def get_fund_overlap(db: Session, fund_id1: str, fund_id2: Optional[str] = None):
+def get_fund_overlap(db: Session, fund_id1: str, fund_id2: Optional[str] = None, as_of: Optional[date] = None):
     """
     Get overlap analysis between mutual funds.
     If fund_id2 is provided, calculate overlap between the two funds.
     If fund_id2 is not provided, calculate overlap between fund_id1 and all other funds.
+    Holdings are the current ones, or those in effect on as_of.
+
+    Holdings are compared by security id, so name variants of one stock match. Against all
+    funds, only the other funds' holdings of fund1's securities are read, in one query.
     """
-    # Get holdings for fund1
-    fund1_holdings = db.query(FundHolding).filter(FundHolding.fund_id == fund_id1).all()
-    fund1_stocks = set(holding.stock_name for holding in fund1_holdings)
+    fund1_stocks = {
+        security_id for (security_id,) in in_effect(
+            db.query(FundHolding.security_id), FundHolding, [fund_id1], as_of
+        ).filter(FundHolding.security_id.isnot(None))
+    }
     
     # Get fund1 name
     fund1 = db.query(MutualFund).filter(MutualFund.id == fund_id1).first()
     fund1_name = fund1.name if fund1 else "Unknown Fund"
     
-    result = []
-    
+    # Holdings of fund1's securities in the other funds, as (fund_id, security_id)
+    shared = in_effect(db.query(FundHolding.fund_id, FundHolding.security_id), FundHolding, as_of=as_of).filter(
+        FundHolding.security_id.in_(fund1_stocks)
+    )
     if fund_id2:
-        # Calculate overlap with a specific fund
-        fund2_holdings = db.query(FundHolding).filter(FundHolding.fund_id == fund_id2).all()
-        fund2_stocks = set(holding.stock_name for holding in fund2_holdings)
-        
-        # Get fund2 name
-        fund2 = db.query(MutualFund).filter(MutualFund.id == fund_id2).first()
-        fund2_name = fund2.name if fund2 else "Unknown Fund"
-        
-        # Calculate overlap
-        common_stocks = fund1_stocks.intersection(fund2_stocks)
-        overlap_percentage = (len(common_stocks) / len(fund1_stocks)) * 100 if fund1_stocks else 0
-        
+        shared = shared.filter(FundHolding.fund_id == fund_id2)
+        other_funds = db.query(MutualFund.id, MutualFund.name).filter(MutualFund.id == fund_id2).all()
+        other_funds = other_funds or [(fund_id2, "Unknown Fund")]
+    else:
+        shared = shared.filter(FundHolding.fund_id != fund_id1)
+        other_funds = db.query(MutualFund.id, MutualFund.name).filter(MutualFund.id != fund_id1).all()
+    
+    common: Dict[str, set] = {}
+    if fund1_stocks:
+        for fund_id, security_id in shared:
+            common.setdefault(fund_id, set()).add(security_id)
+    names = dict(
+        db.query(Security.id, Security.name).filter(Security.id.in_(fund1_stocks)).all()
+    ) if fund1_stocks else {}
+    
+    result = []
+    for fund_id, fund_name in other_funds:
+        common_stocks = common.get(fund_id, set())
         result.append({
             "fund1_name": fund1_name,
-            "fund2_name": fund2_name,
-            "overlap_percentage": overlap_percentage,
-            "common_stocks": list(common_stocks)
+            "fund2_name": fund_name,
+            "overlap_percentage": (len(common_stocks) / len(fund1_stocks)) * 100 if fund1_stocks else 0,
+            "common_stocks": sorted(names[security_id] for security_id in common_stocks)
         })
-    else:
-        # Calculate overlap with all other funds
-        all_funds = db.query(MutualFund).filter(MutualFund.id != fund_id1).all()
-        
-        for fund2 in all_funds:
-            fund2_holdings = db.query(FundHolding).filter(FundHolding.fund_id == fund2.id).all()
-            fund2_stocks = set(holding.stock_name for holding in fund2_holdings)
-            
-            # Calculate overlap
-            common_stocks = fund1_stocks.intersection(fund2_stocks)
-            overlap_percentage = (len(common_stocks) / len(fund1_stocks)) * 100 if fund1_stocks else 0
-            
-            result.append({
-                "fund1_name": fund1_name,
-                "fund2_name": fund2.name,
-                "overlap_percentage": overlap_percentage,
-                "common_stocks": list(common_stocks)
-            })
     
     # Sort by overlap percentage in descending order
     result.sort(key=lambda x: x["overlap_percentage"], reverse=True)
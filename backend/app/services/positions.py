@@ -0,0 +1,102 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select
+from typing import Iterable, Optional
+from datetime import date
+
+from app.db.models import Investment, Position
+
+# Position maintenance runs inside the caller's transaction, before its commit, so a lot
+# and its position always change together. Each function locks the position row it adjusts.
+
+
+def _locked_position(db: Session, user_id: str, fund_id: str) -> Optional[Position]:
+    # Positions added earlier in this transaction must be visible
+    db.flush()
+    return db.query(Position).filter(
+        Position.user_id == user_id, Position.fund_id == fund_id
+    ).with_for_update().first()
+
+
+def _first_investment_date(db: Session, user_id: str, fund_id: str) -> Optional[date]:
+    db.flush()
+    return db.query(func.min(Investment.investment_date)).filter(
+        Investment.user_id == user_id, Investment.fund_id == fund_id
+    ).scalar()
+
+
+def add_lot(db: Session, investment: Investment) -> None:
+    """Add a new lot to its (user, fund) position"""
+    position = _locked_position(db, investment.user_id, investment.fund_id)
+    if position is None:
+        db.add(Position(
+            user_id=investment.user_id,
+            fund_id=investment.fund_id,
+            units=investment.units,
+            invested=investment.amount_invested,
+            first_investment_date=investment.investment_date,
+            lot_count=1
+        ))
+        return
+    position.units += investment.units
+    position.invested += investment.amount_invested
+    position.first_investment_date = min(position.first_investment_date, investment.investment_date)
+    position.lot_count += 1
+
+
+def replace_lot(db: Session, investment: Investment, old_units: float, old_amount: float, old_date: date) -> None:
+    """Apply an edit of a lot (its new values are on investment) to its position"""
+    position = _locked_position(db, investment.user_id, investment.fund_id)
+    if position is None:
+        rebuild_positions(db, [investment.user_id])
+        return
+    position.units += investment.units - old_units
+    position.invested += investment.amount_invested - old_amount
+    if investment.investment_date < position.first_investment_date:
+        position.first_investment_date = investment.investment_date
+    elif old_date == position.first_investment_date and investment.investment_date != old_date:
+        position.first_investment_date = _first_investment_date(db, investment.user_id, investment.fund_id)
+
+
+def remove_lot(db: Session, investment: Investment) -> None:
+    """Take a deleted lot out of its position, dropping the position with its last lot"""
+    position = _locked_position(db, investment.user_id, investment.fund_id)
+    if position is None:
+        return
+    if position.lot_count <= 1:
+        db.delete(position)
+        return
+    position.units -= investment.units
+    position.invested -= investment.amount_invested
+    position.lot_count -= 1
+    if investment.investment_date == position.first_investment_date:
+        position.first_investment_date = _first_investment_date(db, investment.user_id, investment.fund_id)
+
+
+def rebuild_positions(db: Session, user_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Recompute positions from the investment lots with one delete and one INSERT ... SELECT,
+    for the given users or everyone. Flushes but doesn't commit; returns the positions written.
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    db.flush()
+
+    aggregated = select(
+        Investment.user_id,
+        Investment.fund_id,
+        func.sum(Investment.units),
+        func.sum(Investment.amount_invested),
+        func.min(Investment.investment_date),
+        func.count()
+    ).group_by(Investment.user_id, Investment.fund_id)
+    stale = delete(Position)
+    if user_ids is not None:
+        aggregated = aggregated.where(Investment.user_id.in_(user_ids))
+        stale = stale.where(Position.user_id.in_(user_ids))
+
+    db.execute(stale)
+    result = db.execute(insert(Position).from_select(
+        ["user_id", "fund_id", "units", "invested", "first_investment_date", "lot_count"], aggregated
+    ))
+    # Rows were changed behind the identity map
+    db.expire_all()
+    return result.rowcount
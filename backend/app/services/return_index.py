@@ -0,0 +1,134 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from datetime import date
+import numpy as np
+import threading
+import time
+import logging
+
+from app.services.nav_data import NavArrays, get_nav_arrays, to_date
+
+logger = logging.getLogger(__name__)
+
+
+class ReturnIndex:
+    """
+    Per-fund cumulative log-return index over the NAV history.
+
+    cumulative[i] is the sum of daily log returns of row i's fund from its first NAV
+    up to row i, so the return between any two rows of a fund is exp(C[end] - C[start]) - 1.
+    NAVs that aren't positive (bad data) have no log; they add nothing to the index and
+    ranges that touch them have no return (unpriced[i] counts such rows up to row i).
+    """
+
+    def __init__(self, arrays: NavArrays):
+        self.arrays = arrays
+        self.priced = np.isfinite(arrays.navs) & (arrays.navs > 0)
+        self.unpriced = np.cumsum(~self.priced)
+        log_navs = np.log(np.where(self.priced, arrays.navs, np.nan))
+        log_returns = np.diff(log_navs, prepend=0.0)
+        log_returns[arrays.starts] = 0.0
+        log_returns[~np.isfinite(log_returns)] = 0.0
+        running = np.cumsum(log_returns)
+        # Restart the running sum at each fund so magnitudes stay small
+        offsets = np.repeat(running[arrays.starts], arrays.ends - arrays.starts)
+        self.cumulative = running - offsets
+
+    def fund_codes(self, fund_ids: List[str]) -> np.ndarray:
+        """Index codes for fund ids, -1 for funds without NAV history"""
+        return np.array([self.arrays.fund_index.get(fund_id, -1) for fund_id in fund_ids], dtype=np.int64)
+
+    def range_returns(
+        self,
+        fund_codes: np.ndarray,
+        start_ordinals: np.ndarray,
+        end_ordinals: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Absolute and annualized returns for many (fund, start, end) triples at once.
+
+        Both dates resolve as-of to the last NAV on or before them, which covers
+        weekends and holidays. Returns (absolute, annualized, start_positions, end_positions);
+        invalid triples have NaN returns and -1 positions, and ranges touching a NAV that
+        isn't positive have NaN returns.
+        """
+        known = (fund_codes >= 0) & (len(self.arrays) > 0)
+        if not known.any():
+            missing = np.full(len(fund_codes), -1)
+            return np.full(len(fund_codes), np.nan), np.full(len(fund_codes), np.nan), missing, missing
+        codes = np.where(known, fund_codes, 0)
+        start_positions = np.where(known, self.arrays.asof_positions(codes, start_ordinals), -1)
+        end_positions = np.where(known, self.arrays.asof_positions(codes, end_ordinals), -1)
+
+        valid = (start_positions >= 0) & (end_positions >= start_positions)
+        start_safe = np.where(valid, start_positions, 0)
+        end_safe = np.where(valid, end_positions, 0)
+
+        # Unpriced rows from start through end, both of the same fund
+        touched = self.unpriced[end_safe] - self.unpriced[start_safe] + ~self.priced[start_safe]
+        priced = valid & (touched == 0)
+        log_growth = self.cumulative[end_safe] - self.cumulative[start_safe]
+        days = self.arrays.dates[end_safe] - self.arrays.dates[start_safe]
+        absolute = np.where(priced, np.expm1(log_growth), np.nan)
+        annualized = np.where(
+            priced & (days > 0),
+            np.expm1(log_growth * 365.0 / np.maximum(days, 1)),
+            np.nan,
+        )
+
+        start_positions = np.where(valid, start_positions, -1)
+        end_positions = np.where(valid, end_positions, -1)
+        return absolute * 100, annualized * 100, start_positions, end_positions
+
+
+_index: Optional[ReturnIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_return_index(db: Session) -> ReturnIndex:
+    """Return the shared index, rebuilding it whenever the shared NAV history was reloaded"""
+    global _index
+
+    arrays = get_nav_arrays(db)
+    with _index_lock:
+        if _index is None or _index.arrays is not arrays:
+            started = time.perf_counter()
+            _index = ReturnIndex(arrays)
+            logger.info(
+                f"Built return index over {len(arrays.navs)} NAVs in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return _index
+
+
+def get_range_returns(db: Session, queries: List[Tuple[str, date, date]]) -> List[dict]:
+    """
+    Get absolute and annualized returns for many (fund_id, start_date, end_date) triples
+    in one vectorized pass over the return index.
+    """
+    index = get_return_index(db)
+    if not queries:
+        return []
+
+    fund_ids = [fund_id for fund_id, _, _ in queries]
+    start_ordinals = np.array([start.toordinal() for _, start, _ in queries], dtype=np.int64)
+    end_ordinals = np.array([end.toordinal() for _, _, end in queries], dtype=np.int64)
+
+    absolute, annualized, start_positions, end_positions = index.range_returns(
+        index.fund_codes(fund_ids), start_ordinals, end_ordinals
+    )
+    dates = index.arrays.dates
+
+    results = []
+    for i, (fund_id, start_date, end_date) in enumerate(queries):
+        valid = start_positions[i] >= 0
+        results.append({
+            "fund_id": fund_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "resolved_start_date": to_date(dates[start_positions[i]]) if valid else None,
+            "resolved_end_date": to_date(dates[end_positions[i]]) if valid else None,
+            "absolute_return": None if np.isnan(absolute[i]) else float(absolute[i]),
+            "annualized_return": None if np.isnan(annualized[i]) else float(annualized[i])
+        })
+    return results
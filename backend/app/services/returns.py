@@ -0,0 +1,147 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Dict, List, Optional
+import numpy as np
+import logging
+
+from app.db.models import MutualFund, FundReturn
+from app.services.nav_data import NavArrays, load_nav_arrays, to_date
+
+logger = logging.getLogger(__name__)
+
+# Trailing periods in days, matching the portfolio timeframes
+TRAILING_PERIODS = {
+    "one_month": 30,
+    "three_month": 90,
+    "six_month": 180,
+    "one_year": 365,
+    "three_year": 365 * 3,
+    "five_year": 365 * 5,
+}
+
+RETURN_FIELDS = list(TRAILING_PERIODS) + ["since_inception"]
+SORTABLE_FIELDS = RETURN_FIELDS + ["name"]
+
+
+def _period_return(start_navs: np.ndarray, end_navs: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    Return in percent between two NAVs: absolute below one year, CAGR from one year up.
+    """
+    growth = end_navs / start_navs
+    years = days / 365.0
+    annualized = np.power(growth, 1.0 / np.maximum(years, 1.0)) - 1.0
+    return np.where(years >= 1.0, annualized, growth - 1.0) * 100
+
+
+def compute_trailing_returns(arrays: NavArrays) -> Dict[str, np.ndarray]:
+    """
+    Trailing returns for every fund in one vectorized pass.
+
+    Each period start is resolved as-of (the last NAV on or before the target date),
+    so weekends and holidays fall back to the previous trading day. Periods longer than
+    a fund's history are NaN.
+    """
+    fund_codes = np.arange(len(arrays))
+    last = arrays.last_positions
+    last_dates = arrays.dates[last]
+    last_navs = arrays.navs[last]
+
+    result = {"as_of_date": last_dates}
+    for field, days in TRAILING_PERIODS.items():
+        positions = arrays.asof_positions(fund_codes, last_dates - days)
+        valid = positions >= 0
+        start_navs = np.where(valid, arrays.navs[np.maximum(positions, 0)], np.nan)
+        result[field] = _period_return(start_navs, last_navs, np.full(len(arrays), days))
+
+    first = arrays.starts
+    inception_days = last_dates - arrays.dates[first]
+    result["since_inception"] = np.where(
+        inception_days > 0,
+        _period_return(arrays.navs[first], last_navs, inception_days),
+        np.nan,
+    )
+    return result
+
+
+def refresh_fund_returns(db: Session, fund_ids: Optional[List[str]] = None) -> int:
+    """
+    Recompute trailing returns for the given funds (all funds by default)
+    and replace their rows in the fund_returns table.
+    """
+    arrays = load_nav_arrays(db, fund_ids)
+    returns = compute_trailing_returns(arrays)
+
+    rows = []
+    for i, fund_id in enumerate(arrays.fund_ids):
+        row = {"fund_id": fund_id, "as_of_date": to_date(returns["as_of_date"][i])}
+        for field in RETURN_FIELDS:
+            value = returns[field][i]
+            row[field] = None if np.isnan(value) else float(value)
+        rows.append(row)
+
+    try:
+        stale = db.query(FundReturn)
+        if fund_ids is not None:
+            stale = stale.filter(FundReturn.fund_id.in_(fund_ids))
+        stale.delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(FundReturn), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Error refreshing fund returns")
+        raise
+
+    logger.info(f"Refreshed trailing returns for {len(rows)} funds")
+    return len(rows)
+
+
+def get_fund_returns(
+    db: Session,
+    fund_type: Optional[str] = None,
+    fund_category: Optional[str] = None,
+    fund_house: Optional[str] = None,
+    sort_by: str = "one_year",
+    descending: bool = True,
+    skip: int = 0,
+    limit: int = 100
+) -> List[dict]:
+    """Get precomputed trailing returns joined with fund names, filtered and sorted."""
+    query = db.query(FundReturn, MutualFund.name).join(MutualFund, MutualFund.id == FundReturn.fund_id)
+
+    if fund_type:
+        query = query.filter(MutualFund.fund_type == fund_type)
+    if fund_category:
+        query = query.filter(MutualFund.fund_category == fund_category)
+    if fund_house:
+        query = query.filter(MutualFund.fund_house == fund_house)
+
+    column = MutualFund.name if sort_by == "name" else getattr(FundReturn, sort_by)
+    order = column.desc() if descending else column.asc()
+    query = query.order_by(order.nulls_last(), MutualFund.name)
+
+    results = []
+    for fund_return, name in query.offset(skip).limit(limit).all():
+        results.append({
+            "fund_id": fund_return.fund_id,
+            "name": name,
+            "as_of_date": fund_return.as_of_date,
+            "one_month": fund_return.one_month,
+            "three_month": fund_return.three_month,
+            "six_month": fund_return.six_month,
+            "one_year": fund_return.one_year,
+            "three_year": fund_return.three_year,
+            "five_year": fund_return.five_year,
+            "since_inception": fund_return.since_inception
+        })
+    return results
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Refreshed trailing returns for {refresh_fund_returns(db)} funds")
+    finally:
+        db.close()
@@ -0,0 +1,296 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import threading
+import time
+import logging
+
+from app.db.models import Investment
+from app.core.config import settings
+from app.services.nav_data import NavArrays, get_nav_arrays, units_matrix, to_date
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+# Look-back windows in calendar days (None = full history)
+RISK_WINDOWS = {"1Y": 365, "3Y": 365 * 3, "5Y": 365 * 5, "MAX": None}
+
+# Rolling returns are measured over one year of trading days
+ROLLING_WINDOW = TRADING_DAYS
+
+# Funds per chunk when computing the whole universe, to bound matrix memory
+_CHUNK_SIZE = 2000
+
+
+def _masked_mean(values: np.ndarray, valid: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid, values, 0.0).sum(axis=0) / counts
+
+
+def compute_risk_metrics(
+    grid: np.ndarray,
+    navs: np.ndarray,
+    benchmark_returns: Optional[np.ndarray] = None,
+    risk_free_rate: Optional[float] = None,
+    rolling_window: int = ROLLING_WINDOW,
+) -> Dict[str, np.ndarray]:
+    """
+    Risk metrics for every column of a dates x series NAV matrix, without Python loops.
+
+    navs may contain leading NaNs for series that start late. benchmark_returns, when
+    given, are daily returns aligned with the grid (length len(grid) - 1) used for beta.
+    Returns, volatility and drawdowns are in percent.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = settings.RISK_FREE_RATE
+    daily_risk_free = risk_free_rate / 100 / TRADING_DAYS
+
+    n_series = navs.shape[1]
+    if len(grid) < 2:
+        empty = np.full(n_series, np.nan)
+        return {
+            "observations": np.zeros(n_series, dtype=np.int64),
+            "start_date": np.full(n_series, -1),
+            "annualized_return": empty, "volatility": empty, "sharpe_ratio": empty,
+            "sortino_ratio": empty, "beta": empty, "max_drawdown": empty,
+            "rolling_return_mean": empty, "rolling_return_min": empty,
+            "rolling_return_max": empty, "rolling_return_positive_share": empty,
+        }
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = navs[1:] / navs[:-1] - 1.0
+        valid = ~np.isnan(returns)
+        counts = valid.sum(axis=0)
+        mean = _masked_mean(returns, valid, counts)
+
+        deviations = np.where(valid, returns - mean, 0.0)
+        variance = (deviations ** 2).sum(axis=0) / (counts - 1)
+        volatility = np.sqrt(variance * TRADING_DAYS)
+
+        excess = mean - daily_risk_free
+        downside = np.minimum(np.where(valid, returns - daily_risk_free, 0.0), 0.0)
+        downside_deviation = np.sqrt((downside ** 2).sum(axis=0) / counts * TRADING_DAYS)
+        sharpe = excess * TRADING_DAYS / volatility
+        sortino = excess * TRADING_DAYS / downside_deviation
+
+        # Compound annual growth from each series' first NAV in the window
+        listed = ~np.isnan(navs)
+        first_rows = np.argmax(listed, axis=0)
+        first_navs = navs[first_rows, np.arange(n_series)]
+        years = (grid[-1] - grid[first_rows]) / 365.0
+        annualized = np.where(years > 0, (navs[-1] / first_navs) ** (1.0 / years) - 1.0, np.nan)
+
+        # Beta against the benchmark on days where both have a return
+        beta = np.full(n_series, np.nan)
+        if benchmark_returns is not None:
+            joint = valid & ~np.isnan(benchmark_returns)[:, np.newaxis]
+            joint_counts = joint.sum(axis=0)
+            series_mean = _masked_mean(returns, joint, joint_counts)
+            bench = np.broadcast_to(benchmark_returns[:, np.newaxis], returns.shape)
+            bench_mean = _masked_mean(bench, joint, joint_counts)
+            series_dev = np.where(joint, returns - series_mean, 0.0)
+            bench_dev = np.where(joint, bench - bench_mean, 0.0)
+            beta = (series_dev * bench_dev).sum(axis=0) / (bench_dev ** 2).sum(axis=0)
+
+        # Drawdown from the running peak; NaN cells before listing are ignored by fmax
+        peaks = np.fmax.accumulate(navs, axis=0)
+        drawdowns = np.where(listed, navs / peaks - 1.0, 0.0)
+        max_drawdown = np.where(listed.any(axis=0), drawdowns.min(axis=0), np.nan)
+
+        # Rolling returns over strided windows of rolling_window + 1 NAVs
+        rolling_mean = rolling_min = rolling_max = rolling_positive = np.full(n_series, np.nan)
+        if len(grid) > rolling_window:
+            windows = sliding_window_view(navs, rolling_window + 1, axis=0)
+            rolling = windows[..., -1] / windows[..., 0] - 1.0
+            rolling_valid = ~np.isnan(rolling)
+            rolling_counts = rolling_valid.sum(axis=0)
+            has_rolling = rolling_counts > 0
+            rolling_mean = _masked_mean(rolling, rolling_valid, rolling_counts)
+            rolling_min = np.where(has_rolling, np.where(rolling_valid, rolling, np.inf).min(axis=0), np.nan)
+            rolling_max = np.where(has_rolling, np.where(rolling_valid, rolling, -np.inf).max(axis=0), np.nan)
+            rolling_positive = (rolling_valid & (rolling > 0)).sum(axis=0) / rolling_counts
+
+    no_data = counts == 0
+    return {
+        "observations": counts,
+        "start_date": np.where(no_data, -1, grid[first_rows]),
+        "annualized_return": annualized * 100,
+        "volatility": np.where(counts > 1, volatility * 100, np.nan),
+        "sharpe_ratio": np.where(counts > 1, sharpe, np.nan),
+        "sortino_ratio": sortino,
+        "beta": beta,
+        "max_drawdown": max_drawdown * 100,
+        "rolling_return_mean": rolling_mean * 100,
+        "rolling_return_min": rolling_min * 100,
+        "rolling_return_max": rolling_max * 100,
+        "rolling_return_positive_share": rolling_positive * 100,
+    }
+
+
+def _window_bounds(arrays: NavArrays, window: str) -> Tuple[int, Optional[int]]:
+    """End ordinal (latest NAV date overall) and start ordinal of a look-back window"""
+    end = int(arrays.dates.max())
+    days = RISK_WINDOWS[window]
+    return end, None if days is None else end - days
+
+
+def _benchmark_returns(arrays: NavArrays, start: Optional[int], end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily benchmark returns on the universe date grid: the configured benchmark fund,
+    or the equal-weighted average return of all funds.
+    """
+    benchmark_id = settings.RISK_BENCHMARK_FUND_ID
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if benchmark_id and benchmark_id in arrays.fund_index:
+            grid, navs = arrays.aligned_matrix(np.array([arrays.fund_index[benchmark_id]]), start, end)
+            return grid, navs[1:, 0] / navs[:-1, 0] - 1.0
+
+        grid = np.unique(arrays.dates[arrays.dates >= start] if start is not None else arrays.dates)
+        totals = np.zeros(max(len(grid) - 1, 0))
+        counts = np.zeros(max(len(grid) - 1, 0))
+        for chunk_start in range(0, len(arrays), _CHUNK_SIZE):
+            codes = np.arange(chunk_start, min(chunk_start + _CHUNK_SIZE, len(arrays)))
+            positions = arrays.asof_positions(codes[np.newaxis, :], grid[:, np.newaxis])
+            navs = np.where(positions >= 0, arrays.navs[positions], np.nan)
+            returns = navs[1:] / navs[:-1] - 1.0
+            valid = ~np.isnan(returns)
+            totals += np.where(valid, returns, 0.0).sum(axis=1)
+            counts += valid.sum(axis=1)
+        return grid, totals / counts
+
+
+def _align_to(grid: np.ndarray, source_grid: np.ndarray, source_returns: np.ndarray) -> np.ndarray:
+    """Benchmark returns re-indexed to another grid; compounded over skipped dates"""
+    if np.array_equal(grid, source_grid):
+        return source_returns
+    index = np.concatenate(([1.0], np.cumprod(1.0 + np.nan_to_num(source_returns))))
+    positions = np.searchsorted(source_grid, grid, side="right") - 1
+    levels = np.where(positions >= 0, index[np.maximum(positions, 0)], np.nan)
+    return levels[1:] / levels[:-1] - 1.0
+
+
+class UniverseRisk:
+    """Risk metrics of every fund for one window, computed in chunks of funds"""
+
+    def __init__(self, arrays: NavArrays, window: str):
+        self.arrays = arrays
+        self.window = window
+        self.metrics: Dict[str, np.ndarray] = {}
+        if not len(arrays):
+            self.end, self.benchmark = 0, (np.empty(0), np.empty(0))
+            return
+
+        self.end, start = _window_bounds(arrays, window)
+        self.benchmark = _benchmark_returns(arrays, start, self.end)
+        bench_grid, bench_returns = self.benchmark
+
+        columns: Dict[str, List[np.ndarray]] = {}
+        for chunk_start in range(0, len(arrays), _CHUNK_SIZE):
+            codes = np.arange(chunk_start, min(chunk_start + _CHUNK_SIZE, len(arrays)))
+            grid, navs = arrays.aligned_matrix(codes, start, self.end)
+            metrics = compute_risk_metrics(grid, navs, _align_to(grid, bench_grid, bench_returns))
+            for name, values in metrics.items():
+                columns.setdefault(name, []).append(values)
+        self.metrics = {name: np.concatenate(parts) for name, parts in columns.items()}
+
+    def row(self, code: int) -> dict:
+        return _metrics_row(self.metrics, code, self.window, self.end)
+
+
+def _metrics_row(metrics: Dict[str, np.ndarray], column: int, window: str, end: int) -> dict:
+    observations = int(metrics["observations"][column])
+    row = {
+        "window": window,
+        "start_date": to_date(metrics["start_date"][column]) if observations else None,
+        "end_date": to_date(end) if observations else None,
+        "observations": observations
+    }
+    for name, values in metrics.items():
+        if name in row:
+            continue
+        value = float(values[column])
+        row[name] = None if not np.isfinite(value) else value
+    return row
+
+
+_universe: Dict[str, UniverseRisk] = {}
+_universe_lock = threading.Lock()
+
+
+def get_universe_risk(db: Session, window: str = "1Y") -> UniverseRisk:
+    """Batch risk metrics for all funds, cached per window until the NAV history is reloaded"""
+    arrays = get_nav_arrays(db)
+    with _universe_lock:
+        cached = _universe.get(window)
+        if cached is None or cached.arrays is not arrays:
+            started = time.perf_counter()
+            cached = _universe[window] = UniverseRisk(arrays, window)
+            logger.info(
+                f"Computed {window} risk metrics for {len(arrays)} funds in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return cached
+
+
+def get_fund_risk(db: Session, fund_id: str, window: str = "1Y") -> Optional[dict]:
+    """Get risk metrics for a single fund, served from the batch cache."""
+    universe = get_universe_risk(db, window)
+    code = universe.arrays.fund_index.get(fund_id)
+    if code is None:
+        return None
+    return {"fund_id": fund_id, **universe.row(code)}
+
+
+def get_portfolio_risk(db: Session, user_id: str, window: str = "1Y") -> Optional[dict]:
+    """
+    Get risk metrics for the user's portfolio.
+
+    The portfolio is treated as a unit-linked series: each day's return values the
+    previous day's holdings at today's NAVs, so new investments are not counted as gains.
+    """
+    investments = db.query(
+        Investment.fund_id, Investment.investment_date, Investment.units
+    ).filter(Investment.user_id == user_id).all()
+    if not investments:
+        return None
+
+    arrays = get_nav_arrays(db)
+    held = sorted({fund_id for fund_id, _, _ in investments if fund_id in arrays.fund_index})
+    if not held:
+        return None
+    columns = {fund_id: i for i, fund_id in enumerate(held)}
+    lots = [(fund_id, day, units) for fund_id, day, units in investments if fund_id in columns]
+
+    end, start = _window_bounds(arrays, window)
+    codes = np.array([arrays.fund_index[fund_id] for fund_id in held])
+    grid, navs = arrays.aligned_matrix(codes, start, end)
+    units = units_matrix(
+        grid,
+        np.array([columns[fund_id] for fund_id, _, _ in lots]),
+        np.array([day.toordinal() for _, day, _ in lots]),
+        np.array([lot_units for _, _, lot_units in lots], dtype=np.float64),
+        len(held),
+    )
+
+    priced = np.nan_to_num(navs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        held_value = (units[:-1] * priced[1:]).sum(axis=1)
+        previous_value = (units[:-1] * priced[:-1]).sum(axis=1)
+        daily = np.where(previous_value > 0, held_value / previous_value - 1.0, np.nan)
+
+    # Start the series on the first day anything was held
+    invested = np.flatnonzero(~np.isnan(daily))
+    if not len(invested):
+        return None
+    first = invested[0]
+    index = np.concatenate(([1.0], np.cumprod(1.0 + np.nan_to_num(daily[first:]))))
+    series_grid = grid[first:]
+
+    bench_grid, bench_returns = get_universe_risk(db, window).benchmark
+    metrics = compute_risk_metrics(
+        series_grid, index[:, np.newaxis], _align_to(series_grid, bench_grid, bench_returns)
+    )
+    return _metrics_row(metrics, 0, window, end)
+
@@ -0,0 +1,84 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, insert, update
+from typing import Dict, Iterable, Optional
+import re
+import logging
+
+from app.db.models import FundHolding, Security, SecurityAlias
+
+logger = logging.getLogger(__name__)
+
+# Corporate suffixes dropped from names before matching ("HDFC Bank Ltd." and "HDFC Bank" are one stock)
+_SUFFIXES = {"ltd", "limited", "inc", "corp", "corporation", "co", "company", "plc", "pvt", "private"}
+
+
+def normalize_security_name(name: str) -> str:
+    """Alias key of a stock name: case-folded, punctuation and corporate suffixes removed"""
+    words = re.sub(r"[^\w\s]", " ", name.casefold().replace("&", " and ")).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def resolve_security_names(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Security ids of many stock names, matched through their aliases. Securities for new
+    names are created with one INSERT ... RETURNING (flushed, not committed).
+    """
+    aliases = {name: normalize_security_name(name) for name in names}
+    known: Dict[str, int] = dict(
+        db.query(SecurityAlias.alias, SecurityAlias.security_id).filter(SecurityAlias.alias.in_(set(aliases.values())))
+    ) if aliases else {}
+
+    new: Dict[str, str] = {}  # alias -> first name seen, which becomes the canonical name
+    for name, alias in aliases.items():
+        if alias not in known:
+            new.setdefault(alias, name.strip())
+    if new:
+        table = Security.__table__
+        created = db.execute(
+            insert(table).returning(table.c.id, table.c.name), [{"name": name} for name in new.values()]
+        ).all()
+        ids = {name: security_id for security_id, name in created}
+        db.execute(
+            insert(SecurityAlias.__table__),
+            [{"alias": alias, "security_id": ids[name]} for alias, name in new.items()]
+        )
+        known.update((alias, ids[name]) for alias, name in new.items())
+    return {name: known[alias] for name, alias in aliases.items()}
+
+
+def resolve_security(db: Session, name: str) -> int:
+    """Security id of one stock name, creating the security if the name is new (flushes, doesn't commit)"""
+    alias = normalize_security_name(name)
+    security_id = db.query(SecurityAlias.security_id).filter(SecurityAlias.alias == alias).scalar()
+    if security_id is None:
+        security = Security(name=name.strip())
+        db.add(security)
+        db.flush()
+        db.add(SecurityAlias(alias=alias, security_id=security.id))
+        security_id = security.id
+    return security_id
+
+
+def resolve_holdings(db: Session, fund_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Set security_id on holdings that don't have one yet (of the given funds, or all),
+    resolving each distinct stock name once. Doesn't commit; returns the names resolved.
+    """
+    names = db.query(FundHolding.stock_name).filter(FundHolding.security_id.is_(None))
+    if fund_ids is not None:
+        names = names.filter(FundHolding.fund_id.in_(list(fund_ids)))
+    names = [name for (name,) in names.distinct()]
+    if not names:
+        return 0
+
+    resolved = resolve_security_names(db, names)
+    table = FundHolding.__table__
+    # Unresolved holdings of other funds with the same names are resolved along the way
+    statement = update(table).where(
+        table.c.stock_name == bindparam("name"), table.c.security_id.is_(None)
+    ).values(security_id=bindparam("resolved_id"))
+    db.execute(statement, [{"name": name, "resolved_id": security_id} for name, security_id in resolved.items()])
+    logger.info(f"Resolved {len(names)} stock names to securities")
+    return len(names)
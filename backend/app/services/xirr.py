@@ -0,0 +1,150 @@
+from typing import List, Optional, Sequence, Tuple
+from datetime import date
+import numpy as np
+
+# Bracket for the bisection fallback, as annual rates (-99.99% to +10,000%)
+_LOWER_RATE = -0.9999
+_UPPER_RATE = 100.0
+
+
+def _npv_and_derivative(rates: np.ndarray, amounts: np.ndarray, years: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """NPV of each cash-flow set at its rate, and the derivative with respect to the rate"""
+    base = (1.0 + rates)[:, np.newaxis]
+    discounted = amounts * base ** -years
+    npv = discounted.sum(axis=1)
+    derivative = (-years * discounted / base).sum(axis=1)
+    return npv, derivative
+
+
+def solve_xirr(
+    amounts: np.ndarray,
+    years: np.ndarray,
+    tolerance: float = 1e-9,
+    newton_iterations: int = 50,
+    bisection_iterations: int = 200,
+) -> np.ndarray:
+    """
+    Solve XIRR for many cash-flow sets at once.
+
+    amounts and years are (sets x flows) matrices, padded with zero amounts; years are
+    measured from each set's first flow. Newton's method runs on every set simultaneously
+    and sets it cannot settle fall back to a vectorized bisection. Sets without both an
+    outflow and an inflow, or with no root in the bracket, are NaN.
+    """
+    n_sets = amounts.shape[0]
+    rates = np.full(n_sets, 0.1)
+    solvable = (amounts < 0).any(axis=1) & (amounts > 0).any(axis=1)
+    converged = ~solvable
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(newton_iterations):
+            active = ~converged
+            if not active.any():
+                break
+            npv, derivative = _npv_and_derivative(rates[active], amounts[active], years[active])
+            step = npv / derivative
+            updated = rates[active] - step
+            # Keep Newton inside the bracket; sets that escape are left to bisection
+            updated = np.clip(updated, _LOWER_RATE, _UPPER_RATE)
+            done = np.abs(step) < tolerance
+            rates[active] = updated
+            converged[active] = done | ~np.isfinite(updated)
+
+        # Verify Newton's answers and bisect whatever is not a genuine root
+        npv, _ = _npv_and_derivative(rates, amounts, years)
+        scale = np.abs(amounts).sum(axis=1)
+        pending = solvable & ~(np.abs(npv) <= tolerance * np.maximum(scale, 1.0))
+        if pending.any():
+            lower = np.full(pending.sum(), _LOWER_RATE)
+            upper = np.full(pending.sum(), _UPPER_RATE)
+            pending_amounts, pending_years = amounts[pending], years[pending]
+            npv_lower, _ = _npv_and_derivative(lower, pending_amounts, pending_years)
+            npv_upper, _ = _npv_and_derivative(upper, pending_amounts, pending_years)
+            bracketed = np.sign(npv_lower) != np.sign(npv_upper)
+            for _ in range(bisection_iterations):
+                middle = (lower + upper) / 2
+                npv_middle, _ = _npv_and_derivative(middle, pending_amounts, pending_years)
+                same_side = np.sign(npv_middle) == np.sign(npv_lower)
+                lower = np.where(same_side, middle, lower)
+                npv_lower = np.where(same_side, npv_middle, npv_lower)
+                upper = np.where(same_side, upper, middle)
+                if np.all(upper - lower < tolerance):
+                    break
+            rates[pending] = np.where(bracketed, (lower + upper) / 2, np.nan)
+
+    rates[~solvable] = np.nan
+    return rates
+
+
+def pack_cash_flows(
+    set_codes: np.ndarray,
+    ordinals: np.ndarray,
+    amounts: np.ndarray,
+    n_sets: int,
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Pack flat cash flows (set code, date ordinal, amount) into (sets x flows) amount and
+    year-fraction matrices for solve_xirr. Flows on the same date are summed first, and
+    sets are grouped by their number of flows rounded up to a power of two, so one set
+    with many flows only widens the matrices of its own group. Returns (set codes,
+    amounts, years) per group; sets without flows are in none.
+    """
+    if not len(set_codes):
+        return []
+    order = np.lexsort((ordinals, set_codes))
+    set_codes, ordinals, amounts = set_codes[order], ordinals[order], amounts[order]
+
+    # One flow per (set, date)
+    starts = np.flatnonzero(np.r_[True, (np.diff(set_codes) != 0) | (np.diff(ordinals) != 0)])
+    amounts = np.add.reduceat(amounts, starts)
+    set_codes, ordinals = set_codes[starts], ordinals[starts]
+
+    counts = np.bincount(set_codes, minlength=n_sets)
+    offsets = np.cumsum(counts) - counts
+    slots = np.arange(len(set_codes)) - offsets[set_codes]
+    years = (ordinals - ordinals[offsets[set_codes]]) / 365.0
+
+    widths = np.zeros(n_sets, dtype=np.int64)
+    has_flows = counts > 0
+    widths[has_flows] = 1 << np.ceil(np.log2(counts[has_flows])).astype(np.int64)
+    groups = []
+    for width in np.unique(widths[has_flows]).tolist():
+        members = np.flatnonzero(widths == width)
+        rows = np.full(n_sets, -1, dtype=np.int64)
+        rows[members] = np.arange(len(members))
+        in_group = rows[set_codes] >= 0
+        amount_matrix = np.zeros((len(members), width))
+        year_matrix = np.zeros((len(members), width))
+        amount_matrix[rows[set_codes[in_group]], slots[in_group]] = amounts[in_group]
+        year_matrix[rows[set_codes[in_group]], slots[in_group]] = years[in_group]
+        groups.append((members, amount_matrix, year_matrix))
+    return groups
+
+
+def solve_cash_flows(set_codes: np.ndarray, ordinals: np.ndarray, amounts: np.ndarray, n_sets: int) -> np.ndarray:
+    """Annual XIRR of each set of flat cash flows (see pack_cash_flows); NaN where undefined"""
+    rates = np.full(n_sets, np.nan)
+    for members, amount_matrix, year_matrix in pack_cash_flows(set_codes, ordinals, amounts, n_sets):
+        rates[members] = solve_xirr(amount_matrix, year_matrix)
+    return rates
+
+
+def xirr_for_sets(cash_flow_sets: Sequence[Sequence[Tuple[date, float]]]) -> List[Optional[float]]:
+    """
+    XIRR in percent for each list of (date, amount) cash flows, where investments are
+    negative and redemptions or current value are positive. None where undefined.
+    """
+    set_codes, ordinals, amounts = [], [], []
+    for code, flows in enumerate(cash_flow_sets):
+        for flow_date, amount in flows:
+            set_codes.append(code)
+            ordinals.append(flow_date.toordinal())
+            amounts.append(amount)
+
+    rates = solve_cash_flows(
+        np.array(set_codes, dtype=np.int64),
+        np.array(ordinals, dtype=np.int64),
+        np.array(amounts, dtype=np.float64),
+        len(cash_flow_sets),
+    )
+    return [None if np.isnan(rate) else float(rate * 100) for rate in rates]
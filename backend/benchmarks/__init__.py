@@ -0,0 +1 @@
+# Performance benchmarks, runnable as modules (python -m benchmarks.<name>)
@@ -0,0 +1,85 @@
+"""
+Serialization cost of large list responses, per 10k rows.
+
+Compares the default FastAPI path (validate every item against the response model,
+jsonable_encoder, json.dumps) with ORJSONResponse on pre-shaped rows and on NumPy columns.
+
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 20]
+"""
+from datetime import date, timedelta
+from typing import Callable, List
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.responses import ORJSONResponse, column_records
+from app.schemas.portfolio import PortfolioPerformance
+from app.schemas.mutual_fund import MutualFundReturns
+
+
+def _best_of(fn: Callable[[], bytes], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _fastapi_default(adapter: TypeAdapter, rows: List[dict]) -> bytes:
+    validated = adapter.validate_python(rows)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _performance_cases(n_rows: int):
+    start = date(2000, 1, 1)
+    grid = np.arange(start.toordinal(), start.toordinal() + n_rows)
+    values = np.random.default_rng(0).lognormal(13, 0.2, n_rows)
+    rows = [{"date": start + timedelta(days=i), "value": float(value)} for i, value in enumerate(values)]
+    adapter = TypeAdapter(List[PortfolioPerformance])
+    return "portfolio performance points", [
+        ("FastAPI response_model", lambda: _fastapi_default(adapter, rows)),
+        ("ORJSONResponse (rows)", lambda: ORJSONResponse(rows).body),
+        ("ORJSONResponse (NumPy columns)", lambda: ORJSONResponse(column_records(
+            date=[date.fromordinal(ordinal) for ordinal in grid.tolist()], value=values
+        )).body),
+    ]
+
+
+def _returns_cases(n_rows: int):
+    rng = np.random.default_rng(1)
+    fields = ["one_month", "three_month", "six_month", "one_year", "three_year", "five_year", "since_inception"]
+    matrix = rng.normal(10, 5, (n_rows, len(fields)))
+    rows = [
+        {"fund_id": f"fund-{i}", "name": f"Fund {i}", "as_of_date": date(2024, 1, 1), **dict(zip(fields, row))}
+        for i, row in enumerate(matrix.tolist())
+    ]
+    adapter = TypeAdapter(List[MutualFundReturns])
+    return "trailing returns rows", [
+        ("FastAPI response_model", lambda: _fastapi_default(adapter, rows)),
+        ("ORJSONResponse (rows)", lambda: ORJSONResponse(rows).body),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response serialization paths")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+
+    for title, cases in (_performance_cases(args.rows), _returns_cases(args.rows)):
+        print(f"\n{title} ({args.rows} rows)")
+        baseline = None
+        for name, fn in cases:
+            seconds = _best_of(fn, args.repeat)
+            baseline = baseline or seconds
+            per_10k = seconds * 10000 / args.rows * 1000
+            print(f"  {name:<32} {per_10k:8.2f} ms / 10k rows   {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
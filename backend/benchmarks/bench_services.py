@@ -0,0 +1,165 @@
+"""
+Micro-benchmarks of every function in app/services/portfolio.py and app/services/mutual_fund.py.
+
+Reads run against the user with the most lots and the most widely held funds. Writes run
+last, inside one outer transaction that is rolled back afterwards (the services' commits
+become savepoints), so the dataset is unchanged. Run through benchmarks.run, which seeds
+the database and compares baselines.
+"""
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from datetime import timedelta
+from typing import Callable, Dict, List, Tuple
+import asyncio
+import itertools
+
+from app.db.database import create_database_engine
+from app.db.models import Investment, FundPerformance
+from app.services import correlation, fund_similarity, mutual_fund, portfolio
+from app.services.fund_search import invalidate_fund_search_index
+from app.services.nav_data import invalidate_nav_arrays
+from benchmarks.harness import time_calls
+
+
+def _benchmark_subjects(db: Session) -> Tuple[str, List[str]]:
+    """(user with the most lots, funds ordered by how many lots hold them)"""
+    user_id = (
+        db.query(Investment.user_id).group_by(Investment.user_id)
+        .order_by(func.count().desc()).limit(1).scalar()
+    )
+    fund_ids = [
+        fund_id for (fund_id,) in db.query(Investment.fund_id).group_by(Investment.fund_id)
+        .order_by(func.count().desc()).all()
+    ]
+    return user_id, fund_ids
+
+
+def read_cases(db: Session, session_factory: Callable[[], Session]) -> List[Tuple[str, Callable[[], object]]]:
+    user_id, fund_ids = _benchmark_subjects(db)
+    fund_id, other_fund_id = fund_ids[0], fund_ids[1]
+    isn = mutual_fund.get_mutual_fund_by_id(db, fund_id).isn
+    snapshot = portfolio.load_portfolio_snapshot(db, user_id, with_allocations=True)
+    since = portfolio.get_portfolio_performance_window(db, user_id, "1Y")["version"]
+
+    cases = [
+        ("portfolio.load_portfolio_snapshot", lambda: portfolio.load_portfolio_snapshot(db, user_id)),
+        ("portfolio.load_portfolio_snapshot[allocations]",
+         lambda: portfolio.load_portfolio_snapshot(db, user_id, with_allocations=True)),
+        ("portfolio.summarize_portfolio", lambda: portfolio.summarize_portfolio(snapshot)),
+        ("portfolio.get_portfolio_summary", lambda: portfolio.get_portfolio_summary(db, user_id)),
+        ("portfolio.portfolio_holdings", lambda: portfolio.portfolio_holdings(snapshot)),
+        ("portfolio.get_portfolio_holdings", lambda: portfolio.get_portfolio_holdings(db, user_id)),
+    ]
+    for timeframe in ("1M", "1Y", "3Y"):
+        cases.append((
+            f"portfolio.get_portfolio_performance[{timeframe}]",
+            lambda timeframe=timeframe: portfolio.get_portfolio_performance(db, user_id, timeframe)
+        ))
+    cases += [
+        ("portfolio.get_portfolio_performance_window[since]",
+         lambda: portfolio.get_portfolio_performance_window(db, user_id, "1Y", since=since)),
+        ("portfolio.portfolio_composition", lambda: portfolio.portfolio_composition(snapshot)),
+        ("portfolio.portfolio_overlap", lambda: portfolio.portfolio_overlap(snapshot)),
+        ("portfolio.get_portfolio_composition", lambda: portfolio.get_portfolio_composition(db, user_id)),
+        ("portfolio.get_portfolio_composition_history[M]",
+         lambda: portfolio.get_portfolio_composition_history(db, user_id, "3Y", "M")),
+        ("portfolio.get_portfolio_composition_history[W]",
+         lambda: portfolio.get_portfolio_composition_history(db, user_id, "1Y", "W")),
+        ("portfolio.get_portfolio_dashboard",
+         lambda: asyncio.run(portfolio.get_portfolio_dashboard(session_factory, user_id))),
+        ("portfolio.get_fund_overlap[pair]", lambda: portfolio.get_fund_overlap(db, fund_id, other_fund_id)),
+        ("portfolio.get_fund_overlap[all]", lambda: portfolio.get_fund_overlap(db, fund_id)),
+        ("fund_similarity.get_similar_funds", lambda: fund_similarity.get_similar_funds(db, fund_id)),
+        ("fund_similarity.get_near_clone_funds", lambda: fund_similarity.get_near_clone_funds(db)),
+        ("correlation.get_portfolio_correlation", lambda: correlation.get_portfolio_correlation(db, user_id)),
+        ("correlation.get_fund_correlations", lambda: correlation.get_fund_correlations(db, fund_id)),
+        ("mutual_fund.get_mutual_funds", lambda: mutual_fund.get_mutual_funds(db)),
+        ("mutual_fund.get_mutual_fund_by_id", lambda: mutual_fund.get_mutual_fund_by_id(db, fund_id)),
+        ("mutual_fund.get_mutual_fund_by_isn", lambda: mutual_fund.get_mutual_fund_by_isn(db, isn)),
+        ("mutual_fund.get_mutual_fund_performances", lambda: mutual_fund.get_mutual_fund_performances(db, fund_id)),
+        ("mutual_fund.get_mutual_fund_nav_series", lambda: mutual_fund.get_mutual_fund_nav_series(db, fund_id)),
+        ("mutual_fund.get_latest_navs[all]", lambda: mutual_fund.get_latest_navs(db)),
+        ("mutual_fund.get_latest_navs[portfolio]",
+         lambda: mutual_fund.get_latest_navs(db, list(snapshot.funds))),
+        ("mutual_fund.get_mutual_fund_allocations", lambda: mutual_fund.get_mutual_fund_allocations(db, fund_id)),
+        ("mutual_fund.get_mutual_fund_holdings", lambda: mutual_fund.get_mutual_fund_holdings(db, fund_id)),
+        ("mutual_fund.get_mutual_fund_cap_allocations",
+         lambda: mutual_fund.get_mutual_fund_cap_allocations(db, fund_id)),
+    ]
+    return cases
+
+
+def write_cases(db: Session) -> List[Tuple[str, Callable[[], object]]]:
+    _, fund_ids = _benchmark_subjects(db)
+    last_date = db.query(func.max(FundPerformance.date)).scalar()
+    counter = itertools.count(1)
+    scratch = mutual_fund.create_mutual_fund(db, "Benchmark Scratch Fund", "BENCH0000000", "Equity", "Large Cap", "Bench")
+    ingest_funds = fund_ids[:50]
+
+    def next_date():
+        return last_date + timedelta(days=next(counter))
+
+    return [
+        ("mutual_fund.create_mutual_fund", lambda: mutual_fund.create_mutual_fund(
+            db, "Benchmark Fund", f"BENCH{next(counter):07d}", "Equity", "Large Cap", "Bench"
+        )),
+        ("mutual_fund.add_fund_performance",
+         lambda: mutual_fund.add_fund_performance(db, scratch.id, next_date(), 10.0)),
+        ("mutual_fund.add_fund_performances[50 funds]", lambda: mutual_fund.add_fund_performances(db, [
+            {"fund_id": ingest_fund, "date": day, "nav": 10.0}
+            for day in [next_date()] for ingest_fund in ingest_funds
+        ])),
+        ("mutual_fund.refresh_after_nav_ingest[50 funds]",
+         lambda: mutual_fund.refresh_after_nav_ingest(db, ingest_funds)),
+        ("mutual_fund.add_fund_allocation",
+         lambda: mutual_fund.add_fund_allocation(db, scratch.id, "IT", 1.0)),
+        ("mutual_fund.add_fund_holding",
+         lambda: mutual_fund.add_fund_holding(db, scratch.id, "Benchmark Stock", 1.0)),
+        ("mutual_fund.add_fund_cap_allocation",
+         lambda: mutual_fund.add_fund_cap_allocation(db, scratch.id, "Large Cap", 1.0)),
+    ]
+
+
+def _rollback_engine(engine: Engine) -> Engine:
+    """A separate engine whose outer transaction can be rolled back past the services' commits"""
+    rollback_engine = create_database_engine(engine.url.render_as_string(hide_password=False))
+    if rollback_engine.dialect.name == "sqlite":
+        # pysqlite's implicit transactions break SAVEPOINT; let SQLAlchemy emit BEGIN itself
+        @event.listens_for(rollback_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(rollback_engine, "begin")
+        def on_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+    return rollback_engine
+
+
+def run_service_benchmarks(engine: Engine, session_factory: Callable[[], Session],
+                           repeat: int = 20) -> Dict[str, dict]:
+    """Time every service function; writes run after all reads and are rolled back"""
+    results = {}
+    db = session_factory()
+    try:
+        for name, fn in read_cases(db, session_factory):
+            results[name] = time_calls(fn, repeat)
+    finally:
+        db.close()
+
+    rollback_engine = _rollback_engine(engine)
+    connection = rollback_engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        for name, fn in write_cases(db):
+            results[name] = time_calls(fn, max(repeat // 4, 3))
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+        rollback_engine.dispose()
+        # In-process caches were rebuilt from rows that no longer exist
+        invalidate_nav_arrays()
+        invalidate_fund_search_index()
+    return results
@@ -0,0 +1,205 @@
+"""
+Timing, load generation and baseline comparison shared by the benchmark suite.
+"""
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import gc
+import json
+import time
+
+import numpy as np
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+# Metrics compared against baselines: higher is worse for latencies, lower is worse for throughput.
+# p99 is reported but not gated: with tens of samples it is little more than the slowest call.
+_LATENCY_METRICS = ("p50_ms", "p95_ms")
+_THROUGHPUT_METRICS = ("throughput_rps",)
+
+# Bounds of the machine speed ratio applied to baselines. The calibration workload is pure
+# CPU and doesn't track database or IO latency, so it may only loosen baselines, and at most 2x.
+_SPEED_RATIO_BOUNDS = (1.0, 2.0)
+
+# Latency a benchmark may gain before it counts as a regression, whatever its tolerance:
+# sub-millisecond calls jitter by more than 25% from scheduling alone
+_MIN_LATENCY_DELTA_MS = 1.0
+
+
+def calibrate(repeat: int = 7) -> float:
+    """
+    Milliseconds for a fixed mix of interpreter and NumPy work (best of repeat). Baselines
+    store it, and latencies are compared after scaling by the ratio to the current value
+    (within _SPEED_RATIO_BOUNDS), so a slower or busier machine doesn't read as a regression.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.random(200000)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        np.sort(values)
+        totals: Dict[int, float] = {}
+        for i, value in enumerate(values[:100000].tolist()):
+            totals[i % 1000] = totals.get(i % 1000, 0.0) + value
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> dict:
+    """p50/p95/p99/mean latency (ms) and throughput from per-call latencies in seconds"""
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds > 0 else None,
+    }
+
+
+def time_calls(fn: Callable[[], object], repeat: int, warmup: int = 8) -> dict:
+    """
+    Call fn sequentially and summarize its latency. As in timeit, garbage collection is
+    paused while timing (after a full collection), so a collector pass over the whole
+    process heap isn't billed to whichever call happens to trigger it.
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            call_started = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - call_started)
+        wall_seconds = time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(latencies, wall_seconds)
+
+
+async def run_load(
+    request: Callable[[int], Awaitable[bool]],
+    concurrency: int,
+    total: Optional[int] = None,
+    duration: Optional[float] = None,
+    interval: float = 0.0,
+) -> dict:
+    """
+    Drive request(i) from `concurrency` workers until `total` calls were made or
+    `duration` seconds passed, each worker pausing `interval` seconds between calls
+    (closed loop). request returns False for a failed call; failures are counted
+    separately and left out of the latencies.
+    """
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+
+    async def worker():
+        nonlocal errors, issued
+        while True:
+            if total is not None and issued >= total:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            i = issued
+            issued += 1
+            call_started = time.perf_counter()
+            ok = await request(i)
+            if ok:
+                latencies.append(time.perf_counter() - call_started)
+            else:
+                errors += 1
+            if interval:
+                await asyncio.sleep(interval)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {**summarize(latencies, time.perf_counter() - started, errors), "concurrency": concurrency}
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> dict:
+    if not path.exists():
+        return {"tolerance": 0.25, "results": {}}
+    return json.loads(path.read_text())
+
+
+def save_baselines(results: Dict[str, dict], tolerance: float, calibration_ms: float,
+                   path: Path = BASELINES_PATH, previous: Optional[dict] = None) -> None:
+    """
+    Store results as the new baselines, keeping per-benchmark tolerance overrides and the
+    previous baselines of benchmarks that didn't run. Throughput is only kept for load
+    scenarios; for sequential calls it just mirrors the latency.
+    """
+    previous = (previous or {}).get("results", {})
+    stored = dict(previous)
+    for name, result in results.items():
+        metrics = _LATENCY_METRICS + (_THROUGHPUT_METRICS if "concurrency" in result else ())
+        entry = {metric: result[metric] for metric in metrics if result.get(metric)}
+        entry["calibration_ms"] = calibration_ms
+        if "tolerance" in previous.get(name, {}):
+            entry["tolerance"] = previous[name]["tolerance"]
+        stored[name] = entry
+    baselines = {"tolerance": tolerance, "results": dict(sorted(stored.items()))}
+    path.write_text(json.dumps(baselines, indent=2) + "\n")
+
+
+def compare(results: Dict[str, dict], baselines: dict, calibration_ms: float,
+            tolerance: Optional[float] = None) -> List[str]:
+    """
+    Regressions of results against baselines, as readable lines. Each baseline is first
+    scaled by the machine speed ratio (calibration_ms against the value stored with it),
+    bounded so a faster calibration never tightens a baseline.
+    A latency regresses when it exceeds its baseline by more than the tolerance (a fraction,
+    per benchmark or global) and by more than _MIN_LATENCY_DELTA_MS; throughput regresses
+    when it falls below its baseline by more than the tolerance. Benchmarks without a
+    baseline are not compared.
+    """
+    default = tolerance if tolerance is not None else baselines.get("tolerance", 0.25)
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get("results", {}).get(name)
+        if not baseline:
+            continue
+        allowed = baseline.get("tolerance", default)
+        speed = calibration_ms / baseline["calibration_ms"] if baseline.get("calibration_ms") else 1.0
+        speed = min(max(speed, _SPEED_RATIO_BOUNDS[0]), _SPEED_RATIO_BOUNDS[1])
+        if result.get("errors"):
+            regressions.append(f"{name}: {result['errors']} failed calls")
+        for metric in _LATENCY_METRICS:
+            expected = baseline.get(metric, 0) * speed
+            limit = max(expected * (1 + allowed), expected + _MIN_LATENCY_DELTA_MS)
+            if expected and metric in result and result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.2f} > baseline {expected:.2f} (+{allowed:.0%})"
+                )
+        for metric in _THROUGHPUT_METRICS:
+            expected = baseline.get(metric, 0) / speed
+            if expected and result.get(metric) and result[metric] < expected * (1 - allowed):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.1f} < baseline {expected:.1f} (-{allowed:.0%})"
+                )
+    return regressions
+
+
+def print_results(title: str, results: Dict[str, dict]) -> None:
+    print(f"\n{title}")
+    print(f"  {'benchmark':<50} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'err':>4}")
+    for name, result in results.items():
+        if not result.get("count"):
+            print(f"  {name:<50} {'-':>6}")
+            continue
+        print(
+            f"  {name:<50} {result['count']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['throughput_rps'] or 0:>9.1f} {result['errors']:>4}"
+        )
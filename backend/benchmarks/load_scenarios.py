@@ -0,0 +1,139 @@
+"""
+Scripted load scenarios against the app in-process (httpx over the ASGI transport):
+
+- login storm: many users logging in at once (password hashing on the request path)
+- dashboard polling: users refreshing the aggregated dashboard on an interval
+- NAV ingest during reads: NAV batches landing while users read summaries and fund returns
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import timedelta
+from typing import Callable, Dict, List
+import asyncio
+import itertools
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.security import create_access_token
+from app.db.models import Investment, FundPerformance, User
+from app.services.mutual_fund import add_fund_performances, refresh_after_nav_ingest
+from benchmarks.harness import run_load, summarize
+
+
+def _active_users(db: Session, limit: int) -> List[str]:
+    """Emails of users who hold investments, most lots first"""
+    rows = (
+        db.query(User.email).join(Investment, Investment.user_id == User.id)
+        .group_by(User.email).order_by(func.count().desc()).limit(limit).all()
+    )
+    return [email for (email,) in rows]
+
+
+async def login_storm(client: httpx.AsyncClient, emails: List[str], password: str,
+                      concurrency: int, total: int) -> dict:
+    async def login(i: int) -> bool:
+        response = await client.post(
+            "/api/auth/login", data={"username": emails[i % len(emails)], "password": password}
+        )
+        return response.status_code == 200
+
+    return await run_load(login, concurrency, total=total)
+
+
+async def dashboard_polling(client: httpx.AsyncClient, emails: List[str], concurrency: int,
+                            duration: float, interval: float) -> dict:
+    headers = [{"Authorization": f"Bearer {create_access_token({'sub': email})}"} for email in emails]
+
+    async def poll(i: int) -> bool:
+        response = await client.get("/api/portfolio/dashboard", headers=headers[i % len(headers)])
+        return response.status_code == 200
+
+    return await run_load(poll, concurrency, duration=duration, interval=interval)
+
+
+async def nav_ingest_during_reads(client: httpx.AsyncClient, session_factory: Callable[[], Session],
+                                  emails: List[str], concurrency: int, duration: float,
+                                  batch_funds: int = 200, ingest_interval: float = 0.5) -> Dict[str, dict]:
+    """
+    Readers run for `duration` while one writer ingests a day of NAVs every ingest_interval.
+    The ingested NAVs are deleted again afterwards.
+    """
+    headers = [{"Authorization": f"Bearer {create_access_token({'sub': email})}"} for email in emails]
+    paths = ["/api/portfolio/summary", "/api/mutual-funds/returns"]
+
+    db = session_factory()
+    try:
+        last_date = db.query(func.max(FundPerformance.date)).scalar()
+        fund_ids = [
+            fund_id for (fund_id,) in db.query(Investment.fund_id).group_by(Investment.fund_id)
+            .order_by(func.count().desc()).limit(batch_funds).all()
+        ]
+    finally:
+        db.close()
+
+    days = itertools.count(1)
+    ingest_latencies = []
+
+    def ingest_batch() -> None:
+        day = last_date + timedelta(days=next(days))
+        writer = session_factory()
+        try:
+            add_fund_performances(writer, [{"fund_id": fund_id, "date": day, "nav": 10.0} for fund_id in fund_ids])
+        finally:
+            writer.close()
+
+    async def writer_loop(deadline: float) -> float:
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            batch_started = time.perf_counter()
+            await run_in_threadpool(ingest_batch)
+            ingest_latencies.append(time.perf_counter() - batch_started)
+            await asyncio.sleep(ingest_interval)
+        return time.perf_counter() - started
+
+    async def read(i: int) -> bool:
+        response = await client.get(paths[i % len(paths)], headers=headers[i % len(headers)])
+        return response.status_code == 200
+
+    deadline = time.perf_counter() + duration
+    try:
+        reads, writer_seconds = await asyncio.gather(
+            run_load(read, concurrency, duration=duration),
+            writer_loop(deadline),
+        )
+    finally:
+        db = session_factory()
+        try:
+            db.query(FundPerformance).filter(FundPerformance.date > last_date).delete(synchronize_session=False)
+            db.commit()
+            refresh_after_nav_ingest(db, fund_ids)
+        finally:
+            db.close()
+    return {
+        "load.nav_ingest_during_reads[reads]": reads,
+        "load.nav_ingest_during_reads[ingest]": summarize(ingest_latencies, writer_seconds),
+    }
+
+
+async def run_load_scenarios(app: FastAPI, session_factory: Callable[[], Session], password: str,
+                             duration: float = 5.0, concurrency: int = 4, logins: int = 100) -> Dict[str, dict]:
+    """Run every scenario in turn inside the app's lifespan"""
+    db = session_factory()
+    try:
+        emails = _active_users(db, 200)
+    finally:
+        db.close()
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results["load.login_storm"] = await login_storm(client, emails, password, concurrency, logins)
+            results["load.dashboard_polling"] = await dashboard_polling(
+                client, emails, concurrency, duration, interval=0.05
+            )
+            results.update(await nav_ingest_during_reads(client, session_factory, emails, concurrency, duration))
+    return results
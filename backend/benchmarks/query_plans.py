@@ -0,0 +1,260 @@
+"""
+Query-plan regression guard for the service functions.
+
+Runs every read benchmark case from benchmarks.bench_services against the seeded dataset,
+captures each SELECT it issues, and explains it: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+on PostgreSQL, EXPLAIN QUERY PLAN on SQLite. Plans are normalized (node types, relations,
+indexes, join strategies; no costs or timings) and compared with benchmarks/query_plans.json.
+
+Flags raised per statement:
+- seq scan: a full table scan of a guarded table (fund_performances and investments by default)
+- sort spill: a sort or hash that went to disk (PostgreSQL)
+- row estimate: actual rows off from the planner's estimate by more than --estimate-factor (PostgreSQL)
+
+    python -m benchmarks.query_plans [--scale 4]        # compare with the stored plans
+    python -m benchmarks.query_plans --update            # accept the current plans
+
+Exits with status 1 when a statement has a flag its stored plan didn't have, or, with
+--strict, when any plan changed shape.
+"""
+from pathlib import Path
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+
+PLANS_PATH = Path(__file__).resolve().parent / "query_plans.json"
+
+DEFAULT_GUARDED_TABLES = ("fund_performances", "investments")
+
+# Rows below this on both sides of an estimate are too few to matter
+_ESTIMATE_MIN_ROWS = 1000
+
+
+class StatementCapture:
+    """Records (statement, parameters) for every SELECT executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[Tuple[str, object]] = []
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            with self._lock:
+                self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement text with whitespace collapsed and expanded IN lists folded to one placeholder"""
+    statement = " ".join(statement.split())
+    return re.sub(r"\((?:\s*(?:\?|%\([^)]+\)s)\s*,)+\s*(?:\?|%\([^)]+\)s)\s*\)", "(...)", statement)
+
+
+def _fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_sql(statement).encode()).hexdigest()[:12]
+
+
+def _explain_postgres(cursor, statement: str, parameters) -> dict:
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def _normalize_postgres(node: dict) -> dict:
+    normalized = {"node": node["Node Type"]}
+    for key, name in (("Relation Name", "relation"), ("Index Name", "index"),
+                      ("Join Type", "join"), ("Strategy", "strategy")):
+        if key in node:
+            normalized[name] = node[key]
+    children = [_normalize_postgres(child) for child in node.get("Plans", [])]
+    if children:
+        normalized["children"] = children
+    return normalized
+
+
+def _flags_postgres(node: dict, guarded: Tuple[str, ...], estimate_factor: float) -> List[str]:
+    flags = []
+    if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in guarded:
+        flags.append(f"seq scan on {node['Relation Name']}")
+    if node.get("Sort Space Type") == "Disk" or "external" in node.get("Sort Method", ""):
+        flags.append(f"sort spill ({node.get('Sort Method')}, {node.get('Sort Space Used')} kB)")
+    if node.get("Hash Batches", 1) > 1:
+        flags.append(f"hash spill ({node['Hash Batches']} batches)")
+    if "Actual Rows" in node:
+        actual = node["Actual Rows"] * node.get("Actual Loops", 1)
+        estimated = node["Plan Rows"] * node.get("Actual Loops", 1)
+        if max(actual, estimated) >= _ESTIMATE_MIN_ROWS:
+            ratio = max(actual, 1) / max(estimated, 1)
+            if ratio > estimate_factor or ratio < 1 / estimate_factor:
+                flags.append(f"row estimate off on {node['Node Type']}: {estimated} estimated, {actual} actual")
+    for child in node.get("Plans", []):
+        flags.extend(_flags_postgres(child, guarded, estimate_factor))
+    return flags
+
+
+def _explain_sqlite(cursor, statement: str, parameters) -> List[tuple]:
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return cursor.fetchall()
+
+
+def _normalize_sqlite(rows: List[tuple]) -> List[str]:
+    # (id, parent, notused, detail) rows; keep the details in plan order, indented by depth
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def _flags_sqlite(lines: List[str], guarded: Tuple[str, ...]) -> List[str]:
+    flags = []
+    for line in lines:
+        match = re.match(r"\s*SCAN (?:TABLE )?(\w+)(.*)", line)
+        if match and match.group(1) in guarded and "INDEX" not in match.group(2):
+            flags.append(f"seq scan on {match.group(1)}")
+    return flags
+
+
+def capture_plans(engine, session_factory, guarded: Tuple[str, ...], estimate_factor: float) -> Dict[str, list]:
+    """Explain every distinct SELECT issued by each read case, keyed by case name"""
+    from benchmarks.bench_services import read_cases
+
+    dialect = engine.dialect.name
+    captured: Dict[str, list] = {}
+    db = session_factory()
+    try:
+        cases = read_cases(db, session_factory)
+        for name, fn in cases:
+            with StatementCapture(engine) as capture:
+                result = fn()
+                if asyncio.iscoroutine(result):
+                    asyncio.run(result)
+            captured[name] = capture.statements
+    finally:
+        db.close()
+
+    plans: Dict[str, list] = {}
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for name, statements in captured.items():
+            seen = set()
+            entries = []
+            for statement, parameters in statements:
+                fingerprint = _fingerprint(statement)
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                if dialect == "postgresql":
+                    raw = _explain_postgres(cursor, statement, parameters)
+                    plan = _normalize_postgres(raw)
+                    flags = _flags_postgres(raw, guarded, estimate_factor)
+                elif dialect == "sqlite":
+                    plan = _normalize_sqlite(_explain_sqlite(cursor, statement, parameters))
+                    flags = _flags_sqlite(plan, guarded)
+                else:
+                    raise ValueError(f"Query plans are not supported for {dialect}")
+                entries.append({
+                    "fingerprint": fingerprint,
+                    "sql": normalize_sql(statement)[:300],
+                    "plan": plan,
+                    "flags": sorted(set(flags)),
+                })
+            plans[name] = entries
+        cursor.close()
+        connection.rollback()
+    finally:
+        connection.close()
+    return plans
+
+
+def compare_plans(current: Dict[str, list], stored: Dict[str, list]) -> Tuple[List[str], List[str]]:
+    """(regressions: flags a statement didn't have before, changes: plans that changed shape)"""
+    regressions, changes = [], []
+    for name, entries in current.items():
+        previous = {entry["fingerprint"]: entry for entry in stored.get(name, [])}
+        for entry in entries:
+            before = previous.get(entry["fingerprint"])
+            new_flags = [flag for flag in entry["flags"] if before is None or flag not in before["flags"]]
+            for flag in new_flags:
+                regressions.append(f"{name}: {flag}\n      {entry['sql'][:160]}")
+            if before is not None and before["plan"] != entry["plan"]:
+                changes.append(f"{name}: plan changed\n      {entry['sql'][:160]}")
+            elif before is None and stored:
+                changes.append(f"{name}: new statement\n      {entry['sql'][:160]}")
+    return regressions, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture and compare query plans of the service functions")
+    parser.add_argument("--database", default=None, help="Database to seed and explain (default: as benchmarks.run)")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the seeded funds and users (fresh databases only)")
+    parser.add_argument("--reseed", action="store_true", help="Drop and regenerate the dataset first")
+    parser.add_argument("--guard-table", action="append", dest="guarded",
+                        help=f"Table that must not be seq-scanned (repeatable; default {', '.join(DEFAULT_GUARDED_TABLES)})")
+    parser.add_argument("--estimate-factor", type=float, default=100.0,
+                        help="Flag row estimates off by more than this factor")
+    parser.add_argument("--strict", action="store_true", help="Also fail when a plan changed shape")
+    parser.add_argument("--update", action="store_true", help="Store the current plans")
+    args = parser.parse_args()
+
+    from benchmarks.run import DEFAULT_DATABASE, SEED_SPEC, seed_database
+    os.environ["DATABASE_URL"] = args.database or os.environ.get("BENCHMARK_DATABASE_URL", DEFAULT_DATABASE)
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.db.session import engine, SessionLocal
+
+    spec = dict(SEED_SPEC, funds=SEED_SPEC["funds"] * args.scale, users=SEED_SPEC["users"] * args.scale)
+    seed_database(engine, args.reseed, spec)
+    guarded = tuple(args.guarded or DEFAULT_GUARDED_TABLES)
+    current = capture_plans(engine, SessionLocal, guarded, args.estimate_factor)
+
+    statements = sum(len(entries) for entries in current.values())
+    flagged = [(name, entry) for name, entries in current.items() for entry in entries if entry["flags"]]
+    print(f"Explained {statements} statements from {len(current)} service calls ({engine.dialect.name})")
+    for name, entry in flagged:
+        print(f"  {name}: {'; '.join(entry['flags'])}")
+
+    stored_file = json.loads(PLANS_PATH.read_text()) if PLANS_PATH.exists() else {}
+    if args.update:
+        stored_file[engine.dialect.name] = current
+        PLANS_PATH.write_text(json.dumps(stored_file, indent=2, sort_keys=True) + "\n")
+        print(f"Stored plans for {engine.dialect.name}")
+        return
+
+    stored = stored_file.get(engine.dialect.name, {})
+    if not stored:
+        print(f"No stored {engine.dialect.name} plans (run with --update to record them)")
+    regressions, changes = compare_plans(current, stored)
+    for line in changes:
+        print(f"  {line}")
+    if regressions:
+        print(f"\n{len(regressions)} plan regressions:")
+        for line in regressions:
+            print(f"  {line}")
+    if regressions or (args.strict and changes):
+        sys.exit(1)
+    print("\nNo plan regressions")
+
+
+if __name__ == "__main__":
+    main()
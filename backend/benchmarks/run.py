@@ -0,0 +1,112 @@
+"""
+Benchmark suite: service micro-benchmarks and load scenarios against a seeded database,
+compared with the stored baselines in benchmarks/baselines.json.
+
+    python -m benchmarks.run                      # seed (first run), benchmark, compare
+    python -m benchmarks.run --only services      # micro-benchmarks only
+    python -m benchmarks.run --update-baselines   # accept the current numbers
+
+Exits with status 1 when any benchmark regresses beyond its tolerance: p50/p95 latency
+above baseline * (1 + tolerance), or load-scenario throughput below baseline * (1 - tolerance).
+Baselines are loosened (up to 2x) when a calibration workload timed at the start of each run
+is slower than when they were recorded. It only measures CPU, so record baselines where the
+comparison runs.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+
+DEFAULT_DATABASE = f"sqlite:///{Path(tempfile.gettempdir()) / 'mf_benchmark.db'}"
+
+# Dataset the baselines were recorded against
+SEED_SPEC = {"funds": 300, "years": 5, "users": 2000, "lots_per_user": 6.0, "seed": 1234}
+
+
+def seed_database(engine, reseed: bool = False, spec: dict = SEED_SPEC) -> None:
+    """Migrate the schema and load the benchmark dataset unless it is already there"""
+    from app.db.migrate import migrate
+    from app.db.models import Base, MutualFund
+    from app.db.synthetic import SyntheticSpec, generate
+    from sqlalchemy.orm import Session
+
+    if reseed:
+        Base.metadata.drop_all(bind=engine)
+    # Also backfills datasets seeded before the positions, securities and fund snapshot tables existed
+    migrate(engine)
+    with Session(engine) as db:
+        if db.query(MutualFund.id).first() is not None:
+            return
+    print(f"Seeding benchmark database: {spec}")
+    generate(engine, SyntheticSpec(**spec))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmarks and compare against stored baselines")
+    parser.add_argument("--database", default=os.environ.get("BENCHMARK_DATABASE_URL", DEFAULT_DATABASE),
+                        help="Database to seed and benchmark (default: a SQLite file in the temp dir)")
+    parser.add_argument("--reseed", action="store_true", help="Drop and regenerate the dataset first")
+    parser.add_argument("--only", choices=["services", "load"], help="Run one group of benchmarks")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per micro-benchmark")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per timed load scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients in load scenarios")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Allowed regression as a fraction (default: from baselines.json)")
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the baselines")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = args.database
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.db.session import engine, SessionLocal
+    from benchmarks.harness import calibrate, compare, load_baselines, print_results, save_baselines
+
+    seed_database(engine, args.reseed)
+    calibration_ms = calibrate()
+    print(f"Calibration workload: {calibration_ms:.1f} ms")
+
+    results = {}
+    if args.only in (None, "services"):
+        from benchmarks.bench_services import run_service_benchmarks
+        service_results = run_service_benchmarks(engine, SessionLocal, repeat=args.repeat)
+        print_results("Service functions (sequential)", service_results)
+        results.update(service_results)
+    if args.only in (None, "load"):
+        import main as app_main
+        from benchmarks.load_scenarios import run_load_scenarios
+        load_results = asyncio.run(run_load_scenarios(
+            app_main.app, SessionLocal, password="password123",
+            duration=args.duration, concurrency=args.concurrency
+        ))
+        print_results(f"Load scenarios ({args.concurrency} concurrent clients)", load_results)
+        results.update(load_results)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    baselines = load_baselines()
+    if args.update_baselines:
+        save_baselines(results, args.tolerance or baselines.get("tolerance", 0.25), calibration_ms, previous=baselines)
+        print(f"\nStored baselines for {len(results)} benchmarks")
+        return
+
+    regressions = compare(results, baselines, calibration_ms, args.tolerance)
+    missing = [name for name in results if name not in baselines.get("results", {})]
+    if missing:
+        print(f"\nNo baseline for {len(missing)} benchmarks (run with --update-baselines to record them)")
+    if regressions:
+        print(f"\n{len(regressions)} regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baselines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold-start profile of the API process.
+
+Reports the slowest imports of `main` (from python -X importtime) and the time spent in
+each startup step until the service reports ready. Each measurement runs in a fresh
+interpreter so nothing is cached.
+
+    python -m benchmarks.startup_profile [--top 10]
+"""
+from pathlib import Path
+from typing import Dict
+import argparse
+import json
+import subprocess
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_COLD_START = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from app.core.startup import startup_state
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        accepting = time.perf_counter()
+        while not startup_state.ready:
+            await asyncio.sleep(0.005)
+        return accepting
+
+accepting = asyncio.run(run())
+print(json.dumps({
+    "import_ms": round((imported - started) * 1000, 1),
+    "accepting_ms": round((accepting - started) * 1000, 1),
+    "steps_ms": startup_state.timings,
+    "warm_up_error": startup_state.error,
+}))
+"""
+
+
+def import_profile() -> list:
+    """(module, self ms, cumulative ms) for every module imported by main, in import order"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def cold_start() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _COLD_START],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API cold start")
+    parser.add_argument("--top", type=int, default=10, help="Rows per import table")
+    args = parser.parse_args()
+
+    rows = import_profile()
+    packages: Dict[str, float] = {}
+    for module, self_ms, _ in rows:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_ms
+
+    print(f"Import time of main by top-level package (top {args.top}):")
+    for package, self_ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_ms:8.1f} ms  {package}")
+
+    print(f"\nSlowest app modules, including their imports (top {args.top}):")
+    app_rows = [row for row in rows if row[0] == "main" or row[0].startswith("app.")]
+    for module, _, cumulative_ms in sorted(app_rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {module}")
+
+    report = cold_start()
+    print("\nCold start:")
+    print(f"  import main          {report['import_ms']:8.1f} ms")
+    for step, ms in report["steps_ms"].items():
+        print(f"  step {step:<15} {ms:8.1f} ms")
+    print(f"  accepting requests   {report['accepting_ms']:8.1f} ms after start")
+    if report["warm_up_error"]:
+        print(f"  warm-up error: {report['warm_up_error']}")
+
+
+if __name__ == "__main__":
+    main()
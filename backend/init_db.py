@@ -1,20 +1,19 @@
 import os
 import sys
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from app.db.models import Base, User, MutualFund, Investment, FundPerformance, FundAllocation, FundHolding, FundCapAllocation
 from app.core.security import get_password_hash
 from app.core.config import settings
-
-# Create database engine
-engine = create_engine(settings.DATABASE_URL)
+from app.services.returns import refresh_fund_returns
+from app.services.positions import rebuild_positions
+from app.services.securities import resolve_holdings
+from app.services.fund_snapshots import backfill_fund_snapshots
+from app.db.database import engine, SessionLocal
 
 # Create all tables
 Base.metadata.create_all(bind=engine)
 
 # Create session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 db = SessionLocal()
 
 def init_db():
@@ -138,6 +137,7 @@ def init_db():
             investment = Investment(**investment_data)
             db.add(investment)
         
+        rebuild_positions(db)
         db.commit()
         
         # Add fund performance data (for NAV history)
@@ -165,6 +165,9 @@ def init_db():
         
         db.commit()
         
+        # Precompute trailing returns from the NAV history
+        refresh_fund_returns(db)
+        
         # Add sector allocations
         sector_allocations = [
             # ICICI Prudential Bluechip Fund
@@ -243,6 +246,8 @@ def init_db():
             holding = FundHolding(**holding_data)
             db.add(holding)
         
+        db.flush()
+        resolve_holdings(db)
         db.commit()
         
         # Add market cap allocations
@@ -278,6 +283,8 @@ def init_db():
             cap_allocation = FundCapAllocation(**cap_data)
             db.add(cap_allocation)
         
+        db.flush()
+        backfill_fund_snapshots(db)
         db.commit()
         
         print("Database initialized with sample data.")
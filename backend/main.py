@@ -1,18 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api import auth, mutual_funds, investments, users, portfolio
-from app.db.models import Base
-from app.db.session import engine
+from app.core.compression import CompressionMiddleware
+from app.core.startup import run_startup_checks, run_warm_up
+from app.db.routing import PrimaryStickinessMiddleware
+from app.api import auth, mutual_funds, investments, users, portfolio, health
+import asyncio
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema check and pool pre-connection before accepting requests,
+    # cache warm-up in the background until /ready reports ready
+    await run_in_threadpool(run_startup_checks)
+    warm_up = asyncio.create_task(run_in_threadpool(run_warm_up))
+    yield
+    warm_up.cancel()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Mutual Fund Dashboard API",
     description="API for the Mutual Fund Dashboard application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -22,6 +33,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Performance-Version", "X-Performance-Reset"],
+)
+
+# Keep a client's reads on the primary right after its own writes
+app.add_middleware(PrimaryStickinessMiddleware, window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+# Compress heavy JSON payloads
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    cache_bytes=settings.COMPRESSION_CACHE_BYTES,
 )
 
 # Include routers
@@ -30,6 +52,7 @@ app.include_router(users.router, prefix="/api", tags=["Users"])
 app.include_router(mutual_funds.router, prefix="/api", tags=["Mutual Funds"])
 app.include_router(investments.router, prefix="/api", tags=["Investments"])
 app.include_router(portfolio.router, prefix="/api", tags=["Portfolio"])
+app.include_router(health.router)
 
 @app.get("/", tags=["Root"])
 async def root():
@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite file before anything imports its settings
+_DATABASE_DIR = tempfile.mkdtemp(prefix="mutual-fund-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATABASE_DIR, 'test.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.db.database import SessionLocal, engine
+from app.db.migrate import ensure_schema
+from app.db.models import Base, FundPerformance, MutualFund, User
+from app.services import fund_similarity
+from app.services.fund_search import invalidate_fund_search_index
+from app.services.nav_data import invalidate_nav_arrays
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A session on a freshly created schema; the shared in-process caches start empty"""
+    ensure_schema(engine)
+    invalidate_nav_arrays()
+    invalidate_fund_search_index()
+    monkeypatch.setattr(fund_similarity, "_index", None)
+    monkeypatch.setattr(fund_similarity, "_changed_funds", set())
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def add_fund(db):
+    """Create a fund, with daily NAVs from start when navs are given; commits and returns it"""
+    created = []
+
+    def add(name, navs=(), start=date(2024, 1, 1), fund_type="Equity", fund_category="Large Cap",
+            fund_house="Test AMC", isn=None):
+        fund = MutualFund(
+            name=name, isn=isn or f"INF{len(created):09d}", fund_type=fund_type,
+            fund_category=fund_category, fund_house=fund_house
+        )
+        db.add(fund)
+        db.flush()
+        db.add_all(
+            FundPerformance(fund_id=fund.id, date=start + timedelta(days=offset), nav=nav)
+            for offset, nav in enumerate(navs)
+        )
+        db.commit()
+        invalidate_nav_arrays()
+        created.append(fund)
+        return fund
+
+    return add
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="investor@example.com", full_name="Test Investor", password_hash="x", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(db, user):
+    """API client authenticated as user"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.api.auth import get_current_active_user
+
+    main.app.dependency_overrides[get_current_active_user] = lambda: user
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
@@ -0,0 +1,92 @@
+import gzip
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+
+PAYLOAD = {"funds": [{"id": i, "name": f"Fund {i}", "nav": 10.0 + i} for i in range(100)]}
+
+
+def _chunks():
+    for i in range(3):
+        yield json.dumps({"chunk": i, "padding": "x" * 100}) + "\n"
+
+
+def _app(**options):
+    app = Starlette(routes=[
+        Route("/funds", lambda request: JSONResponse(PAYLOAD)),
+        Route("/small", lambda request: JSONResponse({"ok": True})),
+        Route("/private", lambda request: JSONResponse(PAYLOAD, headers={"Cache-Control": "no-store"})),
+        Route("/image", lambda request: Response(b"\x89PNG" + b"\x00" * 4096, media_type="image/png")),
+        Route("/stream", lambda request: StreamingResponse(_chunks(), media_type="text/plain")),
+        Route("/events", lambda request: StreamingResponse(_chunks(), media_type="text/event-stream")),
+    ])
+    middleware = CompressionMiddleware(app, **options)
+    return middleware, TestClient(middleware)
+
+
+def test_negotiation_honours_preference_and_q_values():
+    available = ["zstd", "br", "gzip"]
+
+    assert negotiate_encoding("gzip, deflate, br, zstd", available) == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate_encoding("zstd;q=0, *;q=0.1", available) == "br"
+    assert negotiate_encoding("identity", available) is None
+    assert negotiate_encoding("br;q=bad, gzip", available) == "gzip"
+    assert negotiate_encoding("", available) is None
+
+
+def test_large_json_is_compressed_and_small_bodies_are_not():
+    _, client = _app(minimum_size=1024)
+
+    large = client.get("/funds", headers={"Accept-Encoding": "gzip"})
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/funds", headers={"Accept-Encoding": "identity"})
+
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert int(large.headers["content-length"]) < len(plain.content)
+    assert large.json() == PAYLOAD
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in plain.headers
+
+
+def test_identical_bodies_are_compressed_once_unless_no_store():
+    middleware, client = _app()
+
+    for _ in range(3):
+        client.get("/funds", headers={"Accept-Encoding": "gzip"})
+    client.get("/private", headers={"Accept-Encoding": "gzip"})
+
+    assert (middleware.cache.hits, middleware.cache.misses) == (2, 1)
+
+
+def test_streams_are_compressed_per_chunk_except_event_streams_and_binary_types():
+    _, client = _app(minimum_size=1024)
+
+    stream = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    events = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+    # Streamed chunks are compressed however small, since the total size is unknown
+    assert stream.headers["content-encoding"] == "gzip"
+    assert stream.text == "".join(_chunks())
+    assert "content-encoding" not in events.headers
+    assert events.text == "".join(_chunks())
+    assert "content-encoding" not in image.headers
+
+
+def test_compressed_bodies_decode_with_the_negotiated_encoding():
+    brotli = pytest.importorskip("brotli")
+    zstandard = pytest.importorskip("zstandard")
+    middleware, _ = _app()
+    body = json.dumps(PAYLOAD).encode()
+
+    assert gzip.decompress(middleware.compress_body("gzip", body, cacheable=False)) == body
+    assert brotli.decompress(middleware.compress_body("br", body, cacheable=False)) == body
+    assert zstandard.ZstdDecompressor().decompress(middleware.compress_body("zstd", body, cacheable=False)) == body
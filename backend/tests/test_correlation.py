@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.db.models import FundPerformance, Investment
+from app.services.correlation import get_fund_correlations, get_portfolio_correlation, get_window_returns
+from app.services.nav_data import invalidate_nav_arrays
+
+START = date(2024, 1, 1)
+DAYS = 61
+# Days fund B didn't price; its moves over them land on its next priced day
+GAPS = {10, 11, 30}
+
+
+def _prices(returns):
+    return (100.0 * np.cumprod(np.r_[1.0, 1.0 + returns])).tolist()
+
+
+@pytest.fixture
+def funds(db, add_fund):
+    rng = np.random.default_rng(7)
+    a = rng.normal(0, 0.01, DAYS - 1)
+    b = 0.5 * a + rng.normal(0, 0.01, DAYS - 1)
+    funds = {
+        "a": add_fund("Fund A", navs=_prices(a)),
+        "b": add_fund("Fund B", navs=_prices(b)),
+        "c": add_fund("Fund C", navs=_prices(-a)),
+        "short": add_fund("Short Fund", navs=_prices(a[:10])),
+    }
+    db.query(FundPerformance).filter(
+        FundPerformance.fund_id == funds["b"].id,
+        FundPerformance.date.in_([START + timedelta(days=day) for day in GAPS])
+    ).delete(synchronize_session=False)
+    db.commit()
+    invalidate_nav_arrays()
+    return funds
+
+
+def _returns(db, fund):
+    """Fund's returns from each priced day to the next, keyed by day number"""
+    navs = dict(db.query(FundPerformance.date, FundPerformance.nav).filter(FundPerformance.fund_id == fund.id))
+    days = sorted((nav_date - START).days for nav_date in navs)
+    return {
+        day: navs[START + timedelta(days=day)] / navs[START + timedelta(days=previous)] - 1
+        for previous, day in zip(days, days[1:])
+    }
+
+
+def test_correlations_use_the_days_both_funds_have_a_return(db, funds):
+    a_returns, b_returns = _returns(db, funds["a"]), _returns(db, funds["b"])
+    common = sorted(b_returns)
+    expected = np.corrcoef([a_returns[day] for day in common], [b_returns[day] for day in common])[0, 1]
+
+    most = get_fund_correlations(db, funds["a"].id)
+    least = get_fund_correlations(db, funds["a"].id, descending=False, limit=1)
+
+    assert [row["fund_name"] for row in most] == ["Fund B", "Fund C"]
+    assert most[0]["correlation"] == pytest.approx(expected)
+    assert most[0]["observations"] == len(common) == DAYS - 1 - len(GAPS)
+    assert least[0]["fund_name"] == "Fund C" and least[0]["correlation"] == pytest.approx(-1.0)
+    # Nine common days are too few for a correlation with the short fund
+    assert funds["short"].id not in {row["fund_id"] for row in most}
+
+
+def test_portfolio_correlation_covers_the_held_funds(db, funds, user):
+    for fund in (funds["c"], funds["a"]):
+        db.add(Investment(
+            user_id=user.id, fund_id=fund.id, investment_date=START, amount_invested=100.0,
+            nav_at_investment=100.0, units=1.0
+        ))
+    db.commit()
+
+    result = get_portfolio_correlation(db, user.id)
+
+    assert result["fund_names"] == [fund.name for fund in sorted((funds["a"], funds["c"]), key=lambda fund: fund.id)]
+    assert np.array(result["correlation"]) == pytest.approx(np.array([[1.0, -1.0], [-1.0, 1.0]]))
+    assert result["observations"] == [[DAYS - 1] * 2] * 2
+    assert result["end_date"] == START + timedelta(days=DAYS - 1)
+
+
+def test_window_returns_are_cached_until_the_nav_history_is_reloaded(db, funds):
+    cached = get_window_returns(db, "1Y")
+    assert get_window_returns(db, "1Y") is cached
+    assert get_window_returns(db, "3Y") is not cached
+
+    db.add(FundPerformance(fund_id=funds["a"].id, date=START + timedelta(days=DAYS), nav=1.0))
+    db.commit()
+    invalidate_nav_arrays()
+
+    reloaded = get_window_returns(db, "1Y")
+    assert reloaded is not cached
+    assert reloaded.end == cached.end + 1
+    with pytest.raises(ValueError):
+        get_window_returns(db, "5Y")
@@ -0,0 +1,56 @@
+from app.services.fund_search import FundSearchIndex, search_mutual_funds
+
+FUNDS = [
+    ("HDFC Top 100 Fund", "Equity", "Large Cap", "HDFC"),
+    ("HDFC Mid-Cap Opportunities Fund", "Equity", "Mid Cap", "HDFC"),
+    ("Axis Bluechip Fund", "Equity", "Large Cap", "Axis"),
+    ("SBI Bluechip Fund", "Equity", "Large Cap", "SBI"),
+    ("SBI Liquid Fund", "Debt", "Liquid", "SBI"),
+    ("Mirae Asset Large Cap Fund", "Equity", "Large Cap", "Mirae Asset"),
+]
+
+
+def _index():
+    return FundSearchIndex([
+        {"id": str(i), "name": name, "fund_type": fund_type, "fund_category": category, "fund_house": house}
+        for i, (name, fund_type, category, house) in enumerate(FUNDS)
+    ])
+
+
+def _names(results):
+    return [fund["name"] for fund in results]
+
+
+def test_tiers_rank_prefix_then_token_prefix_then_substring():
+    index = _index()
+
+    assert _names(index.search("sbi")) == ["SBI Bluechip Fund", "SBI Liquid Fund"]
+    # Every token prefixes a name token, in any order
+    assert _names(index.search("opp mid")) == ["HDFC Mid-Cap Opportunities Fund"]
+    # Whole-name prefix comes before token prefixes, which are alphabetical
+    assert _names(index.search("blue")) == ["Axis Bluechip Fund", "SBI Bluechip Fund"]
+    assert _names(index.search("uechi")) == ["Axis Bluechip Fund", "SBI Bluechip Fund"]
+
+
+def test_typos_match_by_trigram_similarity():
+    index = _index()
+
+    assert _names(index.search("blucheep")) == []
+    assert _names(index.search("bluechp", min_similarity=0.4)) == ["Axis Bluechip Fund", "SBI Bluechip Fund"]
+    assert _names(index.search("mirae aset")) == ["Mirae Asset Large Cap Fund"]
+
+
+def test_filters_and_limit_apply_to_every_tier():
+    index = _index()
+
+    assert _names(index.search("fund", fund_house="sbi")) == ["SBI Bluechip Fund", "SBI Liquid Fund"]
+    assert _names(index.search("", fund_category="large cap", limit=2)) == ["Axis Bluechip Fund", "HDFC Top 100 Fund"]
+    assert _names(index.search("bluechip", fund_type="Debt")) == []
+
+
+def test_search_reads_funds_from_the_database(db, add_fund):
+    add_fund("Kotak Flexicap Fund", fund_house="Kotak")
+    add_fund("Parag Parikh Flexi Cap Fund", fund_house="PPFAS")
+
+    assert _names(search_mutual_funds(db, "flexcap")) == ["Kotak Flexicap Fund", "Parag Parikh Flexi Cap Fund"]
+    assert _names(search_mutual_funds(db, "flexi", fund_house="ppfas")) == ["Parag Parikh Flexi Cap Fund"]
@@ -0,0 +1,76 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.fund_similarity import get_near_clone_funds, get_similar_funds, minhash_signatures
+from app.services.fund_snapshots import publish_fund_composition
+
+AS_OF = date(2024, 1, 1)
+STOCKS = [f"Stock {i}" for i in range(10)]
+
+
+def test_signatures_estimate_weighted_jaccard_similarity():
+    # Fund 0 and 1 are identical; fund 2 shares 60% of fund 0's weight (60 / 140); fund 3 holds nothing
+    codes = np.array([0, 0, 1, 1, 2, 2])
+    securities = np.array([1, 2, 2, 1, 1, 3])
+    percentages = np.array([60.0, 40.0, 40.0, 60.0, 60.0, 40.0])
+
+    signatures = minhash_signatures(codes, securities, percentages, 4)
+    alone = minhash_signatures(codes[4:] - 2, securities[4:], percentages[4:], 1)
+
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() == pytest.approx(60 / 140, abs=0.1)
+    assert (signatures[3] == np.iinfo(np.uint32).max).all()
+    # A fund's signature doesn't depend on the other funds signed with it
+    assert (alone[0] == signatures[2]).all()
+
+
+@pytest.fixture
+def funds(db, add_fund):
+    """A fund, its clone at another house, a fund sharing 80% of it and an unrelated one"""
+    def publish(name, house, holdings):
+        fund = add_fund(name, fund_house=house)
+        publish_fund_composition(db, fund.id, AS_OF, holdings, [], [])
+        return fund
+
+    return (
+        publish("Original Fund", "Alpha AMC", [(stock, 10.0) for stock in STOCKS]),
+        publish("Clone Fund", "Beta AMC", [(stock, 10.0) for stock in STOCKS]),
+        publish("Overlap Fund", "Alpha AMC", [(stock, 10.0) for stock in STOCKS[:8]] + [("Other", 20.0)]),
+        publish("Unrelated Fund", "Gamma AMC", [("Gold", 100.0)]),
+    )
+
+
+def test_similar_funds_rank_the_clone_first_and_skip_unrelated_funds(db, funds, add_fund):
+    original, clone, overlap, _ = funds
+    empty = add_fund("Empty Fund")
+
+    similar = get_similar_funds(db, original.id)
+
+    assert [row["fund_id"] for row in similar] == [clone.id, overlap.id]
+    assert similar[0]["similarity"] == 1.0
+    assert similar[0]["fund_house"] == "Beta AMC"
+    assert similar[1]["similarity"] == pytest.approx(80 / 120, abs=0.1)
+    assert get_similar_funds(db, empty.id) is None
+
+
+def test_republished_funds_are_re_signed(db, funds):
+    original, clone, overlap, unrelated = funds
+    assert get_similar_funds(db, unrelated.id) == []
+
+    publish_fund_composition(db, unrelated.id, date(2024, 6, 30), [(stock, 10.0) for stock in STOCKS], [], [])
+
+    assert get_similar_funds(db, unrelated.id, limit=2, min_similarity=0.99)[0]["similarity"] == 1.0
+    assert {row["fund_id"] for row in get_similar_funds(db, original.id)} == {clone.id, overlap.id, unrelated.id}
+
+
+def test_near_clones_are_paired_across_houses_by_default(db, funds):
+    original, clone, overlap, _ = funds
+
+    across = get_near_clone_funds(db, min_similarity=0.6)
+    anywhere = get_near_clone_funds(db, min_similarity=0.6, across_houses=False)
+
+    assert [{pair["fund1_id"], pair["fund2_id"]} for pair in across] == [{original.id, clone.id}, {clone.id, overlap.id}]
+    assert {original.id, overlap.id} in [{pair["fund1_id"], pair["fund2_id"]} for pair in anywhere]
+    assert across[0]["similarity"] == 1.0
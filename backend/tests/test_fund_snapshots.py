@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.db.models import FundAllocation, FundHolding, FundSnapshot
+from app.services.fund_snapshots import (
+    backfill_fund_snapshots, content_hash, current_snapshot, publish_fund_composition
+)
+from app.services.mutual_fund import add_fund_holding, get_mutual_fund_holdings
+
+
+def test_fund_detail_returns_only_the_current_composition(db, add_fund, client):
+    fund = add_fund("Bluechip Fund", navs=[10.0, 10.5])
+    publish_fund_composition(
+        db, fund.id, date(2024, 1, 1),
+        [("HDFC Bank", 60.0), ("Infosys", 40.0)], [("Banking", 60.0), ("IT", 40.0)], [("Large Cap", 100.0)]
+    )
+    publish_fund_composition(
+        db, fund.id, date(2024, 6, 30),
+        [("HDFC Bank Ltd", 55.0), ("TCS", 45.0)], [("Banking", 55.0), ("IT", 45.0)],
+        [("Large Cap", 80.0), ("Mid Cap", 20.0)]
+    )
+
+    response = client.get(f"/api/mutual-funds/{fund.id}")
+
+    assert response.status_code == 200
+    detail = response.json()
+    assert sorted(row["stock_name"] for row in detail["holdings"]) == ["HDFC Bank Ltd", "TCS"]
+    assert sorted((row["sector"], row["percentage"]) for row in detail["sector_allocations"]) == [
+        ("Banking", 55.0), ("IT", 45.0)
+    ]
+    assert sorted((row["cap_type"], row["percentage"]) for row in detail["cap_allocations"]) == [
+        ("Large Cap", 80.0), ("Mid Cap", 20.0)
+    ]
+    assert [row["nav"] for row in detail["performances"]] == [10.0, 10.5]
+
+
+def test_unchanged_publish_stores_the_stale_content_hash(db, add_fund):
+    fund = add_fund("Midcap Fund")
+    add_fund_holding(db, fund.id, "Infosys", 50.0)
+    add_fund_holding(db, fund.id, "TCS", 50.0)
+    edited = current_snapshot(db, fund.id)
+    assert edited.content_hash is None
+
+    published = publish_fund_composition(db, fund.id, date.today(), [("TCS", 50.0), ("Infosys", 50.0)], [], [])
+
+    assert published.id == edited.id
+    with SessionLocal() as other:
+        stored = other.get(FundSnapshot, edited.id)
+        assert stored.content_hash == content_hash([("Infosys", 50.0), ("TCS", 50.0)], [], [])
+        assert other.query(FundSnapshot).filter(FundSnapshot.fund_id == fund.id).count() == 1
+
+
+def _holdings(db, fund_id, as_of=None):
+    return sorted((row.stock_name, row.percentage) for row in get_mutual_fund_holdings(db, fund_id, as_of))
+
+
+@pytest.fixture
+def versioned(db, add_fund):
+    """A fund whose holdings changed on 2024-06-30"""
+    fund = add_fund("Flexicap Fund")
+    publish_fund_composition(db, fund.id, date(2024, 1, 1), [("Infosys", 60.0), ("TCS", 40.0)], [], [])
+    publish_fund_composition(db, fund.id, date(2024, 6, 30), [("Infosys", 30.0), ("Wipro", 70.0)], [], [])
+    return fund
+
+
+def test_reads_as_of_a_date_see_the_version_in_effect_then(db, versioned, client):
+    assert _holdings(db, versioned.id, date(2024, 6, 29)) == [("Infosys", 60.0), ("TCS", 40.0)]
+    assert _holdings(db, versioned.id, date(2024, 6, 30)) == [("Infosys", 30.0), ("Wipro", 70.0)]
+    assert _holdings(db, versioned.id) == [("Infosys", 30.0), ("Wipro", 70.0)]
+
+    before = client.get(f"/api/mutual-funds/{versioned.id}/holdings", params={"date": "2023-12-31"})
+    during = client.get(f"/api/mutual-funds/{versioned.id}/holdings", params={"date": "2024-03-01"})
+    assert before.status_code == 404
+    assert sorted(row["stock_name"] for row in during.json()) == ["Infosys", "TCS"]
+
+
+def test_publishing_replaces_same_day_versions_and_rejects_earlier_dates(db, versioned):
+    replaced = publish_fund_composition(db, versioned.id, date(2024, 6, 30), [("Wipro", 100.0)], [], [])
+
+    assert db.query(FundSnapshot).filter(FundSnapshot.fund_id == versioned.id).count() == 2
+    assert replaced.valid_from == date(2024, 6, 30)
+    assert _holdings(db, versioned.id) == [("Wipro", 100.0)]
+    with pytest.raises(ValueError, match="already has a composition from 2024-06-30"):
+        publish_fund_composition(db, versioned.id, date(2024, 3, 1), [("TCS", 100.0)], [], [])
+
+
+def test_single_row_edits_start_a_version_today_and_keep_the_past(db, versioned):
+    add_fund_holding(db, versioned.id, "HDFC Bank", 10.0)
+
+    today = date.today()
+    edited = current_snapshot(db, versioned.id)
+    assert edited.valid_from == today
+    assert _holdings(db, versioned.id) == [("HDFC Bank", 10.0), ("Infosys", 30.0), ("Wipro", 70.0)]
+    assert _holdings(db, versioned.id, today - timedelta(days=1)) == [("Infosys", 30.0), ("Wipro", 70.0)]
+
+
+def test_backfill_attaches_unversioned_rows_from_the_first_nav(db, add_fund):
+    fund = add_fund("Legacy Fund", navs=[10.0, 10.1], start=date(2020, 4, 1))
+    db.add_all([
+        FundHolding(fund_id=fund.id, stock_name="ITC", percentage=100.0),
+        FundAllocation(fund_id=fund.id, sector="FMCG", percentage=100.0),
+    ])
+    db.commit()
+
+    assert backfill_fund_snapshots(db) == 1
+    db.commit()
+
+    snapshot = current_snapshot(db, fund.id)
+    assert snapshot.valid_from == date(2020, 4, 1)
+    assert snapshot.content_hash == content_hash([("ITC", 100.0)], [("FMCG", 100.0)], [])
+    assert _holdings(db, fund.id, date(2021, 1, 1)) == [("ITC", 100.0)]
+    assert backfill_fund_snapshots(db) == 0
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+
+from app.db.models import Investment, Position, User
+
+
+@pytest.fixture
+def fund(add_fund):
+    return add_fund("Bluechip Fund")
+
+
+@pytest.fixture
+def lots(db, fund, user, client):
+    """Two lots of the user's: 100 and 50 units"""
+    response = client.post("/api/investments/batch", json={"create": [
+        {"fund_id": fund.id, "investment_date": "2024-01-02", "amount_invested": 1000.0, "nav_at_investment": 10.0},
+        {"fund_id": fund.id, "investment_date": "2024-02-01", "amount_invested": 600.0, "nav_at_investment": 12.0},
+    ]})
+    assert response.status_code == 200
+    return [lot["id"] for lot in response.json()["created"]]
+
+
+def _state(db, user, fund):
+    db.expire_all()
+    # Every user's lots, so changes to another user's lot show too
+    lots = db.query(Investment.amount_invested, Investment.units).order_by(Investment.amount_invested).all()
+    position = db.get(Position, (user.id, fund.id))
+    return [tuple(lot) for lot in lots], position and (position.units, position.invested, position.lot_count)
+
+
+def test_batch_applies_deletes_updates_and_creates_together(db, fund, user, client, lots):
+    first, second = lots
+
+    response = client.post("/api/investments/batch", json={
+        "delete": [first],
+        "update": [{"id": second, "amount_invested": 1200.0}],
+        "create": [
+            {"fund_id": fund.id, "investment_date": "2024-03-01", "amount_invested": 250.0, "nav_at_investment": 12.5}
+        ],
+    })
+
+    assert response.status_code == 200
+    result = response.json()
+    assert [lot["id"] for lot in result["deleted"]] == [first]
+    assert [(lot["id"], lot["units"], lot["investment_date"]) for lot in result["updated"]] == [
+        (second, 100.0, "2024-02-01")
+    ]
+    assert [lot["units"] for lot in result["created"]] == [20.0]
+    assert _state(db, user, fund) == ([(250.0, 20.0), (1200.0, 100.0)], (120.0, 1450.0, 2))
+
+
+def test_another_users_lot_aborts_the_whole_batch(db, fund, user, client, lots):
+    other = User(email="other@example.com", full_name="Other Investor", password_hash="x", is_active=True)
+    db.add(other)
+    db.flush()
+    foreign = Investment(
+        user_id=other.id, fund_id=fund.id, investment_date=date(2024, 1, 2),
+        amount_invested=10.0, nav_at_investment=10.0, units=1.0
+    )
+    db.add(foreign)
+    db.commit()
+    before = _state(db, user, fund)
+
+    response = client.post("/api/investments/batch", json={
+        "delete": [lots[0]],
+        "update": [{"id": foreign.id, "amount_invested": 5.0}],
+    })
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Investments not found: {foreign.id}"
+    assert _state(db, user, fund) == before
+
+
+def test_unknown_funds_abort_the_whole_batch(db, fund, user, client, lots):
+    before = _state(db, user, fund)
+
+    response = client.post("/api/investments/batch", json={
+        "delete": [lots[1]],
+        "create": [
+            {"fund_id": "missing", "investment_date": "2024-03-01", "amount_invested": 100.0, "nav_at_investment": 10.0}
+        ],
+    })
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Mutual funds not found: missing"
+    assert _state(db, user, fund) == before
+
+
+def test_a_lot_cannot_be_updated_and_deleted_in_one_batch(client, lots):
+    response = client.post("/api/investments/batch", json={
+        "delete": [lots[0]], "update": [{"id": lots[0], "amount_invested": 5.0}]
+    })
+
+    assert response.status_code == 422
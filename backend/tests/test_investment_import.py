@@ -0,0 +1,73 @@
+from datetime import date
+
+import pytest
+
+from app.db.models import Investment, Position
+from app.services.investment_import import ImportRowError, import_investments, iter_csv_lots
+
+CSV = """isin,date,amount,nav,units,type
+INF109K016L0,2024-01-02,"1,000",10,,PURCHASE
+INF109K016L0,02-Jan-2024,500,10,,REDEMPTION
+INF999X99999,2024-01-03,100,10,,PURCHASE
+INF109K016L0,2024/01/03,100,10,,PURCHASE
+INF109K016L0,2024-01-04,-5,10,,PURCHASE
+,,,,,
+inf109k016l0,05-01-2024,200,20,10.5,PURCHASE_SIP
+"""
+
+
+@pytest.fixture
+def fund(add_fund):
+    return add_fund("Bluechip Fund", isn="INF109K016L0")
+
+
+def _import(db, user, **options):
+    return import_investments(db, user.id, iter_csv_lots(CSV.splitlines()), **options)
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(db, fund, user):
+    report = _import(db, user)
+
+    assert (report["imported"], report["skipped"], report["duplicates"]) == (2, 1, 0)
+    assert report["error_count"] == 3
+    assert report["errors"] == [
+        {"row": 4, "error": "Unknown ISN INF999X99999"},
+        {"row": 5, "error": "Invalid date: '2024/01/03'"},
+        {"row": 6, "error": "amount_invested must be positive"},
+    ]
+    lots = db.query(Investment).order_by(Investment.investment_date).all()
+    assert [(lot.investment_date, lot.amount_invested, lot.units) for lot in lots] == [
+        (date(2024, 1, 2), 1000.0, 100.0), (date(2024, 1, 5), 200.0, 10.5)
+    ]
+    position = db.get(Position, (user.id, fund.id))
+    assert (position.units, position.lot_count) == (110.5, 2)
+
+
+def test_strict_and_dry_run_imports_write_nothing(db, fund, user):
+    strict = _import(db, user, strict=True)
+    dry_run = _import(db, user, dry_run=True)
+
+    assert (strict["imported"], strict["error_count"]) == (0, 3)
+    assert (dry_run["imported"], dry_run["dry_run"]) == (2, True)
+    assert db.query(Investment).count() == 0
+
+
+def test_importing_a_statement_again_skips_the_lots_already_held(db, fund, user):
+    _import(db, user)
+
+    again = _import(db, user)
+    forced = _import(db, user, skip_duplicates=False)
+
+    assert (again["imported"], again["duplicates"]) == (0, 2)
+    assert (forced["imported"], forced["duplicates"]) == (2, 0)
+    assert db.query(Investment).count() == 4
+
+
+def test_files_without_the_required_columns_are_rejected(db, fund, client):
+    with pytest.raises(ImportRowError, match="Missing columns: nav_at_investment"):
+        list(iter_csv_lots(["isin,date,amount", "INF109K016L0,2024-01-02,100"]))
+
+    response = client.post("/api/investments/import", files={"file": ("lots.csv", b"isin,date\n")})
+
+    assert response.status_code == 400
+    assert "Missing columns" in response.json()["detail"]
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from app.api import portfolio as portfolio_api
+from app.services.live_updates import PortfolioBroker, portfolio_broker
+
+
+def _data(event: str) -> dict:
+    name, data = event.strip().split("\n")
+    assert name == "event: summary"
+    return json.loads(data[len("data: "):])
+
+
+def test_stream_sends_the_full_summary_then_changes(monkeypatch):
+    summaries = iter([
+        {"total_value": 1000.0, "total_invested": 900.0, "xirr": None},
+        {"total_value": 1100.0, "total_invested": 900.0, "xirr": None},
+    ])
+    monkeypatch.setattr(portfolio_api, "_load_summary", lambda user_id: next(summaries))
+
+    async def first_two_events():
+        events = portfolio_api._summary_events("user-1", {"fund-a"})
+        try:
+            first = await events.__anext__()
+            portfolio_broker.publish_nav_update(["fund-a"])
+            second = await events.__anext__()
+        finally:
+            await events.aclose()
+        return first, second
+
+    first, second = asyncio.run(first_two_events())
+
+    assert _data(first) == {"total_value": 1000.0, "total_invested": 900.0, "xirr": None}
+    assert _data(second) == {"total_value": 1100.0}
+    assert portfolio_broker.stream_count == 0
+
+
+def test_nav_updates_wake_only_holders_once_per_burst():
+    async def scenario():
+        broker = PortfolioBroker()
+        holder = broker.subscribe("holder", {"fund-a"})
+        bystander = broker.subscribe("bystander", {"fund-b"})
+        broker.publish_nav_update(["fund-a"])
+        broker.publish_nav_update(["fund-a", "fund-c"])
+        woken = (holder.qsize(), bystander.qsize())
+        broker.unsubscribe("holder", holder)
+        broker.publish_nav_update(["fund-a"])
+        return woken, broker.stream_count
+
+    assert asyncio.run(scenario()) == ((1, 0), 1)
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.db.models import Investment, PortfolioXirr, User
+from app.jobs.nightly_xirr import run_nightly_xirr
+
+AS_OF = date(2024, 1, 2)
+
+
+@pytest.fixture
+def investors(db, add_fund, user):
+    """Two users holding a fund whose NAV went from 10 to 11 over exactly a year"""
+    fund = add_fund("Flexicap Fund", navs=[11.0], start=AS_OF)
+    other = User(email="second@example.com", full_name="Second Investor", password_hash="x", is_active=True)
+    db.add(other)
+    db.flush()
+    for owner in (user, other):
+        db.add(Investment(user_id=owner.id, fund_id=fund.id, investment_date=date(2023, 1, 2),
+                          amount_invested=1000.0, nav_at_investment=10.0, units=100.0))
+    db.commit()
+    return fund, [user, other]
+
+
+def _stored(db):
+    return sorted(
+        (row.user_id, row.fund_id or "", round(row.xirr, 6))
+        for row in db.query(PortfolioXirr).filter(PortfolioXirr.as_of_date == AS_OF)
+    )
+
+
+def test_rerun_replaces_rows_page_by_page(db, investors):
+    fund, users = investors
+
+    first = run_nightly_xirr(db, as_of=AS_OF, chunk_size=1)
+    second = run_nightly_xirr(db, as_of=AS_OF, chunk_size=1)
+
+    assert first["rows"] == second["rows"] == 4
+    expected = sorted((owner.id, fund_id, 10.0) for owner in users for fund_id in ("", fund.id))
+    assert _stored(db) == expected
+
+
+def test_rerun_drops_users_without_lots(db, investors):
+    fund, users = investors
+    run_nightly_xirr(db, as_of=AS_OF)
+
+    db.query(Investment).filter(Investment.user_id == max(owner.id for owner in users)).delete()
+    db.commit()
+    run_nightly_xirr(db, as_of=AS_OF, chunk_size=1)
+
+    assert {user_id for user_id, _, _ in _stored(db)} == {min(owner.id for owner in users)}
+
+
+def test_duplicate_portfolio_rows_are_rejected(db, user):
+    db.add(PortfolioXirr(user_id=user.id, fund_id=None, as_of_date=AS_OF, xirr=1.0))
+    db.commit()
+    db.add(PortfolioXirr(user_id=user.id, fund_id=None, as_of_date=AS_OF, xirr=2.0))
+    with pytest.raises(IntegrityError):
+        db.commit()
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from app.services.portfolio import PortfolioSnapshot, portfolio_holdings, summarize_portfolio
+
+AS_OF = date(2024, 12, 31)
+
+
+def _snapshot(cash_flows):
+    positions = [
+        ("fund-a", 100.0, 1000.0, date(2023, 1, 2)),
+        ("fund-b", 50.0, 1000.0, date(2023, 6, 1)),
+    ]
+    return PortfolioSnapshot(
+        "user-1",
+        positions,
+        {"fund-a": 12.5, "fund-b": 24.0},
+        {"fund-a": "Fund A", "fund-b": "Fund B"},
+        cash_flows=cash_flows,
+        as_of=AS_OF,
+    )
+
+
+def test_summary_is_repeatable_with_portfolio_cash_flows():
+    flows = [(date(2023, 1, 2), -1000.0), (date(2023, 6, 1), -1000.0)]
+    snapshot = _snapshot({None: flows})
+
+    first = summarize_portfolio(snapshot)
+    second = summarize_portfolio(snapshot)
+
+    assert first["xirr"] is not None
+    assert second["xirr"] == pytest.approx(first["xirr"])
+    assert snapshot.cash_flows[None] == flows
+
+
+def test_summary_matches_per_fund_cash_flows():
+    per_fund = _snapshot({
+        "fund-a": [(date(2023, 1, 2), -1000.0)],
+        "fund-b": [(date(2023, 6, 1), -1000.0)],
+    })
+    portfolio = _snapshot({None: [(date(2023, 1, 2), -1000.0), (date(2023, 6, 1), -1000.0)]})
+
+    assert summarize_portfolio(per_fund)["xirr"] == pytest.approx(summarize_portfolio(portfolio)["xirr"])
+    portfolio_holdings(per_fund)
+    assert per_fund.fund_cash_flows("fund-a") == [(date(2023, 1, 2), -1000.0)]
+
+
+def test_portfolio_cash_flows_returns_a_copy():
+    flows = [(date(2023, 1, 2), -1000.0)]
+    snapshot = _snapshot({None: flows})
+
+    snapshot.portfolio_cash_flows().append((AS_OF, 1.0))
+
+    assert snapshot.portfolio_cash_flows() == [(date(2023, 1, 2), -1000.0)]
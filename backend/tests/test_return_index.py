@@ -0,0 +1,36 @@
+from datetime import date
+
+import pytest
+
+from app.services.return_index import get_range_returns
+
+
+def test_range_returns_resolve_dates_as_of_the_last_nav(db, add_fund):
+    fund = add_fund("Growth Fund", navs=[10.0, 11.0, 12.0, 12.0, 15.0])
+
+    [first, weekend, unknown] = get_range_returns(db, [
+        (fund.id, date(2024, 1, 1), date(2024, 1, 5)),
+        (fund.id, date(2024, 1, 2), date(2024, 1, 31)),
+        ("missing", date(2024, 1, 1), date(2024, 1, 5)),
+    ])
+
+    assert first["absolute_return"] == pytest.approx(50.0)
+    assert first["annualized_return"] == pytest.approx((1.5 ** (365 / 4) - 1) * 100)
+    assert weekend["resolved_end_date"] == date(2024, 1, 5)
+    assert weekend["absolute_return"] == pytest.approx(15.0 / 11.0 * 100 - 100)
+    assert unknown["absolute_return"] is None and unknown["resolved_start_date"] is None
+
+
+def test_ranges_touching_a_nav_that_isnt_positive_have_no_return(db, add_fund):
+    fund = add_fund("Glitched Fund", navs=[10.0, 0.0, 11.0, 12.0, 13.2])
+
+    [across, from_bad, after] = get_range_returns(db, [
+        (fund.id, date(2024, 1, 1), date(2024, 1, 5)),
+        (fund.id, date(2024, 1, 2), date(2024, 1, 4)),
+        (fund.id, date(2024, 1, 3), date(2024, 1, 5)),
+    ])
+
+    assert across["absolute_return"] is None and across["annualized_return"] is None
+    assert across["resolved_start_date"] == date(2024, 1, 1)
+    assert from_bad["absolute_return"] is None
+    assert after["absolute_return"] == pytest.approx(20.0)
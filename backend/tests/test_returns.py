@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+
+from app.db.database import engine
+from app.db.migrate import backfill_returns
+from app.db.models import FundPerformance
+from app.services.returns import get_fund_returns, refresh_fund_returns
+
+START = date(2023, 1, 1)
+
+
+def test_migration_backfills_an_empty_returns_table(db, add_fund, client):
+    # Flat for a year, then up 20% on the last day (2024-01-02)
+    add_fund("Value Fund", navs=[10.0] * 366 + [12.0], start=START)
+
+    backfill_returns(engine)
+
+    [row] = client.get("/api/mutual-funds/returns").json()
+    assert row["name"] == "Value Fund"
+    assert row["as_of_date"] == "2024-01-02"
+    assert row["one_month"] == pytest.approx(20.0)
+    assert row["one_year"] == pytest.approx(20.0)
+    assert row["three_year"] is None
+
+
+def test_migration_leaves_a_filled_returns_table_alone(db, add_fund):
+    add_fund("Value Fund", navs=[10.0, 11.0], start=START)
+    backfill_returns(engine)
+    add_fund("Growth Fund", navs=[10.0, 12.0], start=START)
+
+    backfill_returns(engine)
+
+    assert [row["name"] for row in get_fund_returns(db)] == ["Value Fund"]
+
+
+def test_trailing_returns_are_absolute_below_a_year_and_annualized_above(db, add_fund):
+    # Up 0.1% a day for 400 days
+    add_fund("Steady Fund", navs=[10.0 * 1.001 ** day for day in range(400)], start=START)
+
+    refresh_fund_returns(db)
+
+    [row] = get_fund_returns(db)
+    assert row["as_of_date"] == date(2024, 2, 4)
+    assert row["one_month"] == pytest.approx((1.001 ** 30 - 1) * 100)
+    assert row["six_month"] == pytest.approx((1.001 ** 180 - 1) * 100)
+    assert row["one_year"] == pytest.approx((1.001 ** 365 - 1) * 100)
+    assert row["since_inception"] == pytest.approx((1.001 ** 365 - 1) * 100)
+    assert row["three_year"] is None and row["five_year"] is None
+
+
+def test_period_starts_fall_back_to_the_last_nav_before_them(db, add_fund):
+    fund = add_fund("Sparse Fund")
+    db.add_all([
+        FundPerformance(fund_id=fund.id, date=date(2024, 1, 1), nav=10.0),
+        FundPerformance(fund_id=fund.id, date=date(2024, 3, 1), nav=11.0),
+    ])
+    db.commit()
+
+    refresh_fund_returns(db)
+
+    [row] = get_fund_returns(db)
+    # One month back is 2024-01-31, which resolves to the 2024-01-01 NAV
+    assert row["one_month"] == pytest.approx(10.0)
+    assert row["three_month"] is None
+    assert row["since_inception"] == pytest.approx(10.0)
+
+
+def test_refreshing_some_funds_keeps_the_others_and_sorts_missing_returns_last(db, add_fund):
+    young = add_fund("Young Fund", navs=[10.0, 10.5], start=date(2024, 1, 1))
+    old = add_fund("Old Fund", navs=[10.0] * 365 + [11.0], start=START)
+    refresh_fund_returns(db)
+    assert [row["name"] for row in get_fund_returns(db, sort_by="one_year")] == ["Old Fund", "Young Fund"]
+
+    db.add(FundPerformance(fund_id=young.id, date=date(2024, 1, 3), nav=12.6))
+    db.commit()
+    assert refresh_fund_returns(db, [young.id]) == 1
+
+    rows = {row["fund_id"]: row for row in get_fund_returns(db, sort_by="since_inception")}
+    assert rows[young.id]["since_inception"] == pytest.approx(26.0)
+    assert rows[old.id]["one_year"] == pytest.approx(10.0)
@@ -0,0 +1,55 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.risk import get_fund_risk
+
+START = date(2021, 1, 1)
+DAYS = 1100
+
+
+def _navs(scale):
+    """Alternating +1% / -0.5% days times scale, with one crash of 20% times scale on day 200"""
+    returns = np.where(np.arange(1, DAYS) % 2, 0.01, -0.005) * scale
+    returns[199] = -0.2 * scale
+    return (10.0 * np.cumprod(np.r_[1.0, 1.0 + returns])).tolist()
+
+
+@pytest.fixture
+def funds(add_fund):
+    return add_fund("Steady Fund", navs=_navs(1), start=START), add_fund("Geared Fund", navs=_navs(2), start=START)
+
+
+def test_windows_look_back_from_the_latest_nav(db, funds):
+    steady, _ = funds
+
+    one_year = get_fund_risk(db, steady.id, "1Y")
+    three_year = get_fund_risk(db, steady.id, "3Y")
+    full = get_fund_risk(db, steady.id, "MAX")
+
+    assert one_year["end_date"] == date(2024, 1, 5)
+    assert (one_year["start_date"], one_year["observations"]) == (date(2023, 1, 5), 365)
+    assert (three_year["start_date"], three_year["observations"]) == (date(2021, 1, 5), 1095)
+    assert (full["start_date"], full["observations"]) == (START, DAYS - 1)
+    # The crash on day 200 is only inside the longer windows
+    assert one_year["max_drawdown"] == pytest.approx(-0.5)
+    assert three_year["max_drawdown"] == pytest.approx(-20.0)
+    assert one_year["annualized_return"] > three_year["annualized_return"]
+
+
+def test_beta_and_volatility_against_the_equal_weighted_universe(db, funds):
+    steady, geared = funds
+
+    for window in ("1Y", "3Y"):
+        steady_risk = get_fund_risk(db, steady.id, window)
+        geared_risk = get_fund_risk(db, geared.id, window)
+        # The benchmark's daily return is 1.5x the steady fund's
+        assert steady_risk["beta"] == pytest.approx(2 / 3)
+        assert geared_risk["beta"] == pytest.approx(4 / 3)
+        assert geared_risk["volatility"] == pytest.approx(2 * steady_risk["volatility"])
+
+
+def test_unknown_funds_have_no_risk(db, funds, client):
+    assert get_fund_risk(db, "missing", "1Y") is None
+    assert client.get("/api/mutual-funds/missing/risk").status_code == 404
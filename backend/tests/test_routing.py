@@ -0,0 +1,56 @@
+import pytest
+
+from app.db.database import create_database_engine
+from app.db.routing import PRIMARY_COOKIE, Replica, ReplicaRouter, replica_router
+
+
+@pytest.fixture
+def with_replica(db, monkeypatch):
+    """Route reads to a stand-in replica (the same SQLite file) so stickiness is in play"""
+    url = str(db.get_bind().url)
+    monkeypatch.setattr(replica_router, "replicas", [Replica(url, create_database_engine(url))])
+
+
+def test_read_only_post_does_not_pin_reads_to_the_primary(with_replica, add_fund, client):
+    fund = add_fund("Index Fund", navs=[10.0, 10.1, 10.2])
+
+    response = client.post("/api/mutual-funds/returns/range", json={"queries": [
+        {"fund_id": fund.id, "start_date": "2024-01-01", "end_date": "2024-01-03"}
+    ]})
+
+    assert response.status_code == 200
+    assert PRIMARY_COOKIE not in response.cookies
+
+
+def test_committed_write_pins_reads_to_the_primary(with_replica, add_fund, client):
+    fund = add_fund("Index Fund", navs=[10.0])
+
+    response = client.post("/api/investments/", json={
+        "fund_id": fund.id, "investment_date": "2024-01-01", "amount_invested": 1000.0, "nav_at_investment": 10.0
+    })
+
+    assert response.status_code == 200
+    assert float(response.cookies[PRIMARY_COOKIE]) > 0
+
+
+def test_failed_write_does_not_pin_reads(with_replica, client):
+    response = client.post("/api/investments/", json={
+        "fund_id": "missing", "investment_date": "2024-01-01", "amount_invested": 1000.0, "nav_at_investment": 10.0
+    })
+
+    assert response.status_code >= 400
+    assert PRIMARY_COOKIE not in response.cookies
+
+
+def test_router_skips_replicas_behind_the_lag_limit(db):
+    url = str(db.get_bind().url)
+    router = ReplicaRouter([url, url], max_lag_seconds=5, check_interval=60)
+    lagging, current = router.replicas
+    lagging.measure()
+    current.measure()
+    lagging.lag_seconds = 30.0
+
+    assert [router.pick() for _ in range(3)] == [current.engine] * 3
+
+    current.error = "connection refused"
+    assert router.pick() is None
@@ -0,0 +1,75 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.xirr import pack_cash_flows, solve_xirr, xirr_for_sets
+
+
+def _flat(flows):
+    """Flat (set code, ordinal, amount) arrays from (set code, date, amount) tuples"""
+    return (
+        np.array([code for code, _, _ in flows], dtype=np.int64),
+        np.array([flow_date.toordinal() for _, flow_date, _ in flows], dtype=np.int64),
+        np.array([amount for _, _, amount in flows], dtype=np.float64),
+    )
+
+
+def test_pack_sums_flows_on_the_same_date():
+    flows = [(0, date(2023, 1, 1), -100.0), (0, date(2024, 1, 1), 165.0), (0, date(2023, 1, 1), -50.0)]
+
+    [(members, amounts, years)] = pack_cash_flows(*_flat(flows), 1)
+
+    assert members.tolist() == [0]
+    assert amounts.tolist() == [[-150.0, 165.0]]
+    assert years.tolist() == [[0.0, 1.0]]
+
+
+def test_pack_groups_sets_by_flow_count():
+    many = [(0, date.fromordinal(date(2020, 1, 1).toordinal() + day), -10.0) for day in range(100)]
+    few = [(1, date(2023, 1, 1), -100.0), (1, date(2024, 1, 1), 110.0), (2, date(2023, 6, 1), -5.0)]
+
+    groups = pack_cash_flows(*_flat(many + few), 4)
+
+    shapes = {tuple(members.tolist()): amounts.shape for members, amounts, _ in groups}
+    # Set 3 has no flows and is in no group; set 0 doesn't widen sets 1 and 2
+    assert shapes == {(2,): (1, 1), (1,): (1, 2), (0,): (1, 128)}
+
+
+def test_same_day_lots_give_the_same_xirr_as_one_lot():
+    split = [(date(2022, 3, 1), -600.0), (date(2022, 3, 1), -400.0), (date(2024, 3, 1), 1210.0)]
+    merged = [(date(2022, 3, 1), -1000.0), (date(2024, 3, 1), 1210.0)]
+
+    rates = xirr_for_sets([split, merged, []])
+
+    assert rates[0] == pytest.approx(rates[1])
+    assert rates[0] == pytest.approx(10.0, abs=0.05)
+    assert rates[2] is None
+
+
+def test_solver_handles_padding_steep_rates_and_sets_without_a_root():
+    amounts = np.array([
+        [-1000.0, 1100.0, 0.0, 0.0],        # 10%, padded
+        [-1.0, 50.0, 0.0, 0.0],             # 4900%, far from Newton's start
+        [-100.0, 100.0, -100.0, 0.0],       # NPV is negative at every rate
+        [-100.0, -50.0, 0.0, 0.0],          # no inflow
+        [-1.0, 1000.0, 0.0, 0.0],           # root above the bracket
+    ])
+    years = np.array([[0.0, 1.0, 0.0, 0.0]] * 5)
+    years[2, 2] = 2.0
+
+    rates = solve_xirr(amounts, years)
+
+    assert rates[:2] == pytest.approx([0.1, 49.0])
+    assert np.isnan(rates[2:]).all()
+
+
+def test_bisection_finds_the_same_root_when_newton_does_not_settle():
+    amounts = np.array([[-1000.0, -500.0, 1800.0], [-100.0, 50.0, 0.0]])
+    years = np.array([[0.0, 0.5, 2.0], [0.0, 1.0, 0.0]])
+
+    newton = solve_xirr(amounts, years)
+    bisection = solve_xirr(amounts, years, newton_iterations=0)
+
+    assert bisection == pytest.approx(newton, abs=1e-8)
+    assert newton[1] == pytest.approx(-0.5)
@@ -4,138 +4,48 @@ import React, { useState, useEffect } from 'react';
 import PerformanceChart from './PerformanceChart';
 import AllocationBlocks from './AllocationBlocks';
 import OverlapAnalysis from './OverlapAnalysis';
+import { portfolioApi } from '../lib/api';
+
+const formatAmount = (value) => (value == null ? '—' : `₹${Math.round(value).toLocaleString()}`);
+const formatPercent = (value) => (value == null ? '—' : `${value > 0 ? '+' : ''}${value.toFixed(2)}%`);
 
 const Dashboard = () => {
   const [activeTab, setActiveTab] = useState('portfolio'); // Set default to 'portfolio' to match the new image
-  const [portfolioData, setPortfolioData] = useState(null);
+  const [summary, setSummary] = useState(null);
+  const [performance, setPerformance] = useState([]);
   const [loading, setLoading] = useState(true);
   const [timeFrame, setTimeFrame] = useState('1M');
 
-  // Sample data for investment summary cards
-  const summaryData = {
-    currentValue: 550000, // Updated to match image
-    initialValue: 500000,
-    currentReturnPercentage: 0.6,
-    totalReturnPercentage: 10, // Updated to match image
-    gainAmount: 50000, // Added to match image
-    bestPerformingFund: "ICICI Prudential Midcap Fund",
-    bestPerformingReturn: 19,
-    worstPerformingFund: "Axis Flexi Cap Fund",
-    worstPerformingReturn: -5
-  };
-
-  // Calculate Internal Rate of Return (IRR) based on purchase dates
-  const calculateIRR = (investments) => {
-    if (!investments || investments.length === 0) return 0;
-    
-    // This is a simplified IRR calculation
-    // In a real application, you would use a more sophisticated approach
-    // such as the Newton-Raphson method to solve for IRR
-    
-    const totalInitialInvestment = investments.reduce((sum, inv) => sum + inv.amount, 0);
-    const currentValue = summaryData.currentValue;
-    
-    // Get the average holding period in years
-    const now = new Date();
-    const avgHoldingPeriodDays = investments.reduce((sum, inv) => {
-      const purchaseDate = new Date(inv.purchaseDate);
-      const holdingDays = (now - purchaseDate) / (1000 * 60 * 60 * 24);
-      return sum + holdingDays;
-    }, 0) / investments.length;
-    
-    const avgHoldingPeriodYears = avgHoldingPeriodDays / 365;
-    
-    // Calculate CAGR as approximation of IRR
-    const cagr = Math.pow(currentValue / totalInitialInvestment, 1 / avgHoldingPeriodYears) - 1;
-    
-    return cagr * 100;
-  };
-
   useEffect(() => {
-    // Simulate loading portfolio data
-    const loadData = async () => {
-      // In a real app, this would be an API call
-      setTimeout(() => {
-        // Sample portfolio data
-        const sampleData = {
-          performance: [], // This would be populated from API
-          composition: {
-            sector_allocations: [
-              { name: 'Financial Services', allocation: 28 },
-              { name: 'Technology', allocation: 22 },
-              { name: 'Consumer Goods', allocation: 17 },
-              { name: 'Healthcare', allocation: 12 },
-              { name: 'Industrials', allocation: 8 },
-              { name: 'Energy', allocation: 7 },
-              { name: 'Others', allocation: 6 }
-            ]
-          },
-          mutualFunds: [
-            {
-              id: 1,
-              name: 'ICICI Prudential Midcap Fund',
-              allocation: 25,
-              purchaseDate: '2023-01-15',
-              amount: 125000,
-              currentValue: 148750
-            },
-            {
-              id: 2,
-              name: 'SBI Blue Chip Fund',
-              allocation: 20,
-              purchaseDate: '2022-11-20',
-              amount: 100000,
-              currentValue: 110000
-            },
-            {
-              id: 3,
-              name: 'Axis Bluechip Fund',
-              allocation: 15,
-              purchaseDate: '2023-03-10',
-              amount: 75000,
-              currentValue: 80250
-            },
-            {
-              id: 4,
-              name: 'Kotak Emerging Equity Scheme',
-              allocation: 15,
-              purchaseDate: '2022-12-05',
-              amount: 75000,
-              currentValue: 85500
-            },
-            {
-              id: 5,
-              name: 'Axis Flexi Cap Fund',
-              allocation: 15,
-              purchaseDate: '2023-02-18',
-              amount: 75000,
-              currentValue: 71250
-            },
-            {
-              id: 6,
-              name: 'Parag Parikh Flexi Cap Fund',
-              allocation: 10,
-              purchaseDate: '2023-01-28',
-              amount: 50000,
-              currentValue: 54000
-            }
-          ]
-        };
-        
-        setPortfolioData(sampleData);
-        setLoading(false);
-      }, 1000);
+    // One dashboard call per load: the summary with the first timeframe, then only the performance series
+    let cancelled = false;
+    const sections = summary ? 'performance' : 'summary,performance';
+    setLoading(true);
+    portfolioApi.dashboard({ sections, timeframe: timeFrame })
+      .then(({ data }) => {
+        if (cancelled) return;
+        if (data.summary) setSummary(data.summary);
+        setPerformance((data.performance || []).map((point) => ({ ...point, fullDate: point.date })));
+      })
+      .catch((error) => console.error('Failed to load dashboard', error))
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => {
+      cancelled = true;
     };
-    
-    loadData();
-  }, []);
-  
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [timeFrame]);
+
   const handleTimeFrameChange = (tf) => {
     setTimeFrame(tf);
   };
 
-  // Calculate IRR for the portfolio
-  const portfolioIRR = calculateIRR(portfolioData?.mutualFunds);
+  // Change over the last two points of the performance series
+  const lastPoints = performance.slice(-2);
+  const dayReturn = lastPoints.length === 2 && lastPoints[0].value
+    ? (lastPoints[1].value / lastPoints[0].value - 1) * 100
+    : null;
 
   return (
     <div className="bg-[#111827] text-white min-h-screen p-8">
@@ -144,53 +54,53 @@ const Dashboard = () => {
         {/* Current Investment Value */}
         <div className="bg-[#1e293b] rounded-lg p-4 relative">
           <div className="absolute top-4 right-4 text-xs flex items-center">
-            <span className="text-green-400 mr-1">+{summaryData.currentReturnPercentage}%</span>
+            <span className={`${dayReturn < 0 ? 'text-red-400' : 'text-green-400'} mr-1`}>{formatPercent(dayReturn)}</span>
             <span className="text-xs text-gray-400">1D Return</span>
           </div>
           <div className="border-l-4 border-blue-500 pl-2 mb-2">
             <div className="text-xs text-gray-400">Current</div>
             <div className="text-xs text-gray-400">Investment Value</div>
           </div>
-          <div className="text-xl font-bold mt-2">₹{summaryData.currentValue.toLocaleString()}</div>
+          <div className="text-xl font-bold mt-2">{formatAmount(summary?.current_value)}</div>
         </div>
         
         {/* Initial Investment Value */}
         <div className="bg-[#1e293b] rounded-lg p-4 relative">
           <div className="absolute top-4 right-4 text-xs flex items-center">
-            <span className="text-green-400 mr-1">+{summaryData.totalReturnPercentage}%</span>
+            <span className={`${summary?.return_percentage < 0 ? 'text-red-400' : 'text-green-400'} mr-1`}>{formatPercent(summary?.return_percentage)}</span>
             <span className="text-xs text-gray-400">Inception</span>
           </div>
           <div className="border-l-4 border-blue-500 pl-2 mb-2">
             <div className="text-xs text-gray-400">Initial</div>
             <div className="text-xs text-gray-400">Investment Value</div>
           </div>
-          <div className="text-xl font-bold mt-2">₹{summaryData.initialValue.toLocaleString()}</div>
+          <div className="text-xl font-bold mt-2">{formatAmount(summary?.initial_investment)}</div>
         </div>
         
         {/* Best Performing Scheme */}
         <div className="bg-[#1e293b] rounded-lg p-4 relative">
           <div className="absolute top-4 right-4 text-xs flex items-center">
-            <span className="text-green-400 mr-1">+{summaryData.bestPerformingReturn}%</span>
+            <span className="text-green-400 mr-1">{formatPercent(summary?.best_performing_return)}</span>
             <span className="text-xs text-gray-400">Inception</span>
           </div>
           <div className="border-l-4 border-blue-500 pl-2 mb-2">
             <div className="text-xs text-gray-400">Best</div>
             <div className="text-xs text-gray-400">Performing Scheme</div>
           </div>
-          <div className="text-xl font-bold mt-2">{summaryData.bestPerformingFund}</div>
+          <div className="text-xl font-bold mt-2">{summary?.best_performing_fund || '—'}</div>
         </div>
         
         {/* Worst Performing Scheme */}
         <div className="bg-[#1e293b] rounded-lg p-4 relative">
           <div className="absolute top-4 right-4 text-xs flex items-center">
-            <span className="text-red-400 mr-1">{summaryData.worstPerformingReturn}%</span>
+            <span className="text-red-400 mr-1">{formatPercent(summary?.worst_performing_return)}</span>
             <span className="text-xs text-gray-400">Inception</span>
           </div>
           <div className="border-l-4 border-blue-500 pl-2 mb-2">
             <div className="text-xs text-gray-400">Worst</div>
             <div className="text-xs text-gray-400">Performing Scheme</div>
           </div>
-          <div className="text-xl font-bold mt-2">{summaryData.worstPerformingFund}</div>
+          <div className="text-xl font-bold mt-2">{summary?.worst_performing_fund || '—'}</div>
         </div>
       </div>
       
@@ -219,17 +129,17 @@ const Dashboard = () => {
           
           {/* Performance summary block - Updated to match image */}
           <div className="bg-[#1e293b] rounded-lg p-6 mb-8 inline-block">
-            <div className="text-2xl font-bold">₹{summaryData.currentValue.toLocaleString()}</div>
+            <div className="text-2xl font-bold">{formatAmount(summary?.current_value)}</div>
             <div className="flex items-center mt-1">
-              <div className="text-green-500 text-sm">₹{summaryData.gainAmount.toLocaleString()}</div>
+              <div className="text-green-500 text-sm">{formatAmount(summary?.total_return)}</div>
               <div className="text-gray-400 text-sm mx-2">|</div>
-              <div className="text-green-500 text-sm">{summaryData.totalReturnPercentage}%</div>
+              <div className="text-green-500 text-sm">{formatPercent(summary?.return_percentage)}</div>
             </div>
           </div>
           
           {/* Performance chart */}
           <PerformanceChart 
-            data={loading ? [] : portfolioData?.performance}
+            data={loading ? [] : performance}
             timeFrame={timeFrame}
           />
           
@@ -254,10 +164,10 @@ const Dashboard = () => {
           <div className="mt-12 bg-[#1e293b] rounded-lg p-6">
             <h3 className="text-lg font-bold mb-3">Internal Rate of Return (IRR)</h3>
             <p className="text-gray-300 mb-3">
-              The IRR is calculated based on the purchase dates of funds in your portfolio.
+              The IRR (XIRR) is calculated from the dates and amounts of every investment in your portfolio.
             </p>
             <div className="text-xl font-bold text-green-500">
-              {portfolioIRR.toFixed(2)}% <span className="text-sm text-gray-400">per annum</span>
+              {summary?.xirr == null ? '—' : `${summary.xirr.toFixed(2)}%`} <span className="text-sm text-gray-400">per annum</span>
             </div>
           </div>
         </div>
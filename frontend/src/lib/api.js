@@ -53,6 +53,7 @@ export const endpoints = {
     performance: '/api/portfolio/performance',
     composition: '/api/portfolio/composition',
     overlap: '/api/portfolio/overlap',
+    dashboard: '/api/portfolio/dashboard',
   },
 };
 
@@ -85,6 +86,7 @@ export const portfolioApi = {
   performance: (params) => api.get(endpoints.portfolio.performance, { params }),
   composition: () => api.get(endpoints.portfolio.composition),
   overlap: (params) => api.get(endpoints.portfolio.overlap, { params }),
+  dashboard: (params) => api.get(endpoints.portfolio.dashboard, { params }),
 };
 
 export default api;
\ No newline at end of file